@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+ImageComparator 단계별 마이크로 벤치마크
+썸네일부터 8K까지의 합성 이미지와 여러 변경 밀도로 각 메서드의 실행 시간을 측정하고,
+결과를 JSON 기준 파일로 저장하거나 기준 파일과 비교하여 성능 저하를 찾습니다.
+
+사용 예:
+    # 측정 후 기준 파일 저장
+    python benchmarks/bench_comparator.py run --output bench_baseline.json
+
+    # Pillow/OpenCV 업그레이드 후 다시 측정하여 기준과 비교 (10% 초과 느려지면 실패)
+    python benchmarks/bench_comparator.py run --output bench_current.json
+    python benchmarks/bench_comparator.py compare bench_baseline.json bench_current.json --tolerance 0.10
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from typing import Callable, Dict, List, Tuple
+
+import matplotlib
+matplotlib.use('Agg')
+# 한글 제목 글꼴 누락 경고는 측정과 무관하므로 숨김
+warnings.filterwarnings('ignore', message='Glyph .* missing from font')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import cv2
+import numpy as np
+import PIL
+from PIL import Image
+
+from imgdiff import ImageComparator
+
+# 이름: (너비, 높이)
+IMAGE_SIZES = {
+    'thumb': (160, 120),
+    'hd': (1280, 720),
+    'fhd': (1920, 1080),
+    '4k': (3840, 2160),
+    '8k': (7680, 4320),
+}
+
+# 변경된 픽셀 비율 (0.001 = 0.1%)
+CHANGE_DENSITIES = [0.001, 0.01, 0.1, 0.5]
+
+STAGES = [
+    'load_images',
+    'calculate_difference',
+    'get_statistics',
+    'get_processed_statistics',
+    'create_diff_image:difference',
+    'create_diff_image:highlight',
+    'create_diff_image:heatmap',
+    'find_changed_regions',
+    'save_comparison_report',
+    'create_side_by_side_comparison',
+]
+
+
+def create_image_pair(width: int, height: int, density: float,
+                      seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """그라디언트 + 노이즈 배경에 변경 밀도만큼 사각형 패치를 바꾼 이미지 쌍 생성"""
+    rng = np.random.default_rng(seed)
+
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    arr1 = np.empty((height, width, 3), dtype=np.uint8)
+    arr1[..., 0] = 120 + 80 * x
+    arr1[..., 1] = 100 + 60 * y
+    arr1[..., 2] = 140 + 20 * (x + y)
+    # 미세한 노이즈 (압축 잡음 흉내)
+    arr1 += rng.integers(0, 3, arr1.shape, dtype=np.uint8)
+    arr2 = arr1.copy()
+
+    # 목표 밀도에 도달할 때까지 크기가 다른 사각형 패치를 변경
+    target = int(width * height * density)
+    changed = np.zeros((height, width), dtype=bool)
+    changed_count = 0
+    patch = max(2, int(min(width, height) * 0.05))
+    while changed_count < target:
+        ph = int(rng.integers(1, patch + 1))
+        pw = int(rng.integers(1, patch + 1))
+        top = int(rng.integers(0, height - ph + 1))
+        left = int(rng.integers(0, width - pw + 1))
+        region = changed[top:top + ph, left:left + pw]
+        changed_count += int(region.size - np.count_nonzero(region))
+        region[:] = True
+        # 원래 색과 확실히 구분되도록 반전
+        arr2[top:top + ph, left:left + pw] = 255 - arr1[top:top + ph, left:left + pw]
+
+    return arr1, arr2
+
+
+def time_call(setup: Callable, func: Callable, repeat: int) -> List[float]:
+    """setup()의 결과를 func에 넘겨 repeat번 실행 시간을 측정 (setup 시간은 제외)"""
+    samples = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        func(state)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_case(image1_path: str, image2_path: str, repeat: int, workdir: str) -> Dict[str, Dict]:
+    """한 이미지 쌍에 대해 모든 단계의 실행 시간 측정"""
+    loaded = ImageComparator(image1_path, image2_path)
+    loaded.load_images()
+
+    def fresh():
+        # 디코드된 이미지를 공유하는 새 비교 객체 (캐시 없음)
+        comparator = ImageComparator(image1_path, image2_path)
+        comparator.img1 = loaded.img1
+        comparator.img2 = loaded.img2
+        return comparator
+
+    def with_diff():
+        comparator = fresh()
+        comparator.calculate_difference()
+        return comparator
+
+    report_dir = os.path.join(workdir, 'report')
+    side_path = os.path.join(workdir, 'side_by_side.png')
+
+    cases = {
+        'load_images': (lambda: ImageComparator(image1_path, image2_path),
+                        lambda c: c.load_images()),
+        'calculate_difference': (fresh, lambda c: c.calculate_difference()),
+        'get_statistics': (with_diff, lambda c: c.get_statistics(threshold=20)),
+        'get_processed_statistics': (with_diff, lambda c: c.get_processed_statistics(
+            threshold=20, morphology_kernel_size=3)),
+        'create_diff_image:difference': (with_diff, lambda c: c.create_diff_image('difference')),
+        'create_diff_image:highlight': (with_diff, lambda c: c.create_diff_image(
+            'highlight', threshold=20, morphology_kernel_size=3)),
+        'create_diff_image:heatmap': (with_diff, lambda c: c.create_diff_image('heatmap')),
+        'find_changed_regions': (with_diff, lambda c: c.find_changed_regions(
+            threshold=20, morphology_kernel_size=3)),
+        'save_comparison_report': (with_diff, lambda c: c.save_comparison_report(report_dir)),
+        'create_side_by_side_comparison': (with_diff, lambda c: c.create_side_by_side_comparison(
+            side_path, threshold=20, morphology_kernel_size=3)),
+    }
+
+    results = {}
+    for stage in STAGES:
+        setup, func = cases[stage]
+        with contextlib.redirect_stdout(io.StringIO()):
+            samples = time_call(setup, func, repeat)
+        results[stage] = {
+            'median_s': statistics.median(samples),
+            'min_s': min(samples),
+            'samples': samples,
+        }
+    return results
+
+
+def environment_info() -> Dict:
+    """측정 환경 정보 (라이브러리 업그레이드 전후 비교용)"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pillow': PIL.__version__,
+        'opencv': cv2.__version__,
+        'matplotlib': matplotlib.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(args) -> int:
+    """선택한 크기/밀도 조합을 모두 측정하여 JSON으로 저장"""
+    workdir = tempfile.mkdtemp(prefix='imgdiff_microbench_')
+    results = {}
+    try:
+        for size_name in args.sizes:
+            width, height = IMAGE_SIZES[size_name]
+            for density in args.densities:
+                key = f"{size_name}@{density:g}"
+                print(f"⏱️  {key} ({width}x{height}, 변경 {density * 100:g}%) 측정 중...")
+
+                arr1, arr2 = create_image_pair(width, height, density, seed=args.seed)
+                image1_path = os.path.join(workdir, f"{key}_1.png")
+                image2_path = os.path.join(workdir, f"{key}_2.png")
+                Image.fromarray(arr1).save(image1_path, compress_level=1)
+                Image.fromarray(arr2).save(image2_path, compress_level=1)
+
+                results[key] = bench_case(image1_path, image2_path, args.repeat, workdir)
+                for stage in STAGES:
+                    print(f"   {stage:<34}{results[key][stage]['median_s'] * 1000:>10.2f} ms")
+
+                os.remove(image1_path)
+                os.remove(image2_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {'environment': environment_info(), 'repeat': args.repeat, 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 결과가 '{args.output}'에 저장되었습니다.")
+
+    if args.baseline:
+        return compare_files(args.baseline, args.output, args.tolerance)
+    return 0
+
+
+def compare_files(baseline_path: str, current_path: str, tolerance: float) -> int:
+    """두 결과 파일의 중앙값을 비교하여 허용 범위를 넘게 느려진 항목을 표시
+
+    Returns:
+        성능 저하가 있으면 1, 없으면 0 (CI에서 종료 코드로 사용)
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(current_path, 'r', encoding='utf-8') as f:
+        current = json.load(f)
+
+    print(f"\n📊 기준: {baseline_path}  →  현재: {current_path} (허용: +{tolerance * 100:.0f}%)")
+    for name in ('numpy', 'pillow', 'opencv', 'matplotlib'):
+        before = baseline.get('environment', {}).get(name)
+        after = current.get('environment', {}).get(name)
+        if before != after:
+            print(f"   {name}: {before} → {after}")
+
+    print(f"\n{'항목':<48}{'기준(ms)':>10}{'현재(ms)':>10}{'변화':>9}")
+    print(f"{'-'*77}")
+
+    regressions = []
+    for key, stages in current['results'].items():
+        base_stages = baseline['results'].get(key)
+        if base_stages is None:
+            continue
+        for stage, timing in stages.items():
+            if stage not in base_stages:
+                continue
+            before = base_stages[stage]['median_s']
+            after = timing['median_s']
+            change = (after - before) / before if before > 0 else 0.0
+            flag = ''
+            if change > tolerance:
+                flag = ' ❌'
+                regressions.append((key, stage, change))
+            elif change < -tolerance:
+                flag = ' ✅'
+            print(f"{key + ' ' + stage:<48}{before * 1000:>10.2f}{after * 1000:>10.2f}"
+                  f"{change * 100:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n❌ 성능 저하 {len(regressions)}건 (허용 범위 +{tolerance * 100:.0f}% 초과)")
+        return 1
+
+    print(f"\n✅ 허용 범위를 넘는 성능 저하가 없습니다.")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ImageComparator 단계별 마이크로 벤치마크')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='벤치마크 실행 후 결과 저장')
+    run_parser.add_argument('--sizes', nargs='+', choices=list(IMAGE_SIZES), default=list(IMAGE_SIZES),
+                            help='측정할 이미지 크기 (기본값: 전체)')
+    run_parser.add_argument('--densities', type=float, nargs='+', default=CHANGE_DENSITIES,
+                            help='변경된 픽셀 비율 (기본값: 0.001 0.01 0.1 0.5)')
+    run_parser.add_argument('--repeat', type=int, default=3, help='단계별 반복 횟수 (기본값: 3)')
+    run_parser.add_argument('--seed', type=int, default=0, help='합성 이미지 난수 시드 (기본값: 0)')
+    run_parser.add_argument('--output', default='bench_comparator.json',
+                            help='결과 JSON 파일 (기본값: bench_comparator.json)')
+    run_parser.add_argument('--baseline', default=None, help='측정 후 바로 비교할 기준 파일')
+    run_parser.add_argument('--tolerance', type=float, default=0.10,
+                            help='허용 성능 저하 비율 (기본값: 0.10 = 10%%)')
+
+    compare_parser = subparsers.add_parser('compare', help='기준 파일과 현재 결과 비교')
+    compare_parser.add_argument('baseline', help='기준 결과 JSON 파일')
+    compare_parser.add_argument('current', help='현재 결과 JSON 파일')
+    compare_parser.add_argument('--tolerance', type=float, default=0.10,
+                                help='허용 성능 저하 비율 (기본값: 0.10 = 10%%)')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        return run(args)
+    return compare_files(args.baseline, args.current, args.tolerance)
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+전체 파이프라인 오프라인 벤치마크
+가짜 구글 시트 서비스, 로컬 HTTP 이미지 서버, 파일시스템 저장소를 사용하여
+GoogleSheetURLImageComparator → GCSImageUploader 과정을 네트워크 없이 실행하고
+행/초, 단계별 지연 시간 백분위수, 최대 메모리(RSS)를 측정합니다.
+
+사용 예:
+    python benchmarks/bench_pipeline.py --sizes 100 1000 10000
+    python benchmarks/bench_pipeline.py --sizes 100 --output bench_pipeline.json
+"""
+
+import argparse
+import contextlib
+import functools
+import http.server
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from typing import Dict, List, Optional
+
+import matplotlib
+matplotlib.use('Agg')
+# 한글 제목 글꼴 누락 경고는 측정과 무관하므로 숨김
+warnings.filterwarnings('ignore', message='Glyph .* missing from font')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'archive_unused'))
+
+import numpy as np
+
+SPREADSHEET_ID = 'offline-benchmark'
+
+# 합성 이미지 쌍 (create_test_images.py가 생성하는 파일)
+IMAGE_PAIRS = [
+    ('image1.png', 'image2.png'),
+    ('identical1.png', 'identical2.png'),
+    ('small_image.png', 'large_image.png'),
+]
+
+
+def _row_numbers(first_row: int, last_row: int):
+    """first_row부터 last_row까지의 행 번호 (get()의 range 인자가 내장 range를 가리므로 분리)"""
+    return range(first_row, last_row + 1)
+
+
+class _Request:
+    """googleapiclient 요청 객체 흉내 (.execute()로 실행)"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def execute(self):
+        return self.func()
+
+
+class FakeSheetsService:
+    """메모리 안에서 동작하는 구글 시트 API 서비스 객체
+
+    values().get / update / batchUpdate 와 spreadsheets().get 만 지원하며,
+    요청 종류별 호출 수와 기록된 셀 값을 보관합니다.
+    """
+
+    _CELL = re.compile(r'([A-Z]+)(\d+)')
+
+    def __init__(self, rows: Dict[int, List[str]], row_count: int):
+        self.rows = rows
+        self.row_count = row_count
+        self.written: Dict[str, List] = {}
+        self.calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _count(self, name: str):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _row_span(self, range_name: str):
+        cells = self._CELL.findall(range_name.split('!')[-1])
+        first_row = int(cells[0][1])
+        last_row = int(cells[1][1]) if len(cells) > 1 else self.row_count
+        return first_row, last_row
+
+    def get(self, spreadsheetId: str, range: Optional[str] = None,
+            valueRenderOption: Optional[str] = None, fields: Optional[str] = None):
+        if range is None:
+            # spreadsheets().get: 시트 메타데이터
+            def metadata():
+                self._count('spreadsheets.get')
+                return {'sheets': [{'properties': {
+                    'title': 'Sheet1', 'sheetId': 0,
+                    'gridProperties': {'rowCount': self.row_count}
+                }}]}
+            return _Request(metadata)
+
+        def values_get():
+            self._count('values.get')
+            first_row, last_row = self._row_span(range)
+            values = [self.rows.get(row, []) for row in _row_numbers(first_row, last_row)]
+            while values and not values[-1]:
+                values.pop()
+            return {'values': values}
+        return _Request(values_get)
+
+    def update(self, spreadsheetId: str, range: str, valueInputOption: str, body: Dict):
+        def values_update():
+            self._count('values.update')
+            with self._lock:
+                self.written[range] = body['values']
+            return {'updatedCells': sum(len(row) for row in body['values'])}
+        return _Request(values_update)
+
+    def batchUpdate(self, spreadsheetId: str, body: Dict):
+        def values_batch_update():
+            self._count('values.batchUpdate')
+            with self._lock:
+                for item in body.get('data', []):
+                    self.written[item['range']] = item['values']
+            cells = sum(len(row) for item in body.get('data', []) for row in item['values'])
+            return {'totalUpdatedCells': cells}
+        return _Request(values_batch_update)
+
+
+class FilesystemBlob:
+    """GCS Blob 대신 로컬 디렉토리에 저장하는 객체"""
+
+    def __init__(self, root: str, name: str):
+        self.path = os.path.join(root, name)
+
+    def upload_from_filename(self, filename: str, content_type: Optional[str] = None):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        shutil.copyfile(filename, self.path)
+
+
+class FilesystemBucket:
+    """GCS Bucket 대신 로컬 디렉토리를 사용하는 저장소"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def blob(self, name: str) -> FilesystemBlob:
+        return FilesystemBlob(self.root, name)
+
+
+@contextlib.contextmanager
+def serve_directory(directory: str):
+    """디렉토리를 로컬 HTTP 서버로 제공하고 기본 URL 반환"""
+
+    class QuietHandler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=directory, **kwargs)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def create_synthetic_images(directory: str, seed: int = 0):
+    """archive_unused/create_test_images.py로 합성 이미지 쌍 생성"""
+    import create_test_images
+
+    random.seed(seed)
+    np.random.seed(seed)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            create_test_images.create_test_images()
+            create_test_images.create_identical_images()
+            create_test_images.create_different_size_images()
+    finally:
+        os.chdir(cwd)
+
+
+def build_sheet_rows(num_rows: int, base_url: str) -> Dict[int, List[str]]:
+    """B3부터 num_rows개의 IMAGE 수식 행 생성 (같은 파일도 행마다 다른 URL)"""
+    rows = {}
+    for idx in range(num_rows):
+        name1, name2 = IMAGE_PAIRS[idx % len(IMAGE_PAIRS)]
+        rows[idx + 3] = [
+            f'=IMAGE("{base_url}/{name1}?row={idx + 3}")',
+            f'=IMAGE("{base_url}/{name2}?row={idx + 3}")',
+        ]
+    return rows
+
+
+class StageTimer:
+    """메서드를 감싸 단계별 호출 지연 시간을 기록"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._patches = []
+
+    def wrap(self, owner, attr: str, stage: str):
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples.setdefault(stage, []).append(elapsed)
+
+        # 클래스에 정의된 메서드는 클래스에서, 인스턴스 속성은 인스턴스에서 교체
+        self._patches.append((owner, attr, owner.__dict__.get(attr)))
+        setattr(owner, attr, timed)
+
+    def restore(self):
+        for owner, attr, original in reversed(self._patches):
+            if original is None:
+                delattr(owner, attr)
+            else:
+                setattr(owner, attr, original)
+        self._patches = []
+
+    def summary(self) -> Dict[str, Dict]:
+        result = {}
+        for stage, samples in self.samples.items():
+            values = np.array(samples) * 1000.0
+            result[stage] = {
+                'count': len(samples),
+                'total_s': float(values.sum() / 1000.0),
+                'p50_ms': float(np.percentile(values, 50)),
+                'p90_ms': float(np.percentile(values, 90)),
+                'p99_ms': float(np.percentile(values, 99)),
+                'max_ms': float(values.max()),
+            }
+        return result
+
+
+def run_pipeline(num_rows: int, workers: int = 10, page_size: int = 1000,
+                 flush_rows: int = 50, threshold: int = 30,
+                 morphology_kernel_size: int = 3, seed: int = 0) -> Dict:
+    """합성 시트 num_rows행에 대해 비교와 업로드를 실행하고 측정값 반환"""
+    from imgdiff import ImageComparator
+    from imgdiff_googlesheet_url import GoogleSheetURLImageComparator
+    from imgdiff_sheets import sheets_limiter
+    from upload_to_gcs import GCSImageUploader
+
+    # 가짜 서비스로 측정하므로 할당량 대기는 제외
+    sheets_limiter.configure(read_per_minute=1e9, write_per_minute=1e9)
+
+    workdir = tempfile.mkdtemp(prefix='imgdiff_bench_')
+    image_dir = os.path.join(workdir, 'images')
+    storage_dir = os.path.join(workdir, 'storage')
+    os.makedirs(image_dir)
+    create_synthetic_images(image_dir, seed)
+
+    timer = StageTimer()
+    cwd = os.getcwd()
+    try:
+        with serve_directory(image_dir) as base_url:
+            # 업로더가 googlesheet_url_results/ 를 상대 경로로 읽으므로 작업 디렉토리 이동
+            os.chdir(workdir)
+            service = FakeSheetsService(build_sheet_rows(num_rows, base_url), num_rows + 2)
+
+            comparator = GoogleSheetURLImageComparator(
+                SPREADSHEET_ID, 'B3:C',
+                output_dir='googlesheet_url_results',
+                threshold=threshold,
+                morphology_kernel_size=morphology_kernel_size
+            )
+            comparator.service = service
+
+            uploader = GCSImageUploader(SPREADSHEET_ID, 'imgdiff-bench')
+            uploader.sheet_service = service
+            uploader.bucket = FilesystemBucket(storage_dir)
+
+            timer.wrap(comparator, 'download_image', 'download')
+            timer.wrap(ImageComparator, 'load_images', 'decode')
+            timer.wrap(ImageComparator, 'calculate_difference', 'diff')
+            timer.wrap(ImageComparator, 'get_statistics', 'stats')
+            timer.wrap(ImageComparator, 'get_processed_statistics', 'processed_stats')
+            timer.wrap(ImageComparator, 'create_diff_image', 'render_highlight')
+            timer.wrap(ImageComparator, 'create_side_by_side_comparison', 'render_side_by_side')
+            timer.wrap(comparator, 'compare_pair', 'compare_row')
+            timer.wrap(uploader, 'upload_to_gcs', 'upload')
+            timer.wrap(uploader, 'process_single_row', 'upload_row')
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                writer = comparator.create_sheet_writer(flush_rows=flush_rows)
+                comparator.compare_url_batches(
+                    comparator.iter_sheet_url_batches(page_size=page_size), writer=writer)
+                writer.close()
+                comparator.generate_report()
+                compare_elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                uploader.update_sheet_with_images(3, num_rows + 2, workers, flush_rows=flush_rows)
+                upload_elapsed = time.perf_counter() - start
+
+            comparator.cleanup_temp_files()
+            succeeded = sum(1 for r in comparator.results if r['status'] == 'success')
+    finally:
+        timer.restore()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    total_elapsed = compare_elapsed + upload_elapsed
+    return {
+        'rows': num_rows,
+        'succeeded': succeeded,
+        'compare_s': compare_elapsed,
+        'upload_s': upload_elapsed,
+        'rows_per_s': num_rows / total_elapsed if total_elapsed > 0 else 0.0,
+        'compare_rows_per_s': num_rows / compare_elapsed if compare_elapsed > 0 else 0.0,
+        'upload_rows_per_s': num_rows / upload_elapsed if upload_elapsed > 0 else 0.0,
+        # Linux에서 ru_maxrss 단위는 KB
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        'sheet_calls': dict(service.calls),
+        'stages': timer.summary(),
+    }
+
+
+def _run_isolated(kwargs: Dict) -> Dict:
+    """최대 RSS가 다른 크기의 측정과 섞이지 않도록 새 프로세스에서 실행"""
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(run_pipeline, kwds=kwargs)
+
+
+def print_result(result: Dict):
+    """측정 결과를 표로 출력"""
+    print(f"\n📊 {result['rows']:,}행 (성공 {result['succeeded']:,})")
+    print(f"{'='*72}")
+    print(f"전체 처리량: {result['rows_per_s']:.2f} 행/초 "
+          f"(비교 {result['compare_rows_per_s']:.2f}, 업로드 {result['upload_rows_per_s']:.2f})")
+    print(f"소요 시간: 비교 {result['compare_s']:.1f}초, 업로드 {result['upload_s']:.1f}초")
+    print(f"최대 메모리: {result['peak_rss_mb']:.1f} MB")
+    print(f"시트 API 호출: {result['sheet_calls']}")
+    print(f"\n{'단계':<22}{'횟수':>8}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}")
+    print(f"{'-'*72}")
+    for stage, s in result['stages'].items():
+        print(f"{stage:<22}{s['count']:>8}{s['p50_ms']:>10.1f}{s['p90_ms']:>10.1f}"
+              f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='시트 → 비교 → 업로드 파이프라인 오프라인 벤치마크')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000],
+                        help='측정할 합성 시트 행 수 (기본값: 100 1000 10000)')
+    parser.add_argument('--workers', type=int, default=10, help='업로드 병렬 워커 수 (기본값: 10)')
+    parser.add_argument('--page-size', type=int, default=1000, help='시트 읽기 페이지 크기 (기본값: 1000)')
+    parser.add_argument('--flush-rows', type=int, default=50, help='시트 쓰기 버퍼 크기 (기본값: 50)')
+    parser.add_argument('--threshold', type=int, default=30, help='차이 감지 임계값 (기본값: 30)')
+    parser.add_argument('--morphology-kernel-size', type=int, default=3,
+                        help='형태학적 연산 커널 크기 (기본값: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='합성 이미지 난수 시드 (기본값: 0)')
+    parser.add_argument('--output', default=None, help='결과를 저장할 JSON 파일 경로')
+
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        print(f"\n🚀 {size:,}행 파이프라인 실행 중...")
+        result = _run_isolated({
+            'num_rows': size,
+            'workers': args.workers,
+            'page_size': args.page_size,
+            'flush_rows': args.flush_rows,
+            'threshold': args.threshold,
+            'morphology_kernel_size': args.morphology_kernel_size,
+            'seed': args.seed,
+        })
+        print_result(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results}, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 결과가 '{args.output}'에 저장되었습니다.")
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -4,36 +4,255 @@
 두 이미지 간의 차이를 분석하고 시각화합니다.
 """
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageSequence
 import numpy as np
 import argparse
+import base64
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import math
 import os
-from typing import Tuple, Optional
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed, wait)
+from typing import Dict, IO, Iterable, Iterator, List, Sequence, Tuple, Optional
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import cv2
 
+from imgdiff_artifacts import (ENCODING_PROFILES, ArtifactEncoder, artifact_path, create_rendition,
+                               encode_image, get_profile, rendition_size)
+from imgdiff_rle import encode_mask
+
+
+class StageProfiler:
+    """단계별 실행 시간, CPU 시간, 최대 할당 메모리를 기록합니다.
+
+    메모리는 tracemalloc으로 측정하므로 track_memory=True이면 처음 생성될 때
+    추적을 시작합니다 (numpy 배열 할당도 포함). 단계는 중첩될 수 있으며,
+    바깥 단계의 최대 메모리에는 안쪽 단계의 사용량이 포함됩니다.
+    """
+
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self.stages: Dict[str, Dict] = {}
+        self._stack = []
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """with 블록 하나를 name 단계로 측정"""
+        frame = {'base': 0, 'peak': 0}
+        if self.track_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                outer = self._stack[-1]
+                outer['peak'] = max(outer['peak'], peak - outer['base'])
+            tracemalloc.reset_peak()
+            frame['base'] = current
+        self._stack.append(frame)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            self._stack.pop()
+
+            peak_bytes = 0
+            if self.track_memory:
+                absolute_peak = tracemalloc.get_traced_memory()[1]
+                peak_bytes = max(frame['peak'], absolute_peak - frame['base'])
+                # 바깥 단계에도 이 단계의 최대 사용량 반영
+                if self._stack:
+                    outer = self._stack[-1]
+                    outer['peak'] = max(outer['peak'], absolute_peak - outer['base'])
+
+            record = self.stages.setdefault(name, {'count': 0, 'wall_s': 0.0,
+                                                   'cpu_s': 0.0, 'peak_bytes': 0})
+            record['count'] += 1
+            record['wall_s'] += wall
+            record['cpu_s'] += cpu
+            record['peak_bytes'] = max(record['peak_bytes'], int(max(peak_bytes, 0)))
+
+    def summary(self) -> Dict[str, Dict]:
+        """단계별 측정값 (JSON으로 저장 가능한 기본 타입)"""
+        return {name: dict(record) for name, record in self.stages.items()}
+
+    @staticmethod
+    def format_summary(stages: Dict[str, Dict]) -> str:
+        """단계별 측정값을 표 형식 문자열로 변환"""
+        lines = [f"{'단계':<28}{'횟수':>6}{'시간(ms)':>12}{'CPU(ms)':>12}{'최대 메모리(MB)':>16}"]
+        for name, record in sorted(stages.items(), key=lambda item: -item[1]['wall_s']):
+            lines.append(f"{name:<28}{record['count']:>6}{record['wall_s'] * 1000:>12.1f}"
+                         f"{record['cpu_s'] * 1000:>12.1f}{record['peak_bytes'] / 1024 / 1024:>16.1f}")
+        return '\n'.join(lines)
+
+
+# 측정하지 않을 때 사용하는 빈 컨텍스트 (재사용 가능)
+_NO_STAGE = contextlib.nullcontext()
+
+# 채널 히스토그램을 계산할 때 한 번에 처리할 픽셀 수 (임시 인덱스 배열 크기 제한)
+HISTOGRAM_BAND_PIXELS = 1 << 18
+
+
+def tile_hashes(array: np.ndarray, tile_size: int) -> np.ndarray:
+    """이미지 배열을 tile_size 격자로 나눠 타일별 원본 바이트 해시를 계산
+
+    Returns:
+        (타일 행 수, 타일 열 수) 크기의 16바이트 해시 배열 (가장자리 타일은 잘린 크기 그대로)
+    """
+    height, width = array.shape[:2]
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    hashes = np.empty((rows, cols), dtype='S16')
+    for ty in range(rows):
+        band = array[ty * tile_size:(ty + 1) * tile_size]
+        for tx in range(cols):
+            tile = band[:, tx * tile_size:(tx + 1) * tile_size]
+            hashes[ty, tx] = hashlib.blake2b(tile.tobytes(), digest_size=16).digest()
+    return hashes
+
+
+def label_regions(mask: np.ndarray, min_area: int, y_offset: int = 0,
+                  x_offset: int = 0) -> List[Tuple[Tuple[int, int], dict]]:
+    """마스크의 연결 요소 중 min_area 이상인 것의 경계 상자를 계산
+
+    Returns:
+        ((첫 픽셀 y, 첫 픽셀 x), 영역 정보) 목록. 좌표에는 offset이 더해집니다.
+    """
+    from scipy import ndimage
+
+    labeled_array, _ = ndimage.label(mask)
+    found = []
+    for label, bounds in enumerate(ndimage.find_objects(labeled_array), 1):
+        if bounds is None:
+            continue
+        component = labeled_array[bounds] == label
+        area = int(np.count_nonzero(component))
+        if area < min_area:
+            continue
+        rows, cols = bounds
+        first_x = int(np.argmax(component[0]))
+        found.append(((rows.start + y_offset, cols.start + first_x + x_offset), {
+            'x': cols.start + x_offset,
+            'y': rows.start + y_offset,
+            'width': cols.stop - cols.start,
+            'height': rows.stop - rows.start,
+            'area': area
+        }))
+    return found
+
+
+def group_dirty_tiles(dirty: np.ndarray, tile_size: int, height: int,
+                      width: int) -> List[Tuple[slice, slice]]:
+    """변경된 타일을 가까운 것끼리 묶어 1타일 여백을 둔 픽셀 영역 목록으로 변환
+
+    영역 가장자리의 여백 타일은 변경이 없으므로 (차이 0), tile_size보다 작은 커널의
+    형태학적 연산/블러와 연결 요소 라벨링을 영역별로 따로 해도 전체 프레임 결과와 같습니다.
+    영역끼리는 겹치지 않습니다.
+    """
+    from scipy import ndimage
+
+    if not dirty.any():
+        return []
+
+    neighborhood = np.ones((3, 3), dtype=bool)
+    grown = ndimage.binary_dilation(dirty, structure=neighborhood)
+    labeled, _ = ndimage.label(grown, structure=neighborhood)
+    boxes = [[rows.start, rows.stop, cols.start, cols.stop]
+             for rows, cols in ndimage.find_objects(labeled)]
+
+    # 경계 상자가 겹치면 합침 (L자 모양 묶음 등)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[1] and b[0] < a[1] and a[2] < b[3] and b[2] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return [(slice(r0 * tile_size, min(r1 * tile_size, height)),
+             slice(c0 * tile_size, min(c1 * tile_size, width)))
+            for r0, r1, c0, c1 in boxes]
+
 
 class ImageComparator:
-    def __init__(self, image1_path: str, image2_path: str):
+    # 스레드마다 나눠 줄 행 띠 개수 (작업량 불균형 완화)
+    BANDS_PER_THREAD = 4
+    # save_comparison_report가 만들 수 있는 파일 ('report'는 report.txt)
+    REPORT_OUTPUTS = ('report', 'difference', 'highlight', 'heatmap', 'overlay', 'regions')
+
+    def __init__(self, image1_path: str, image2_path: str,
+                 profiler: Optional[StageProfiler] = None, threads: int = 1,
+                 tile_size: int = 0, baseline: Optional['BaselineComparator'] = None,
+                 encoding: str = 'default'):
         """
         이미지 비교 클래스 초기화
 
         Args:
             image1_path: 첫 번째 이미지 경로
             image2_path: 두 번째 이미지 경로
+            profiler: 지정하면 단계별 시간/메모리를 기록 (기본값: None, 측정 안 함)
+            threads: 차이 계산과 통계 축소를 행 띠로 나눠 실행할 스레드 수
+                     (기본값: 1, numpy가 GIL을 놓으므로 큰 이미지 한 쌍에서 효과적)
+            tile_size: 0보다 크면 이 크기의 타일 해시를 비교해 바뀐 타일만 계산
+                       (기본값: 0, 대부분 동일한 스크린샷 비교에 효과적)
+            baseline: 지정하면 첫 번째 이미지로 미리 디코드된 기준 이미지와 그 배열을 재사용
+                      (BaselineComparator.compare()가 설정)
+            encoding: 결과 이미지 인코딩 프로필 (imgdiff_artifacts.ENCODING_PROFILES,
+                      기본값: 'default' = 24비트 PNG)
         """
         self.image1_path = image1_path
         self.image2_path = image2_path
         self.img1 = None
         self.img2 = None
         self.diff_array = None
+        self.profiler = profiler
+        self.baseline = baseline
+        if baseline is not None:
+            self.img1 = baseline.image
+        self.threads = max(1, threads)
+        self.tile_size = max(0, tile_size)
+        get_profile(encoding)
+        self.encoding = encoding
+        # 타일 모드 정보 (calculate_difference에서 설정)
+        self.tile_summary: Optional[dict] = None
+        self._tile_crops: Optional[List[Tuple[slice, slice]]] = None
+        self._tile_source = None
+        # diff_array에서 계산한 2차원 평면 캐시 (diff_array가 바뀌면 다시 계산)
+        self._planes: Dict[str, np.ndarray] = {}
+        self._planes_source = None
+
+    def stage(self, name: str):
+        """profiler가 있으면 name 단계로 측정하는 컨텍스트, 없으면 빈 컨텍스트"""
+        if self.profiler is None:
+            return _NO_STAGE
+        return self.profiler.stage(name)
 
     def load_images(self) -> Tuple[Image.Image, Image.Image]:
         """이미지를 로드하고 크기를 맞춥니다."""
         try:
-            self.img1 = Image.open(self.image1_path).convert('RGB')
-            self.img2 = Image.open(self.image2_path).convert('RGB')
+            with self.stage('decode'):
+                # 기준 이미지는 BaselineComparator가 한 번만 디코드
+                if self.baseline is None:
+                    self.img1 = Image.open(self.image1_path).convert('RGB')
+                self.img2 = Image.open(self.image2_path).convert('RGB')
         except FileNotFoundError as e:
             raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {e}")
         except Exception as e:
@@ -43,68 +262,337 @@ class ImageComparator:
         if self.img1.size != self.img2.size:
             print(f"⚠️  이미지 크기 차이 감지: {self.img1.size} vs {self.img2.size}")
             print(f"   두 번째 이미지를 첫 번째 이미지 크기로 리사이즈합니다.")
-            self.img2 = self.img2.resize(self.img1.size, Image.Resampling.LANCZOS)
+            with self.stage('resize'):
+                self.img2 = self.img2.resize(self.img1.size, Image.Resampling.LANCZOS)
 
         return self.img1, self.img2
 
+    def _row_bands(self, height: int, width: int) -> List[Tuple[slice, slice]]:
+        """전체 프레임을 스레드 수에 맞춘 행 띠 (행 slice, 열 slice) 목록으로 분할"""
+        if self.threads <= 1 or height < 2:
+            return [(slice(0, height), slice(0, width))]
+
+        band_count = min(height, self.threads * self.BANDS_PER_THREAD)
+        band_rows = -(-height // band_count)
+        return [(slice(start, min(start + band_rows, height)), slice(0, width))
+                for start in range(0, height, band_rows)]
+
+    def _map_regions(self, func, regions: List[Tuple[slice, slice]]) -> list:
+        """각 영역 (행 slice, 열 slice)에 func를 실행하고 결과 목록을 반환
+
+        threads가 1보다 크면 스레드 풀에서 실행합니다. 영역끼리 겹치지 않으므로
+        결과는 직렬 실행과 같습니다.
+        """
+        if self.threads <= 1 or len(regions) < 2:
+            return [func(rows, cols) for rows, cols in regions]
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            return list(pool.map(lambda region: func(*region), regions))
+
+    def _tile_regions(self) -> Optional[List[Tuple[slice, slice]]]:
+        """타일 모드에서 계산할 영역 (변경 타일 묶음 + 1타일 여백), 타일 모드가 아니면 None
+
+        diff_array가 calculate_difference 이후 교체되었다면 타일 정보도 무효입니다.
+        """
+        if self._tile_source is None or self._tile_source is not self.diff_array:
+            return None
+        return self._tile_crops
+
+    def _plane_regions(self) -> List[Tuple[slice, slice]]:
+        """평면/히스토그램을 계산할 영역 목록 (타일 모드면 변경 영역만, 아니면 행 띠)"""
+        crops = self._tile_regions()
+        if crops is not None:
+            return crops
+        return self._row_bands(*self.diff_array.shape[:2])
+
     def calculate_difference(self) -> np.ndarray:
-        """픽셀 단위로 차이를 계산합니다."""
+        """픽셀 단위로 차이를 계산합니다.
+
+        tile_size가 0보다 크면 두 이미지를 타일로 나눠 원본 바이트의 해시를 비교하고,
+        해시가 다른 타일만 차이를 계산합니다 (나머지는 0).
+        """
         if self.img1 is None or self.img2 is None:
             self.load_images()
 
-        # numpy 배열로 변환
-        arr1 = np.array(self.img1)
-        arr2 = np.array(self.img2)
-
-        # 픽셀 단위 차이 계산
-        self.diff_array = np.abs(arr1.astype(np.int16) - arr2.astype(np.int16))
+        with self.stage('diff'):
+            # numpy 배열로 변환 (기준 이미지 배열은 재사용)
+            arr1 = self.baseline.array if self.baseline is not None else np.array(self.img1)
+            arr2 = np.array(self.img2)
+            height, width = arr1.shape[:2]
+
+            if self.tile_size > 0:
+                with self.stage('tile_hash'):
+                    if self.baseline is not None:
+                        hashes1 = self.baseline.get_tile_hashes(self.tile_size)
+                        hashes2 = tile_hashes(arr2, self.tile_size)
+                    elif self.threads > 1:
+                        # hashlib은 큰 입력에서 GIL을 놓으므로 두 이미지를 동시에 해시
+                        with ThreadPoolExecutor(max_workers=2) as pool:
+                            hashes1, hashes2 = pool.map(
+                                lambda array: tile_hashes(array, self.tile_size), (arr1, arr2))
+                    else:
+                        hashes1 = tile_hashes(arr1, self.tile_size)
+                        hashes2 = tile_hashes(arr2, self.tile_size)
+                    dirty = hashes1 != hashes2
+                diff_regions = [(slice(ty * self.tile_size, (ty + 1) * self.tile_size),
+                                 slice(tx * self.tile_size, (tx + 1) * self.tile_size))
+                                for ty, tx in zip(*np.nonzero(dirty))]
+                # 변경 없는 타일은 0 (np.zeros는 실제로 쓰기 전까지 메모리를 채우지 않음)
+                diff_array = np.zeros(arr1.shape, dtype=np.int16)
+            else:
+                dirty = None
+                diff_regions = self._row_bands(height, width)
+                diff_array = np.empty(arr1.shape, dtype=np.int16)
+
+            # 픽셀 단위 차이 계산 (int16 결과 배열에 영역별로 직접 기록)
+            def diff_region(rows, cols):
+                out = diff_array[rows, cols]
+                np.subtract(arr1[rows, cols], arr2[rows, cols], out=out, dtype=np.int16)
+                np.abs(out, out=out)
+
+            self._map_regions(diff_region, diff_regions)
+            self.diff_array = diff_array
+
+            if dirty is not None:
+                self._tile_crops = group_dirty_tiles(dirty, self.tile_size, height, width)
+                self._tile_source = diff_array
+                self.tile_summary = {
+                    'tile_size': self.tile_size,
+                    'tiles': int(dirty.size),
+                    'dirty_tiles': int(np.count_nonzero(dirty)),
+                    'regions': len(self._tile_crops),
+                    'computed_pixels': int(sum((rows.stop - rows.start) * (cols.stop - cols.start)
+                                               for rows, cols in self._tile_crops))
+                }
 
         return self.diff_array
 
-    def get_statistics(self, threshold: int = 10) -> dict:
+    def _cached_plane(self, name: str, compute) -> np.ndarray:
+        """diff_array에서 계산한 평면을 캐시하여 반환 (diff_array가 교체되면 무효화)"""
+        if self.diff_array is None:
+            self.calculate_difference()
+        if self._planes_source is not self.diff_array:
+            self._planes = {}
+            self._planes_source = self.diff_array
+        plane = self._planes.get(name)
+        if plane is None:
+            with self.stage(f'plane:{name}'):
+                plane = compute(self.diff_array)
+            self._planes[name] = plane
+        return plane
+
+    def _uncomputed_pixels(self, regions: List[Tuple[slice, slice]]) -> int:
+        """계산 영역 밖의 픽셀 수 (타일 모드에서 차이가 0인 픽셀)"""
+        height, width = self.diff_array.shape[:2]
+        computed = sum((rows.stop - rows.start) * (cols.stop - cols.start) for rows, cols in regions)
+        return height * width - computed
+
+    @property
+    def max_channel_diff(self) -> np.ndarray:
+        """픽셀별 최대 채널 차이 (uint8, H×W)
+
+        np.any(diff > t, axis=2)는 max_channel_diff > t와 같으므로
+        임계값 마스크는 이 평면 하나와의 2차원 비교로 만들 수 있습니다.
+        """
+        def compute(diff):
+            plane = np.zeros(diff.shape[:2], dtype=np.uint8)
+
+            def max_region(rows, cols):
+                # 길이 3인 축의 max 축소보다 채널끼리 np.maximum을 적용하는 편이 훨씬 빠름
+                region = diff[rows, cols]
+                region_max = np.maximum(region[:, :, 0], region[:, :, 1])
+                np.maximum(region_max, region[:, :, 2], out=region_max)
+                plane[rows, cols] = region_max
+
+            self._map_regions(max_region, self._plane_regions())
+            return plane
+        return self._cached_plane('max', compute)
+
+    @property
+    def mean_channel_diff(self) -> np.ndarray:
+        """픽셀별 평균 채널 차이 (uint8, H×W, 반올림)"""
+        def compute(diff):
+            plane = np.zeros(diff.shape[:2], dtype=np.uint8)
+
+            def mean_region(rows, cols):
+                region = diff[rows, cols]
+                # 세 채널 합은 최대 765이므로 int16 누산기로 충분
+                total = region[:, :, 0].astype(np.int16)
+                total += region[:, :, 1]
+                total += region[:, :, 2]
+                total += 1
+                total //= 3
+                plane[rows, cols] = total
+
+            self._map_regions(mean_region, self._plane_regions())
+            return plane
+        return self._cached_plane('mean', compute)
+
+    @property
+    def channel_histograms(self) -> np.ndarray:
+        """채널별 차이 값 히스토그램 (int64, 3×256)
+
+        채널마다 0/256/512를 더한 인덱스로 한 번의 bincount를 수행하므로,
+        diff_array를 연속된 메모리 순서로 한 번만 읽어 합계, 최대값, 제곱합을 모두 구할 수 있습니다.
+        """
+        def compute(diff):
+            offsets = np.array([0, 256, 512], dtype=np.intp)
+
+            def histogram_region(rows, cols):
+                flat = diff[rows, cols].reshape(-1, 3)
+                histogram = np.zeros(768, dtype=np.int64)
+                for offset in range(0, flat.shape[0], HISTOGRAM_BAND_PIXELS):
+                    chunk = flat[offset:offset + HISTOGRAM_BAND_PIXELS]
+                    histogram += np.bincount((chunk + offsets).ravel(), minlength=768)
+                return histogram
+
+            # 정수 히스토그램의 합이므로 영역 분할과 관계없이 결과가 같음
+            regions = self._plane_regions()
+            histograms = np.zeros(768, dtype=np.int64)
+            for histogram in self._map_regions(histogram_region, regions):
+                histograms += histogram
+            histograms = histograms.reshape(3, 256)
+            # 계산하지 않은 영역은 차이가 0
+            histograms[:, 0] += self._uncomputed_pixels(regions)
+            return histograms
+        return self._cached_plane('channel_hist', compute)
+
+    def get_statistics(self, threshold: int = 10, include_mse: bool = False) -> dict:
         """
         차이에 대한 통계를 계산합니다.
 
+        채널별 합계/최대값/제곱합은 캐시된 채널 히스토그램에서 정수 연산으로 계산하고,
+        변경 픽셀 수는 캐시된 최대 채널 평면에서 세므로 임계값만 바꿔 다시 호출하면
+        diff_array를 다시 읽지 않습니다.
+
         Args:
             threshold: 변경된 픽셀로 간주할 차이 임계값 (기본값: 10)
+            include_mse: True이면 채널별/전체 MSE와 PSNR(dB)도 함께 반환 (동일하면 PSNR은 inf)
         """
         if self.diff_array is None:
             self.calculate_difference()
 
-        # RGB 채널별 차이
-        r_diff = self.diff_array[:, :, 0]
-        g_diff = self.diff_array[:, :, 1]
-        b_diff = self.diff_array[:, :, 2]
+        histograms = self.channel_histograms
+        max_channel = self.max_channel_diff
+
+        with self.stage('stats'):
+            values = np.arange(256, dtype=np.int64)
+            channel_sums = histograms @ values
+            channel_squares = histograms @ (values * values)
+            nonzero = histograms > 0
+            # 값이 있는 가장 큰 구간 = 채널별 최대 차이
+            channel_max = 255 - np.argmax(nonzero[:, ::-1], axis=1)
+
+            # 전체 차이율 계산
+            total_pixels = self.diff_array.shape[0] * self.diff_array.shape[1]
+            max_possible_diff = total_pixels * 255 * 3  # RGB 3채널
+            actual_diff = int(channel_sums.sum())
+            diff_percentage = (actual_diff / max_possible_diff) * 100 if total_pixels else 0.0
+
+            # 변경된 픽셀 수 (임계값 기준, 최대 채널 차이 > 임계값)
+            changed_pixels = int(np.count_nonzero(max_channel > threshold))
+            changed_percentage = (changed_pixels / total_pixels) * 100 if total_pixels else 0.0
+
+            channel_means = channel_sums / total_pixels if total_pixels else np.zeros(3)
+            stats = {
+                'total_pixels': total_pixels,
+                'diff_percentage': diff_percentage,
+                'changed_pixels': changed_pixels,
+                'changed_percentage': changed_percentage,
+                'mean_diff': {
+                    'r': float(channel_means[0]),
+                    'g': float(channel_means[1]),
+                    'b': float(channel_means[2])
+                },
+                'max_diff': {
+                    'r': int(channel_max[0]) if nonzero[0].any() else 0,
+                    'g': int(channel_max[1]) if nonzero[1].any() else 0,
+                    'b': int(channel_max[2]) if nonzero[2].any() else 0
+                }
+            }
 
-        # 전체 차이율 계산
-        total_pixels = self.diff_array.shape[0] * self.diff_array.shape[1]
-        max_possible_diff = total_pixels * 255 * 3  # RGB 3채널
-        actual_diff = np.sum(self.diff_array)
-        diff_percentage = (actual_diff / max_possible_diff) * 100
+            if include_mse:
+                channel_mse = channel_squares / total_pixels if total_pixels else np.zeros(3)
+                mse = float(channel_squares.sum() / (total_pixels * 3)) if total_pixels else 0.0
+                stats['mse'] = {
+                    'r': float(channel_mse[0]),
+                    'g': float(channel_mse[1]),
+                    'b': float(channel_mse[2]),
+                    'total': mse
+                }
+                stats['psnr'] = float(10 * np.log10(255 ** 2 / mse)) if mse > 0 else float('inf')
 
-        # 변경된 픽셀 수 (임계값 기준)
-        diff_mask = np.any(self.diff_array > threshold, axis=2)
-        changed_pixels = np.sum(diff_mask)
-        changed_percentage = (changed_pixels / total_pixels) * 100
+        return stats
 
-        stats = {
-            'total_pixels': total_pixels,
-            'diff_percentage': diff_percentage,
-            'changed_pixels': changed_pixels,
-            'changed_percentage': changed_percentage,
-            'mean_diff': {
-                'r': np.mean(r_diff),
-                'g': np.mean(g_diff),
-                'b': np.mean(b_diff)
-            },
-            'max_diff': {
-                'r': np.max(r_diff),
-                'g': np.max(g_diff),
-                'b': np.max(b_diff)
-            }
-        }
+    def create_mask(self, threshold: int = 20, morphology_kernel_size: int = 0,
+                    blur_kernel_size: int = 0) -> np.ndarray:
+        """
+        차이가 임계값을 넘는 픽셀 마스크를 만들고 OpenCV 후처리를 적용합니다.
+        get_processed_statistics, create_diff_image('highlight'), find_changed_regions가
+        같은 마스크를 사용합니다.
 
-        return stats
+        Args:
+            threshold: 차이 임계값
+            morphology_kernel_size: 형태학적 연산 커널 크기 (0이면 비활성화)
+            blur_kernel_size: Gaussian blur 커널 크기 (0이면 비활성화)
+
+        Returns:
+            변경된 픽셀이 1인 uint8 마스크 (H×W)
+        """
+        if self.diff_array is None:
+            self.calculate_difference()
+
+        max_channel = self.max_channel_diff
+        crops = self._mask_regions(morphology_kernel_size, blur_kernel_size)
+
+        if crops is None:
+            return self._process_mask(max_channel, threshold, morphology_kernel_size,
+                                      blur_kernel_size)
+
+        # 타일 모드: 변경 영역만 처리하고 나머지는 0
+        diff_mask = np.zeros(max_channel.shape, dtype=np.uint8)
+        for rows, cols in crops:
+            diff_mask[rows, cols] = self._process_mask(max_channel[rows, cols], threshold,
+                                                       morphology_kernel_size, blur_kernel_size)
+        return diff_mask
+
+    def _mask_regions(self, morphology_kernel_size: int = 0,
+                      blur_kernel_size: int = 0) -> Optional[List[Tuple[slice, slice]]]:
+        """마스크를 영역별로 나눠 처리할 수 있으면 타일 영역 목록, 아니면 None
+
+        영역 여백(1타일)이 커널보다 커야 영역별 처리 결과가 전체 프레임과 같습니다.
+        """
+        crops = self._tile_regions()
+        if crops is None or max(morphology_kernel_size, blur_kernel_size + 1) >= self.tile_size:
+            return None
+        return crops
+
+    def _process_mask(self, max_channel: np.ndarray, threshold: int,
+                      morphology_kernel_size: int = 0, blur_kernel_size: int = 0) -> np.ndarray:
+        """최대 채널 차이 평면에 임계값, 형태학적 연산, 블러를 차례로 적용"""
+        with self.stage('mask'):
+            diff_mask = (max_channel > threshold).view(np.uint8)
+
+        # 형태학적 연산 적용 (노이즈 제거)
+        if morphology_kernel_size > 0:
+            with self.stage('morphology'):
+                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
+                                                   (morphology_kernel_size, morphology_kernel_size))
+                # Opening: erosion → dilation (작은 노이즈 제거)
+                diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel)
+
+        # Gaussian blur 적용 (외곽선 부드럽게)
+        if blur_kernel_size > 0:
+            with self.stage('blur'):
+                # blur_kernel_size는 홀수여야 함
+                if blur_kernel_size % 2 == 0:
+                    blur_kernel_size += 1
+                diff_mask_float = diff_mask.astype(np.float32)
+                diff_mask_blurred = cv2.GaussianBlur(diff_mask_float, (blur_kernel_size, blur_kernel_size), 0)
+                # threshold 다시 적용
+                diff_mask = (diff_mask_blurred > 0.5).astype(np.uint8)
+
+        return diff_mask
 
     def get_processed_statistics(self, threshold: int = 20,
                                  morphology_kernel_size: int = 0,
@@ -126,34 +614,21 @@ class ImageComparator:
 
         total_pixels = self.diff_array.shape[0] * self.diff_array.shape[1]
 
-        # 원본 마스크 생성 (create_diff_image의 'highlight' 모드와 동일)
-        diff_mask = np.any(self.diff_array > threshold, axis=2).astype(np.uint8)
+        # 처리된 마스크 생성 (create_diff_image의 'highlight' 모드와 동일)
+        diff_mask = self.create_mask(threshold, morphology_kernel_size, blur_kernel_size)
 
-        # 형태학적 연산 적용
-        if morphology_kernel_size > 0:
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
-                                               (morphology_kernel_size, morphology_kernel_size))
-            diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel)
+        with self.stage('processed_stats'):
+            # 처리된 마스크에서 통계 계산
+            changed_pixels = np.sum(diff_mask)
+            changed_percentage = (changed_pixels / total_pixels) * 100
 
-        # Gaussian blur 적용
-        if blur_kernel_size > 0:
-            if blur_kernel_size % 2 == 0:
-                blur_kernel_size += 1
-            diff_mask_float = diff_mask.astype(np.float32)
-            diff_mask_blurred = cv2.GaussianBlur(diff_mask_float, (blur_kernel_size, blur_kernel_size), 0)
-            diff_mask = (diff_mask_blurred > 0.5).astype(np.uint8)
-
-        # 처리된 마스크에서 통계 계산
-        changed_pixels = np.sum(diff_mask)
-        changed_percentage = (changed_pixels / total_pixels) * 100
-
-        # 처리된 영역의 실제 차이 계산
-        diff_mask_bool = diff_mask.astype(bool)
-        if changed_pixels > 0:
-            # 변경된 영역의 실제 픽셀 차이 합계
-            actual_diff_in_region = np.sum(self.diff_array[diff_mask_bool])
-        else:
-            actual_diff_in_region = 0
+            # 처리된 영역의 실제 차이 계산
+            diff_mask_bool = diff_mask.astype(bool)
+            if changed_pixels > 0:
+                # 변경된 영역의 실제 픽셀 차이 합계
+                actual_diff_in_region = np.sum(self.diff_array[diff_mask_bool])
+            else:
+                actual_diff_in_region = 0
 
         max_possible_diff = total_pixels * 255 * 3  # RGB 3채널
         diff_percentage = (actual_diff_in_region / max_possible_diff) * 100 if max_possible_diff > 0 else 0
@@ -170,13 +645,266 @@ class ImageComparator:
             }
         }
 
+    def exceeds_budget(self, budget_percentage: float, threshold: int = 20,
+                       metric: str = 'changed', band_rows: int = 256) -> dict:
+        """
+        변경 비율이 budget_percentage(%)를 넘는지 행 띠 단위로 확인하고,
+        결과가 확정되는 즉시 중단합니다.
+
+        띠마다 지금까지의 값으로 하한을, 남은 행이 모두 최대로 바뀌었다고 가정해 상한을
+        계산합니다. 하한이 예산을 넘으면 '초과', 상한이 예산 이하이면 '이내'로 확정됩니다.
+        바이트가 같은 띠는 차이를 계산하지 않습니다. diff_array가 이미 있으면 정확한 값을 사용합니다.
+
+        Args:
+            budget_percentage: 허용 비율 (%)
+            threshold: 변경된 픽셀로 간주할 차이 임계값 (metric='changed'에서 사용)
+            metric: 'changed' (changed_percentage) 또는 'diff' (diff_percentage)
+            band_rows: 한 번에 처리할 행 수 (기본값: 256)
+
+        Returns:
+            {'exceeds', 'lower_bound', 'upper_bound', 'rows_processed', 'total_rows', 'early_exit'}
+            (lower_bound/upper_bound는 %, 끝까지 처리하면 두 값이 같음)
+        """
+        if metric not in ('changed', 'diff'):
+            raise ValueError(f"지원하지 않는 기준: {metric}")
+        if self.img1 is None or self.img2 is None:
+            self.load_images()
+
+        width, height = self.img1.size
+        total_pixels = width * height
+        # 픽셀 하나가 기여할 수 있는 최대값 (변경 픽셀 수 또는 RGB 차이 합)
+        per_pixel_max = 1 if metric == 'changed' else 255 * 3
+        denominator = total_pixels * per_pixel_max
+
+        def verdict(accumulated: int, rows_done: int) -> dict:
+            remaining = (height - rows_done) * width * per_pixel_max
+            lower = accumulated / denominator * 100 if denominator else 0.0
+            upper = (accumulated + remaining) / denominator * 100 if denominator else 0.0
+            return {
+                'exceeds': lower > budget_percentage,
+                'lower_bound': lower,
+                'upper_bound': upper,
+                'rows_processed': rows_done,
+                'total_rows': height,
+                'early_exit': rows_done < height,
+                'metric': metric,
+                'budget_percentage': budget_percentage
+            }
+
+        if self.diff_array is not None:
+            stats = self.get_statistics(threshold)
+            accumulated = (stats['changed_pixels'] if metric == 'changed'
+                           else int((self.channel_histograms @ np.arange(256)).sum()))
+            return verdict(accumulated, height)
+
+        accumulated = 0
+        rows_done = 0
+        with self.stage('budget'):
+            for top in range(0, height, band_rows):
+                bottom = min(top + band_rows, height)
+                band1 = np.asarray(self.img1.crop((0, top, width, bottom)))
+                band2 = np.asarray(self.img2.crop((0, top, width, bottom)))
+
+                # 바이트가 같은 띠는 기여도 0
+                if not np.array_equal(band1, band2):
+                    band_diff = np.abs(band1.astype(np.int16) - band2.astype(np.int16))
+                    if metric == 'changed':
+                        band_max = np.maximum(band_diff[:, :, 0], band_diff[:, :, 1])
+                        np.maximum(band_max, band_diff[:, :, 2], out=band_max)
+                        accumulated += int(np.count_nonzero(band_max > threshold))
+                    else:
+                        accumulated += int(band_diff.sum(dtype=np.int64))
+                rows_done = bottom
+
+                result = verdict(accumulated, rows_done)
+                if result['exceeds'] or result['upper_bound'] <= budget_percentage:
+                    return result
+
+        return verdict(accumulated, rows_done)
+
+    def estimate_statistics(self, samples: int = 4096, threshold: int = 20,
+                            grid: int = 16, confidence: float = 0.95, seed: int = 0,
+                            escalate_boundaries: Optional[Sequence[float]] = None,
+                            escalate_metric: str = 'changed') -> dict:
+        """
+        층화 표본 추출로 diff_percentage와 changed_percentage를 추정합니다.
+
+        이미지를 grid×grid 칸으로 나누고 칸마다 같은 수의 픽셀을 무작위로 읽어
+        전체 차이 배열을 만들지 않고 추정값과 신뢰구간을 계산합니다.
+
+        Args:
+            samples: 읽을 픽셀 수 (칸 수로 나누어 배분, 기본값: 4096)
+            threshold: 변경된 픽셀로 간주할 차이 임계값
+            grid: 가로/세로 층 수 (기본값: 16, 이미지나 samples가 작으면 자동으로 줄어듦)
+            confidence: 신뢰수준 (기본값: 0.95)
+            seed: 난수 시드 (같은 시드면 같은 픽셀을 읽음)
+            escalate_boundaries: 판정 경계 (%) 목록. 신뢰구간이 경계를 포함하면 정확히 다시 계산
+            escalate_metric: 경계와 비교할 값 ('changed' 또는 'diff')
+
+        Returns:
+            {'diff_percentage': {...}, 'changed_percentage': {...}, 'samples', 'confidence', 'exact'}
+            각 값은 {'estimate', 'low', 'high'} (%). exact=True이면 정확한 계산 결과
+        """
+        if escalate_metric not in ('changed', 'diff'):
+            raise ValueError(f"지원하지 않는 기준: {escalate_metric}")
+        if self.img1 is None or self.img2 is None:
+            self.load_images()
+
+        width, height = self.img1.size
+        # 칸마다 최소 1픽셀을 읽으므로 칸 수가 samples를 넘지 않도록 격자를 줄임
+        side = max(1, min(grid, math.isqrt(max(1, samples))))
+        grid_rows = max(1, min(side, height))
+        grid_cols = max(1, min(side, width))
+        per_cell = max(1, samples // (grid_rows * grid_cols))
+        row_edges = np.linspace(0, height, grid_rows + 1).astype(int)
+        col_edges = np.linspace(0, width, grid_cols + 1).astype(int)
+
+        rng = np.random.default_rng(seed)
+        pixels1 = self.img1.load()
+        pixels2 = self.img2.load()
+
+        with self.stage('estimate'):
+            weights = []
+            changed_rates = []
+            changed_vars = []
+            diff_means = []
+            diff_vars = []
+            for r in range(grid_rows):
+                for c in range(grid_cols):
+                    top, bottom = row_edges[r], row_edges[r + 1]
+                    left, right = col_edges[c], col_edges[c + 1]
+                    ys = rng.integers(top, bottom, per_cell)
+                    xs = rng.integers(left, right, per_cell)
+                    values1 = np.array([pixels1[int(x), int(y)] for x, y in zip(xs, ys)], dtype=np.int16)
+                    values2 = np.array([pixels2[int(x), int(y)] for x, y in zip(xs, ys)], dtype=np.int16)
+                    sample_diff = np.abs(values1 - values2)
+
+                    changed = sample_diff.max(axis=1) > threshold
+                    # 픽셀별 차이율 (0~1)
+                    ratio = sample_diff.sum(axis=1) / (255 * 3)
+
+                    weights.append((bottom - top) * (right - left) / (width * height))
+                    changed_count = int(np.count_nonzero(changed))
+                    changed_rates.append(changed_count / per_cell)
+                    # 표본에서 변경이 하나도 없어도 구간이 0이 되지 않도록 보정한 비율로 분산 계산
+                    adjusted = (changed_count + 0.5) / (per_cell + 1)
+                    changed_vars.append(adjusted * (1 - adjusted) / per_cell)
+                    diff_means.append(float(ratio.mean()))
+                    variance = float(ratio.var(ddof=1)) if per_cell > 1 else 0.0
+                    if variance == 0.0:
+                        # 표본이 모두 같으면 [0, 1] 값의 분산 상한 μ(1-μ)을 보정한 평균으로 사용
+                        adjusted = (float(ratio.sum()) + 0.5) / (per_cell + 1)
+                        variance = adjusted * (1 - adjusted)
+                    diff_vars.append(variance / per_cell)
+
+            weights = np.array(weights)
+            z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+            def interval(means, variances):
+                estimate = float(weights @ np.array(means)) * 100
+                margin = z * float(np.sqrt((weights ** 2) @ np.array(variances))) * 100
+                return {
+                    'estimate': estimate,
+                    'low': max(0.0, estimate - margin),
+                    'high': min(100.0, estimate + margin)
+                }
+
+            result = {
+                'diff_percentage': interval(diff_means, diff_vars),
+                'changed_percentage': interval(changed_rates, changed_vars),
+                'samples': per_cell * len(weights),
+                'confidence': confidence,
+                'threshold': threshold,
+                'exact': False
+            }
+
+        if escalate_boundaries:
+            key = 'changed_percentage' if escalate_metric == 'changed' else 'diff_percentage'
+            low, high = result[key]['low'], result[key]['high']
+            if any(low <= boundary <= high for boundary in escalate_boundaries):
+                # 신뢰구간이 판정 경계에 걸치면 정확히 계산
+                exact = self.get_statistics(threshold)
+                for name in ('diff_percentage', 'changed_percentage'):
+                    value = float(exact[name])
+                    result[name] = {'estimate': value, 'low': value, 'high': value}
+                result['exact'] = True
+
+        return result
+
+    def get_max_channel_histogram(self) -> np.ndarray:
+        """
+        픽셀별 최대 채널 차이의 히스토그램 (길이 256)을 계산합니다.
+
+        np.any(diff > t, axis=2)는 max(R, G, B 차이) > t와 같으므로, 이 히스토그램
+        하나로 모든 임계값의 변경 픽셀 수를 구할 수 있습니다.
+        """
+        def compute(diff):
+            max_channel = self.max_channel_diff
+            regions = self._plane_regions()
+            histogram = np.zeros(256, dtype=np.int64)
+            for partial in self._map_regions(
+                    lambda rows, cols: np.bincount(max_channel[rows, cols].ravel(), minlength=256),
+                    regions):
+                histogram += partial
+            histogram[0] += self._uncomputed_pixels(regions)
+            return histogram
+        return self._cached_plane('max_hist', compute)
+
+    def get_threshold_sweep(self, thresholds: Sequence[int],
+                            morphology_kernel_size: int = 0,
+                            blur_kernel_size: int = 0) -> List[dict]:
+        """
+        여러 임계값의 변경 픽셀 통계를 한 번의 디코드/차이 계산으로 구합니다.
+
+        Args:
+            thresholds: 비교할 임계값 목록 (예: [20, 30, 40])
+            morphology_kernel_size: 0보다 크면 임계값마다 처리된 통계('processed')도 계산
+            blur_kernel_size: 0보다 크면 임계값마다 처리된 통계('processed')도 계산
+
+        Returns:
+            임계값별 {'threshold', 'changed_pixels', 'changed_percentage'[, 'processed']} 목록
+        """
+        histogram = self.get_max_channel_histogram()
+        total_pixels = int(histogram.sum())
+        # above[t] = 최대 채널 차이가 t보다 큰 픽셀 수
+        above = total_pixels - np.cumsum(histogram)
+
+        sweep = []
+        for threshold in thresholds:
+            if threshold < 0:
+                changed_pixels = total_pixels
+            elif threshold >= 255:
+                changed_pixels = 0
+            else:
+                changed_pixels = int(above[threshold])
+
+            entry = {
+                'threshold': int(threshold),
+                'changed_pixels': changed_pixels,
+                'changed_percentage': (changed_pixels / total_pixels) * 100 if total_pixels else 0.0
+            }
+
+            # 형태학적 연산/블러는 히스토그램으로 계산할 수 없으므로 마스크를 다시 만듦
+            if morphology_kernel_size > 0 or blur_kernel_size > 0:
+                processed = self.get_processed_statistics(threshold, morphology_kernel_size,
+                                                          blur_kernel_size)
+                entry['processed'] = {
+                    'changed_pixels': processed['changed_pixels'],
+                    'changed_percentage': processed['changed_percentage'],
+                    'diff_percentage': processed['diff_percentage']
+                }
+
+            sweep.append(entry)
+
+        return sweep
+
     def create_diff_image(self, mode: str = 'difference', threshold: int = 20,
                           morphology_kernel_size: int = 0, blur_kernel_size: int = 0) -> Image.Image:
         """
         차이를 시각화한 이미지를 생성합니다.
 
         Args:
-            mode: 시각화 모드 ('difference', 'highlight', 'heatmap')
+            mode: 시각화 모드 ('difference', 'highlight', 'heatmap', 'overlay')
             threshold: 차이 임계값 (기본값: 20)
             morphology_kernel_size: 형태학적 연산 커널 크기 (0이면 비활성화, 기본값: 0)
             blur_kernel_size: Gaussian blur 커널 크기 (0이면 비활성화, 기본값: 0)
@@ -186,62 +914,84 @@ class ImageComparator:
 
         if mode == 'difference':
             # 차이를 그대로 표시
-            diff_img = Image.fromarray(self.diff_array.astype('uint8'))
+            with self.stage('render:difference'):
+                diff_img = Image.fromarray(self.diff_array.astype('uint8'))
 
         elif mode == 'highlight':
-            # 차이가 있는 부분을 빨간색으로 강조
-            diff_mask = np.any(self.diff_array > threshold, axis=2).astype(np.uint8)
+            # 차이가 있는 부분을 빨간색으로 강조 (형태학적 연산/블러 포함)
+            diff_mask = self.create_mask(threshold, morphology_kernel_size, blur_kernel_size)
 
-            # 형태학적 연산 적용 (노이즈 제거)
-            if morphology_kernel_size > 0:
-                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
-                                                   (morphology_kernel_size, morphology_kernel_size))
-                # Opening: erosion → dilation (작은 노이즈 제거)
-                diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel)
+            with self.stage('render:highlight'):
+                # Boolean mask로 변환
+                diff_mask_bool = diff_mask.astype(bool)
 
-            # Gaussian blur 적용 (외곽선 부드럽게)
-            if blur_kernel_size > 0:
-                # blur_kernel_size는 홀수여야 함
-                if blur_kernel_size % 2 == 0:
-                    blur_kernel_size += 1
-                diff_mask_float = diff_mask.astype(np.float32)
-                diff_mask_blurred = cv2.GaussianBlur(diff_mask_float, (blur_kernel_size, blur_kernel_size), 0)
-                # threshold 다시 적용
-                diff_mask = (diff_mask_blurred > 0.5).astype(np.uint8)
+                # 원본 이미지를 회색조로 변환 (기준 이미지는 미리 변환된 배열 재사용)
+                if self.baseline is not None:
+                    base_array = self.baseline.gray_array
+                else:
+                    base_img = self.img1.convert('L').convert('RGB')
+                    base_array = np.array(base_img)
 
-            # Boolean mask로 변환
-            diff_mask_bool = diff_mask.astype(bool)
+                # 차이가 있는 부분을 빨간색으로 표시
+                highlight_array = base_array.copy()
+                highlight_array[diff_mask_bool] = [255, 0, 0]
 
-            # 원본 이미지를 회색조로 변환
-            base_img = self.img1.convert('L').convert('RGB')
-            base_array = np.array(base_img)
+                diff_img = Image.fromarray(highlight_array.astype('uint8'))
 
-            # 차이가 있는 부분을 빨간색으로 표시
-            highlight_array = base_array.copy()
-            highlight_array[diff_mask_bool] = [255, 0, 0]
+        elif mode == 'overlay':
+            # highlight와 같은 마스크를 원본 없이 투명 배경 위 빨간 점으로만 표시
+            diff_mask = self.create_mask(threshold, morphology_kernel_size, blur_kernel_size)
 
-            diff_img = Image.fromarray(highlight_array.astype('uint8'))
+            with self.stage('render:overlay'):
+                diff_img = self.create_overlay_image(diff_mask)
 
         elif mode == 'heatmap':
-            # 차이 강도를 히트맵으로 표시
-            diff_intensity = np.mean(self.diff_array, axis=2)
+            # 차이 강도를 히트맵으로 표시 (캐시된 uint8 평균 평면 사용)
+            diff_intensity = self.mean_channel_diff
 
-            # 정규화 (0-255)
-            normalized = (diff_intensity / diff_intensity.max() * 255 if diff_intensity.max() > 0
-                         else diff_intensity)
+            with self.stage('render:heatmap'):
+                # 정규화 (0-255), 255 × 255는 uint16 범위 안이므로 정수 연산으로 처리
+                peak = int(diff_intensity.max())
+                if peak > 0:
+                    normalized = (diff_intensity.astype(np.uint16) * 255 // peak).astype(np.uint8)
+                else:
+                    normalized = diff_intensity
 
-            # 히트맵 색상 적용 (파란색 -> 빨간색)
-            heatmap = np.zeros((normalized.shape[0], normalized.shape[1], 3), dtype=np.uint8)
-            heatmap[:, :, 0] = normalized  # Red channel
-            heatmap[:, :, 2] = 255 - normalized  # Blue channel
+                # 히트맵 색상 적용 (파란색 -> 빨간색)
+                heatmap = np.zeros((normalized.shape[0], normalized.shape[1], 3), dtype=np.uint8)
+                heatmap[:, :, 0] = normalized  # Red channel
+                heatmap[:, :, 2] = 255 - normalized  # Blue channel
 
-            diff_img = Image.fromarray(heatmap)
+                diff_img = Image.fromarray(heatmap)
 
         else:
             raise ValueError(f"지원하지 않는 모드: {mode}")
 
         return diff_img
 
+    @staticmethod
+    def create_overlay_image(mask: np.ndarray, color: Tuple[int, int, int] = (255, 0, 0)) -> Image.Image:
+        """마스크를 투명 배경 + 한 가지 색의 2색 팔레트 이미지로 변환
+
+        팔레트가 2색이므로 PNG로 저장하면 1비트 이미지가 되어 highlight보다 훨씬 작고 빨리 인코딩됩니다.
+        뷰어에서 원본 이미지(URL) 위에 겹쳐 표시하면 highlight와 같은 위치가 강조됩니다.
+        """
+        overlay = Image.fromarray(mask.astype(bool).view(np.uint8), 'P')
+        overlay.putpalette([0, 0, 0, *color])
+        overlay.info['transparency'] = 0
+        return overlay
+
+    def save_image(self, image: Image.Image, path: str, name: Optional[str] = None) -> str:
+        """이미지를 인코딩 프로필로 저장하고 'save:<name>' 단계로 측정 (name 기본값: 파일명)
+
+        Returns:
+            실제 저장 경로 (프로필에 따라 확장자가 바뀜)
+        """
+        if name is None:
+            name = os.path.splitext(os.path.basename(path))[0]
+        with self.stage(f'save:{name}'):
+            return encode_image(image, path, self.encoding)
+
     def find_changed_regions(self, threshold: int = 20, min_area: int = 100,
                             morphology_kernel_size: int = 0) -> list:
         """
@@ -255,63 +1005,69 @@ class ImageComparator:
         if self.diff_array is None:
             self.calculate_difference()
 
-        # 차이가 임계값 이상인 픽셀 마스크
-        diff_mask = np.any(self.diff_array > threshold, axis=2).astype(np.uint8)
+        # 차이가 임계값 이상인 픽셀 마스크 (형태학적 연산으로 노이즈 제거)
+        diff_mask = self.create_mask(threshold, morphology_kernel_size)
 
-        # 형태학적 연산 적용 (노이즈 제거)
-        if morphology_kernel_size > 0:
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
-                                               (morphology_kernel_size, morphology_kernel_size))
-            # Opening: erosion → dilation (작은 노이즈 제거)
-            diff_mask = cv2.morphologyEx(diff_mask, cv2.MORPH_OPEN, kernel)
-
-        # 연결된 컴포넌트 찾기 (간단한 구현)
-        from scipy import ndimage
-        labeled_array, num_features = ndimage.label(diff_mask)
-
-        regions = []
-        for i in range(1, num_features + 1):
-            component = (labeled_array == i)
-            if np.sum(component) >= min_area:
-                rows, cols = np.where(component)
-                regions.append({
-                    'x': int(np.min(cols)),
-                    'y': int(np.min(rows)),
-                    'width': int(np.max(cols) - np.min(cols) + 1),
-                    'height': int(np.max(rows) - np.min(rows) + 1),
-                    'area': int(np.sum(component))
-                })
-
-        return regions
-
-    def save_comparison_report(self, output_dir: str = 'comparison_results'):
-        """종합 비교 리포트를 저장합니다."""
-        # 출력 디렉토리 생성
-        os.makedirs(output_dir, exist_ok=True)
+        # 타일 모드에서는 영역끼리 떨어져 있으므로 영역별로 라벨링
+        crops = self._mask_regions(morphology_kernel_size)
+        if crops is None:
+            crops = [(slice(0, diff_mask.shape[0]), slice(0, diff_mask.shape[1]))]
 
-        # 통계 정보 가져오기
-        stats = self.get_statistics()
+        with self.stage('label'):
+            found = []
+            for rows, cols in crops:
+                found.extend(label_regions(diff_mask[rows, cols], min_area,
+                                           rows.start, cols.start))
+            # 전체 프레임 라벨 순서 (첫 픽셀의 래스터 순서)와 같게 정렬
+            found.sort(key=lambda item: item[0])
 
-        # 차이 이미지들 생성 및 저장
-        diff_img = self.create_diff_image('difference')
-        diff_img.save(os.path.join(output_dir, 'difference.png'))
+        return [region for _, region in found]
 
-        highlight_img = self.create_diff_image('highlight')
-        highlight_img.save(os.path.join(output_dir, 'highlight.png'))
+    def save_comparison_report(self, output_dir: str = 'comparison_results',
+                               outputs: Optional[Sequence[str]] = None):
+        """종합 비교 리포트를 저장합니다.
+
+        Args:
+            output_dir: 저장할 디렉토리
+            outputs: 만들 파일 (REPORT_OUTPUTS 중 일부, None이면 전체, 빈 목록이면 통계만 출력)
+        """
+        if outputs is None:
+            outputs = self.REPORT_OUTPUTS
+        if outputs:
+            # 출력 디렉토리 생성
+            os.makedirs(output_dir, exist_ok=True)
+
+        # 통계 정보 가져오기
+        stats = self.get_statistics()
 
-        heatmap_img = self.create_diff_image('heatmap')
-        heatmap_img.save(os.path.join(output_dir, 'heatmap.png'))
+        # 요청한 차이 이미지만 생성 (저장은 아래에서 한꺼번에)
+        images = []
+        for mode in ('difference', 'highlight', 'heatmap', 'overlay'):
+            if mode in outputs:
+                images.append((self.create_diff_image(mode), os.path.join(output_dir, f'{mode}.png')))
 
         # 변경된 영역 찾기
         regions = self.find_changed_regions()
 
         # 변경 영역 표시 이미지 생성
-        region_img = self.img1.copy()
-        draw = ImageDraw.Draw(region_img)
-        for region in regions:
-            x, y, w, h = region['x'], region['y'], region['width'], region['height']
-            draw.rectangle([x, y, x+w, y+h], outline='red', width=2)
-        region_img.save(os.path.join(output_dir, 'regions.png'))
+        if 'regions' in outputs:
+            with self.stage('render:regions'):
+                region_img = self.img1.copy()
+                draw = ImageDraw.Draw(region_img)
+                for region in regions:
+                    x, y, w, h = region['x'], region['y'], region['width'], region['height']
+                    draw.rectangle([x, y, x+w, y+h], outline='red', width=2)
+            images.append((region_img, os.path.join(output_dir, 'regions.png')))
+
+        if self.threads > 1 and len(images) > 1:
+            # 인코딩을 스레드 풀에서 동시에 진행
+            with self.stage('save'):
+                with ArtifactEncoder(self.encoding, workers=self.threads) as encoder:
+                    for image, path in images:
+                        encoder.submit(image, path)
+        else:
+            for image, path in images:
+                self.save_image(image, path)
 
         # 텍스트 리포트 생성
         report = f"""이미지 비교 리포트
@@ -350,11 +1106,13 @@ Blue:  {stats['max_diff']['b']}
             report += f"\n  면적: {region['area']} pixels"
 
         # 리포트 저장
-        with open(os.path.join(output_dir, 'report.txt'), 'w', encoding='utf-8') as f:
-            f.write(report)
+        if 'report' in outputs:
+            with open(os.path.join(output_dir, 'report.txt'), 'w', encoding='utf-8') as f:
+                f.write(report)
 
         print(report)
-        print(f"\n✅ 비교 결과가 '{output_dir}' 디렉토리에 저장되었습니다.")
+        if outputs:
+            print(f"\n✅ 비교 결과가 '{output_dir}' 디렉토리에 저장되었습니다.")
 
         return stats, regions
 
@@ -373,6 +1131,68 @@ Blue:  {stats['max_diff']['b']}
         if self.diff_array is None:
             self.calculate_difference()
 
+        # 차이/하이라이트 이미지는 각자의 단계로 측정
+        diff_img = self.create_diff_image('difference')
+        highlight_img = self.create_diff_image(
+            'highlight',
+            threshold=threshold,
+            morphology_kernel_size=morphology_kernel_size,
+            blur_kernel_size=blur_kernel_size
+        )
+
+        output_path = artifact_path(output_path, self.encoding)
+        with self.stage('render:side_by_side'):
+            self._plot_side_by_side(output_path, diff_img, highlight_img)
+
+        print(f"✅ 비교 이미지가 '{output_path}'에 저장되었습니다.")
+        return output_path
+
+    def create_side_by_side_rendition(self, max_width: int = 600, threshold: int = 20,
+                                      morphology_kernel_size: int = 0, blur_kernel_size: int = 0,
+                                      max_height: Optional[int] = None, gap: int = 4) -> Image.Image:
+        """
+        시트 셀 표시용 나란히 비교 축소본을 matplotlib 없이 만듭니다.
+
+        create_side_by_side_comparison과 같은 4개 패널(이미지 1, 이미지 2, 픽셀 차이, 변경 영역 강조)을
+        제목 없이 가로로 붙이며, 각 패널은 create_rendition으로 줄여 작은 변경 영역도 보이게 합니다.
+
+        Args:
+            max_width: 전체 가로 최대 크기
+            threshold: 차이 임계값
+            morphology_kernel_size: 형태학적 연산 커널 크기
+            blur_kernel_size: 가우시안 블러 커널 크기
+            max_height: 세로 최대 크기 (기본값: 제한 없음)
+            gap: 패널 사이 간격 (픽셀)
+        """
+        if self.diff_array is None:
+            self.calculate_difference()
+
+        diff_img = self.create_diff_image('difference')
+        highlight_img = self.create_diff_image(
+            'highlight',
+            threshold=threshold,
+            morphology_kernel_size=morphology_kernel_size,
+            blur_kernel_size=blur_kernel_size
+        )
+        mask = self.create_mask(threshold, morphology_kernel_size, blur_kernel_size)
+
+        with self.stage('render:side_by_side_rendition'):
+            panel_size = rendition_size(self.img1.size, max(1, (max_width - 3 * gap) // 4),
+                                        max_height or self.img1.size[1])
+            panels = [create_rendition(self.img1, *panel_size),
+                      create_rendition(self.img2, *panel_size),
+                      create_rendition(diff_img, *panel_size, mask=np.zeros(mask.shape, dtype=bool)),
+                      create_rendition(highlight_img, *panel_size, mask=mask)]
+
+            width, height = panel_size
+            strip = Image.new('RGB', (4 * width + 3 * gap, height), 'white')
+            for index, panel in enumerate(panels):
+                strip.paste(panel.convert('RGB'), (index * (width + gap), 0))
+        return strip
+
+    def _plot_side_by_side(self, output_path: str, diff_img: Image.Image,
+                           highlight_img: Image.Image):
+        """원본 2장, 차이, 하이라이트를 1×4 그림으로 저장"""
         fig, axes = plt.subplots(1, 4, figsize=(20, 5))
 
         # 원본 이미지 1
@@ -386,45 +1206,855 @@ Blue:  {stats['max_diff']['b']}
         axes[1].axis('off')
 
         # 차이 이미지
-        diff_img = self.create_diff_image('difference')
         axes[2].imshow(diff_img)
         axes[2].set_title('픽셀 차이')
         axes[2].axis('off')
 
         # 하이라이트 이미지 (새로운 파라미터 적용)
-        highlight_img = self.create_diff_image(
-            'highlight',
-            threshold=threshold,
-            morphology_kernel_size=morphology_kernel_size,
-            blur_kernel_size=blur_kernel_size
-        )
         axes[3].imshow(highlight_img)
         axes[3].set_title('변경 영역 강조')
         axes[3].axis('off')
 
         plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
+        # 그림은 색이 많으므로 팔레트 변환 없이 프로필의 형식/압축 옵션만 적용
+        options = get_profile(self.encoding)['options']
+        plt.savefig(output_path, dpi=150, bbox_inches='tight', pil_kwargs=options or None)
         plt.close()
 
-        print(f"✅ 비교 이미지가 '{output_path}'에 저장되었습니다.")
+
+class BaselineComparator:
+    """기준 이미지 하나를 여러 후보 이미지와 비교합니다.
+
+    기준 이미지는 한 번만 디코드하고, RGB 배열과 하이라이트용 회색조 배열,
+    타일 해시를 메모리에 유지하여 후보마다 다시 계산하지 않습니다.
+    """
+
+    def __init__(self, baseline_path: str, profiler: Optional[StageProfiler] = None,
+                 threads: int = 1, tile_size: int = 0):
+        """
+        Args:
+            baseline_path: 기준 이미지 경로
+            profiler: 지정하면 모든 비교의 단계별 시간/메모리를 함께 기록
+            threads: 후보별 ImageComparator의 스레드 수
+            tile_size: 후보별 ImageComparator의 타일 크기 (0이면 비활성화)
+        """
+        self.baseline_path = baseline_path
+        self.profiler = profiler
+        self.threads = threads
+        self.tile_size = tile_size
+        self._tile_hashes: Dict[int, np.ndarray] = {}
+
+        stage = profiler.stage('baseline') if profiler is not None else _NO_STAGE
+        with stage:
+            try:
+                self.image = Image.open(baseline_path).convert('RGB')
+            except FileNotFoundError as e:
+                raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {e}")
+
+            # 후보 비교에서 공유하므로 실수로 바뀌지 않도록 읽기 전용으로 고정
+            self.array = np.array(self.image)
+            self.array.flags.writeable = False
+            self.gray_array = np.array(self.image.convert('L').convert('RGB'))
+            self.gray_array.flags.writeable = False
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """기준 이미지 크기 (너비, 높이)"""
+        return self.image.size
+
+    def get_tile_hashes(self, tile_size: int) -> np.ndarray:
+        """기준 이미지의 타일 해시 (타일 크기별로 한 번만 계산)"""
+        hashes = self._tile_hashes.get(tile_size)
+        if hashes is None:
+            hashes = tile_hashes(self.array, tile_size)
+            self._tile_hashes[tile_size] = hashes
+        return hashes
+
+    def compare(self, candidate_path: str) -> ImageComparator:
+        """후보 이미지 하나와 비교할 ImageComparator 생성 (후보만 디코드)"""
+        return ImageComparator(self.baseline_path, candidate_path, profiler=self.profiler,
+                               threads=self.threads, tile_size=self.tile_size, baseline=self)
+
+    def iter_compare(self, candidate_paths: Iterable[str]) -> Iterator[ImageComparator]:
+        """후보 이미지를 하나씩 비교 (한 번에 후보 하나만 메모리에 유지)"""
+        for candidate_path in candidate_paths:
+            yield self.compare(candidate_path)
+
+    def compare_batch(self, candidate_paths: Iterable[str],
+                      batch_size: int = 8) -> Iterator[ImageComparator]:
+        """후보를 batch_size개씩 쌓아 (N, H, W, 3) 배열 하나로 차이를 계산
+
+        차이는 배치마다 한 번의 벡터 연산으로 구하고, 반환되는 ImageComparator의
+        diff_array는 배치 배열의 뷰입니다. 타일 모드에서는 후보마다 따로 계산합니다.
+
+        Yields:
+            차이가 계산된 ImageComparator (입력 순서)
+        """
+        paths = list(candidate_paths)
+        for start in range(0, len(paths), batch_size):
+            comparators = [self.compare(path) for path in paths[start:start + batch_size]]
+            for comparator in comparators:
+                comparator.load_images()
+
+            if self.tile_size > 0:
+                for comparator in comparators:
+                    comparator.calculate_difference()
+                    yield comparator
+                continue
+
+            stage = self.profiler.stage('diff') if self.profiler is not None else _NO_STAGE
+            with stage:
+                stacked = np.stack([np.asarray(comparator.img2) for comparator in comparators])
+                diff = np.empty(stacked.shape, dtype=np.int16)
+                np.subtract(stacked, self.array[np.newaxis], out=diff, dtype=np.int16)
+                np.abs(diff, out=diff)
+            del stacked
+
+            for index, comparator in enumerate(comparators):
+                comparator.diff_array = diff[index]
+                yield comparator
+
+
+class VersionStackComparator:
+    """같은 이미지의 여러 버전(v1, v2, ..., vN)을 한 배열로 쌓아 한 번에 비교합니다.
+
+    각 버전은 한 번만 디코드하고 (N, H, W, 3) 배열에서 연속 버전 간 차이와
+    첫 버전 대비 차이를 각각 한 번의 벡터 연산으로 계산합니다. 버전 쌍마다
+    diff_array가 스택의 뷰인 ImageComparator를 돌려주므로 통계/렌더링은 그대로 사용합니다.
+    """
+
+    def __init__(self, image_paths: Sequence[str], profiler: Optional[StageProfiler] = None):
+        """
+        Args:
+            image_paths: 버전 순서대로 정렬된 이미지 경로 (2개 이상)
+            profiler: 지정하면 단계별 시간/메모리를 기록
+        """
+        if len(image_paths) < 2:
+            raise ValueError("버전 비교에는 이미지가 2개 이상 필요합니다.")
+        self.image_paths = list(image_paths)
+        self.profiler = profiler
+        self.images: Optional[List[Image.Image]] = None
+        self.stack: Optional[np.ndarray] = None
+        self._consecutive: Optional[np.ndarray] = None
+        self._from_first: Optional[np.ndarray] = None
+
+    def stage(self, name: str):
+        """profiler가 있으면 name 단계로 측정하는 컨텍스트, 없으면 빈 컨텍스트"""
+        if self.profiler is None:
+            return _NO_STAGE
+        return self.profiler.stage(name)
+
+    def load_images(self) -> np.ndarray:
+        """모든 버전을 한 번씩 디코드하여 첫 버전 크기로 맞춘 뒤 (N, H, W, 3)로 쌓습니다."""
+        images = []
+        try:
+            with self.stage('decode'):
+                for path in self.image_paths:
+                    images.append(Image.open(path).convert('RGB'))
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {e}")
+
+        size = images[0].size
+        for index, image in enumerate(images[1:], 1):
+            if image.size != size:
+                print(f"⚠️  이미지 크기 차이 감지: {size} vs {image.size} (v{index + 1})")
+                print(f"   v{index + 1}을(를) v1 크기로 리사이즈합니다.")
+                with self.stage('resize'):
+                    images[index] = image.resize(size, Image.Resampling.LANCZOS)
+
+        with self.stage('stack'):
+            self.stack = np.stack([np.asarray(image) for image in images])
+        self.images = images
+        return self.stack
+
+    @staticmethod
+    def _abs_diff(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """uint8 배열 두 개의 절대 차이 (int16, 중간 배열 없이)"""
+        diff = np.empty(a.shape, dtype=np.int16)
+        np.subtract(a, b, out=diff, dtype=np.int16)
+        np.abs(diff, out=diff)
+        return diff
+
+    @property
+    def consecutive_diffs(self) -> np.ndarray:
+        """연속 버전 간 채널별 절대 차이 (N-1, H, W, 3), i번째는 v(i+1) → v(i+2)"""
+        if self._consecutive is None:
+            if self.stack is None:
+                self.load_images()
+            with self.stage('diff:consecutive'):
+                self._consecutive = self._abs_diff(self.stack[1:], self.stack[:-1])
+        return self._consecutive
+
+    @property
+    def first_diffs(self) -> np.ndarray:
+        """첫 버전 대비 채널별 절대 차이 (N-1, H, W, 3), i번째는 v1 → v(i+2)"""
+        if self._from_first is None:
+            if self.stack is None:
+                self.load_images()
+            with self.stage('diff:first'):
+                self._from_first = self._abs_diff(self.stack[1:], self.stack[:1])
+        return self._from_first
+
+    def _pair(self, first: int, second: int, diff: np.ndarray) -> ImageComparator:
+        comparator = ImageComparator(self.image_paths[first], self.image_paths[second],
+                                     profiler=self.profiler)
+        comparator.img1 = self.images[first]
+        comparator.img2 = self.images[second]
+        comparator.diff_array = diff
+        return comparator
+
+    def consecutive_comparators(self) -> List[ImageComparator]:
+        """v1→v2, v2→v3, ... 쌍의 ImageComparator (차이는 이미 계산됨)"""
+        diffs = self.consecutive_diffs
+        return [self._pair(i, i + 1, diffs[i]) for i in range(len(diffs))]
+
+    def first_comparators(self) -> List[ImageComparator]:
+        """v1→v2, v1→v3, ... 쌍의 ImageComparator (차이는 이미 계산됨)"""
+        diffs = self.first_diffs
+        return [self._pair(0, i + 1, diffs[i]) for i in range(len(diffs))]
+
+    def get_introduced_map(self, threshold: int = 20) -> np.ndarray:
+        """픽셀마다 처음 바뀐 버전 번호 (H, W) 지도
+
+        연속 버전 간 최대 채널 차이가 임계값을 넘는 첫 버전의 번호(2..N)이며,
+        한 번도 바뀌지 않은 픽셀은 0입니다.
+        """
+        diffs = self.consecutive_diffs
+        with self.stage('introduced'):
+            changed = diffs[..., 0] > threshold
+            changed |= diffs[..., 1] > threshold
+            changed |= diffs[..., 2] > threshold
+            introduced = np.argmax(changed, axis=0).astype(np.uint16) + 2
+            introduced[~changed.any(axis=0)] = 0
+        return introduced
+
+    def get_version_statistics(self, threshold: int = 20) -> List[dict]:
+        """버전별 통계 (이전 버전 대비, 첫 버전 대비, 이 버전이 처음 바꾼 픽셀 수)"""
+        introduced = self.get_introduced_map(threshold)
+        introduced_counts = np.bincount(introduced.ravel(), minlength=len(self.image_paths) + 1)
+        total_pixels = introduced.size
+
+        results = []
+        for index, (previous, first) in enumerate(zip(self.consecutive_comparators(),
+                                                      self.first_comparators()), 2):
+            introduced_pixels = int(introduced_counts[index])
+            results.append({
+                'version': index,
+                'path': self.image_paths[index - 1],
+                'vs_previous': previous.get_statistics(threshold),
+                'vs_first': first.get_statistics(threshold),
+                'introduced_pixels': introduced_pixels,
+                'introduced_percentage': introduced_pixels / total_pixels * 100 if total_pixels else 0.0,
+            })
+        return results
+
+    def create_introduced_image(self, threshold: int = 20) -> Image.Image:
+        """마지막 버전의 회색조 위에 처음 바뀐 버전별로 다른 색을 칠한 이미지"""
+        introduced = self.get_introduced_map(threshold)
+        with self.stage('render:introduced'):
+            base = np.array(self.images[-1].convert('L').convert('RGB'))
+            colors = (plt.get_cmap('tab10')(np.arange(10))[:, :3] * 255).astype(np.uint8)
+            changed = introduced > 0
+            base[changed] = colors[(introduced[changed] - 2) % len(colors)]
+        return Image.fromarray(base)
+
+
+class FrameSequenceComparator:
+    """애니메이션 GIF/APNG, 여러 페이지 TIFF의 프레임을 차례로 비교합니다.
+
+    파일 하나만 주면 연속 프레임(i → i+1)을, 두 파일을 주면 같은 번호의 프레임끼리
+    비교합니다. 프레임은 필요할 때 하나씩 디코드하며, 연속 비교에서는 디코드한 프레임을
+    다음 비교의 왼쪽으로 재사용합니다. RGB 바이트 해시가 같은 프레임 쌍은 차이를 계산하지 않습니다.
+    """
+
+    def __init__(self, sequence_path: str, other_path: Optional[str] = None,
+                 profiler: Optional[StageProfiler] = None, threads: int = 1,
+                 tile_size: int = 0):
+        """
+        Args:
+            sequence_path: 애니메이션/여러 페이지 이미지 경로
+            other_path: 지정하면 sequence_path와 같은 번호의 프레임끼리 비교
+            profiler: 지정하면 단계별 시간/메모리를 기록
+            threads: 프레임 쌍별 ImageComparator의 스레드 수
+            tile_size: 프레임 쌍별 ImageComparator의 타일 크기 (0이면 타일 비교 안 함)
+        """
+        self.sequence_path = sequence_path
+        self.other_path = other_path
+        self.profiler = profiler
+        self.threads = threads
+        self.tile_size = tile_size
+
+    def stage(self, name: str):
+        """profiler가 있으면 name 단계로 측정하는 컨텍스트, 없으면 빈 컨텍스트"""
+        if self.profiler is None:
+            return _NO_STAGE
+        return self.profiler.stage(name)
+
+    @staticmethod
+    def frame_count(path: str) -> int:
+        """프레임을 디코드하지 않고 파일의 프레임 수 반환 (단일 프레임 형식은 1)"""
+        try:
+            image = Image.open(path)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {e}")
+        with image:
+            return getattr(image, 'n_frames', 1)
+
+    def iter_frames(self, path: str) -> Iterator[Tuple[Image.Image, bytes]]:
+        """프레임을 하나씩 디코드하여 (RGB 이미지, RGB 바이트 해시)를 반환"""
+        try:
+            image = Image.open(path)
+        except FileNotFoundError as e:
+            raise FileNotFoundError(f"이미지 파일을 찾을 수 없습니다: {e}")
+
+        with image:
+            for frame in ImageSequence.Iterator(image):
+                with self.stage('decode'):
+                    rgb = frame.convert('RGB')
+                with self.stage('frame_hash'):
+                    digest = hashlib.blake2b(rgb.tobytes(), digest_size=16).digest()
+                yield rgb, digest
+
+    def _iter_pairs(self) -> Iterator[Tuple[int, int, Tuple[Image.Image, bytes], Tuple[Image.Image, bytes]]]:
+        """비교할 (왼쪽 번호, 오른쪽 번호, 왼쪽 프레임, 오른쪽 프레임)을 차례로 생성"""
+        if self.other_path is None:
+            previous = None
+            for index, frame in enumerate(self.iter_frames(self.sequence_path)):
+                if previous is not None:
+                    yield index - 1, index, previous, frame
+                # 디코드한 프레임을 다음 비교의 왼쪽으로 재사용
+                previous = frame
+            return
+
+        # 프레임 수는 헤더에서 읽고, 공통 프레임만 디코드
+        left_count = self.frame_count(self.sequence_path)
+        right_count = self.frame_count(self.other_path)
+        if left_count != right_count:
+            print(f"⚠️  프레임 수 차이: 앞쪽 {left_count}개 vs 뒤쪽 {right_count}개, "
+                  f"공통 프레임 {min(left_count, right_count)}개만 비교합니다.")
+        common = min(left_count, right_count)
+        left_frames = itertools.islice(self.iter_frames(self.sequence_path), common)
+        right_frames = itertools.islice(self.iter_frames(self.other_path), common)
+        for index, (left, right) in enumerate(zip(left_frames, right_frames)):
+            yield index, index, left, right
+
+    @staticmethod
+    def _identical_statistics(total_pixels: int) -> dict:
+        """동일한 프레임 쌍의 get_statistics 결과 (차이를 계산하지 않음)"""
+        return {
+            'total_pixels': total_pixels,
+            'diff_percentage': 0.0,
+            'changed_pixels': 0,
+            'changed_percentage': 0.0,
+            'mean_diff': {'r': 0.0, 'g': 0.0, 'b': 0.0},
+            'max_diff': {'r': 0, 'g': 0, 'b': 0},
+        }
+
+    def iter_statistics(self, threshold: int = 20) -> Iterator[dict]:
+        """프레임 쌍마다 통계를 계산하여 하나씩 반환
+
+        Yields:
+            {'left_frame', 'right_frame', 'identical', 'stats'}
+        """
+        for left_index, right_index, (left, left_digest), (right, right_digest) in self._iter_pairs():
+            identical = left_digest == right_digest and left.size == right.size
+            if identical:
+                stats = self._identical_statistics(left.size[0] * left.size[1])
+            else:
+                comparator = ImageComparator(
+                    f"{self.sequence_path}#{left_index}",
+                    f"{self.other_path or self.sequence_path}#{right_index}",
+                    profiler=self.profiler, threads=self.threads, tile_size=self.tile_size)
+                comparator.img1 = left
+                comparator.img2 = right
+                if left.size != right.size:
+                    with self.stage('resize'):
+                        comparator.img2 = right.resize(left.size, Image.Resampling.LANCZOS)
+                stats = comparator.get_statistics(threshold)
+            yield {
+                'left_frame': left_index,
+                'right_frame': right_index,
+                'identical': identical,
+                'stats': stats,
+            }
+
+    @staticmethod
+    def aggregate(frames: List[dict]) -> dict:
+        """프레임별 결과를 합산 (평균/최대 차이율, 변경 픽셀 합계, 건너뛴 쌍 수)"""
+        if not frames:
+            return {'pairs': 0, 'identical_pairs': 0, 'changed_pixels': 0,
+                    'mean_diff_percentage': 0.0, 'max_diff_percentage': 0.0,
+                    'mean_changed_percentage': 0.0, 'max_changed_frame': None}
+
+        diff_percentages = [frame['stats']['diff_percentage'] for frame in frames]
+        changed_percentages = [frame['stats']['changed_percentage'] for frame in frames]
+        worst = max(frames, key=lambda frame: frame['stats']['changed_percentage'])
+        return {
+            'pairs': len(frames),
+            'identical_pairs': sum(1 for frame in frames if frame['identical']),
+            'changed_pixels': sum(frame['stats']['changed_pixels'] for frame in frames),
+            'mean_diff_percentage': statistics.fmean(diff_percentages),
+            'max_diff_percentage': max(diff_percentages),
+            'mean_changed_percentage': statistics.fmean(changed_percentages),
+            'max_changed_frame': worst['right_frame'] if worst['stats']['changed_pixels'] else None,
+        }
+
+
+# 디렉토리 비교에서 이미지로 취급할 확장자
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def list_images(root: str) -> Dict[str, str]:
+    """root 아래의 이미지 파일을 {상대 경로: 전체 경로}로 반환 (구분자는 '/')"""
+    images = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in filenames:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(dirpath, filename)
+                images[os.path.relpath(path, root).replace(os.sep, '/')] = path
+    return images
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> bytes:
+    """파일 바이트의 blake2b 해시 (디코드하지 않음)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def compare_tree_pair(relative_path: str, left_path: str, right_path: str,
+                      threshold: int = 20) -> dict:
+    """디렉토리 비교의 파일 한 쌍을 비교
+
+    크기와 해시가 같으면 디코드하지 않고 동일로 판정합니다. 바이트가 달라도
+    변경 픽셀이 없으면 동일로 판정합니다.
+    """
+    result = {'path': relative_path, 'status': 'identical', 'decoded': False}
+    try:
+        if (os.path.getsize(left_path) == os.path.getsize(right_path)
+                and file_digest(left_path) == file_digest(right_path)):
+            return result
+
+        stats = ImageComparator(left_path, right_path).get_statistics(threshold)
+        result['decoded'] = True
+        result['stats'] = stats
+        if stats['changed_pixels'] > 0 or stats['diff_percentage'] > 0:
+            result['status'] = 'changed'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    return result
+
+
+def compare_trees(left_dir: str, right_dir: str, threshold: int = 20,
+                  workers: int = 4) -> Iterator[dict]:
+    """두 디렉토리의 이미지를 상대 경로로 짝지어 비교하고 결과를 완료 순서대로 반환
+
+    한쪽에만 있는 파일은 'removed'/'added'로 바로 반환하고, 공통 파일은
+    스레드 풀에서 compare_tree_pair로 비교합니다.
+    """
+    left = list_images(left_dir)
+    right = list_images(right_dir)
+
+    for relative_path in sorted(left.keys() - right.keys()):
+        yield {'path': relative_path, 'status': 'removed'}
+    for relative_path in sorted(right.keys() - left.keys()):
+        yield {'path': relative_path, 'status': 'added'}
+
+    common = sorted(left.keys() & right.keys())
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(compare_tree_pair, relative_path, left[relative_path],
+                               right[relative_path], threshold)
+                   for relative_path in common]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# run_pair_job이 만들 수 있는 출력 (뒤의 4개는 이미지 파일)
+PAIR_JOB_OUTPUTS = ('stats', 'processed', 'regions', 'sweep', 'mask',
+                    'difference', 'highlight', 'heatmap', 'overlay', 'side_by_side')
+PAIR_JOB_RENDERS = ('difference', 'highlight', 'heatmap', 'overlay', 'side_by_side')
+
+
+def _job_image_source(job: dict, key: str):
+    """작업의 이미지 경로 또는 base64 바이트('<key>_base64')를 Image.open이 읽을 수 있는 형태로 반환"""
+    if job.get(key):
+        return job[key]
+    encoded = job.get(f'{key}_base64')
+    if encoded:
+        return io.BytesIO(base64.b64decode(encoded))
+    raise ValueError(f"'{key}' 경로 또는 '{key}_base64' 바이트가 필요합니다.")
+
+
+def run_pair_job(job: dict, output_dir: Optional[str] = None) -> dict:
+    """JSON 작업 하나(이미지 쌍 + 파라미터 + 요청 출력)를 실행하고 JSON으로 바꿀 수 있는 결과를 반환
+
+    서버/배치 모드의 워커가 호출합니다. 비교 중 출력되는 안내 메시지는 stderr로 보내므로
+    stdout에는 결과만 남습니다.
+
+    Args:
+        job: {'id', 'image1' 또는 'image1_base64', 'image2' 또는 'image2_base64',
+              'threshold', 'morphology_kernel_size', 'blur_kernel_size', 'min_area',
+              'thresholds', 'include_mse', 'threads', 'tile_size', 'encoding',
+              'outputs': PAIR_JOB_OUTPUTS 중 일부 (기본값: ['stats']), 'output_dir'}
+        output_dir: 작업에 'output_dir'이 없을 때 이미지 출력을 저장할 디렉토리
+
+    Returns:
+        {'id', 'ok', 'stats', 'processed', 'regions', 'sweep', 'mask', 'renders': {이름: 경로},
+         'elapsed_s'} (요청한 항목만), 실패하면 {'id', 'ok': False, 'error', 'elapsed_s'}
+    """
+    start = time.perf_counter()
+    result = {'id': job.get('id'), 'ok': True}
+    try:
+        outputs = job.get('outputs') or ['stats']
+        unknown = [name for name in outputs if name not in PAIR_JOB_OUTPUTS]
+        if unknown:
+            raise ValueError(f"지원하지 않는 출력: {', '.join(unknown)}")
+
+        threshold = int(job.get('threshold', 20))
+        morphology_kernel_size = int(job.get('morphology_kernel_size', 0))
+        blur_kernel_size = int(job.get('blur_kernel_size', 0))
+
+        with contextlib.redirect_stdout(sys.stderr):
+            comparator = ImageComparator(_job_image_source(job, 'image1'),
+                                         _job_image_source(job, 'image2'),
+                                         threads=int(job.get('threads', 1)),
+                                         tile_size=int(job.get('tile_size', 0)),
+                                         encoding=job.get('encoding', 'default'))
+
+            if 'stats' in outputs:
+                result['stats'] = comparator.get_statistics(
+                    threshold, include_mse=bool(job.get('include_mse', False)))
+            if 'processed' in outputs:
+                result['processed'] = comparator.get_processed_statistics(
+                    threshold, morphology_kernel_size, blur_kernel_size)
+            if 'regions' in outputs:
+                result['regions'] = comparator.find_changed_regions(
+                    threshold, int(job.get('min_area', 100)), morphology_kernel_size)
+            if 'sweep' in outputs:
+                result['sweep'] = comparator.get_threshold_sweep(
+                    [int(value) for value in job.get('thresholds', [threshold])],
+                    morphology_kernel_size, blur_kernel_size)
+            if 'mask' in outputs:
+                result['mask'] = encode_mask(comparator.create_mask(
+                    threshold, morphology_kernel_size, blur_kernel_size))
+
+            renders = [name for name in PAIR_JOB_RENDERS if name in outputs]
+            if renders:
+                render_dir = job.get('output_dir') or output_dir
+                if not render_dir:
+                    raise ValueError("이미지 출력에는 'output_dir'이 필요합니다.")
+                os.makedirs(render_dir, exist_ok=True)
+                result['renders'] = {}
+                for name in renders:
+                    path = os.path.join(render_dir, f'{name}.png')
+                    if name == 'side_by_side':
+                        path = comparator.create_side_by_side_comparison(
+                            path, threshold, morphology_kernel_size, blur_kernel_size)
+                    else:
+                        image = comparator.create_diff_image(
+                            name, threshold, morphology_kernel_size, blur_kernel_size)
+                        path = comparator.save_image(image, path)
+                    result['renders'][name] = path
+    except Exception as e:
+        result = {'id': job.get('id'), 'ok': False, 'error': str(e)}
+
+    result['elapsed_s'] = time.perf_counter() - start
+    return result
+
+
+def run_jsonl_batch(input_stream: IO[str], output_stream: IO[str], workers: int = 1,
+                    output_dir: str = 'batch_results') -> Tuple[int, int]:
+    """JSON 줄 하나당 작업 하나를 읽어 run_pair_job으로 실행하고, 끝나는 대로 결과를 한 줄씩 기록
+
+    workers가 1보다 크면 프로세스 풀에서 실행하며 (렌더링에 쓰는 matplotlib이 스레드 안전하지 않음),
+    입력을 끝까지 미리 읽지 않도록 실행 중인 작업은 workers × 2개로 제한합니다.
+    결과 순서는 완료 순서이므로 작업의 'id'(없으면 줄 번호)로 짝지어야 합니다.
+
+    Args:
+        input_stream: 작업 JSON 줄 (빈 줄은 무시)
+        output_stream: 결과 JSON 줄
+        workers: 동시에 실행할 작업 수
+        output_dir: 이미지 출력을 요청한 작업의 기본 저장 위치 (작업마다 '<output_dir>/<줄 번호>-<id>')
+
+    Returns:
+        (성공한 작업 수, 실패한 작업 수)
+    """
+    counts = {True: 0, False: 0}
+
+    def emit(result: dict):
+        counts[result['ok']] += 1
+        output_stream.write(json.dumps(result, ensure_ascii=False) + '\n')
+        output_stream.flush()
+
+    def parsed_jobs() -> Iterator[Tuple[dict, str]]:
+        for line_number, line in enumerate(input_stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+                if not isinstance(job, dict):
+                    raise ValueError('JSON 객체가 필요합니다.')
+            except ValueError as e:
+                emit({'id': None, 'line': line_number, 'ok': False, 'error': f'잘못된 JSON: {e}'})
+                continue
+            job.setdefault('id', line_number)
+            safe_id = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(job['id']))
+            # id가 겹치거나 정리 후 같아져도 ('a/b'와 'a_b') 디렉토리를 공유하지 않도록 줄 번호를 붙임
+            # ('.', '..' 같은 id도 '<줄 번호>-..'이 되어 output_dir 밖을 가리키지 않음)
+            yield job, os.path.join(output_dir, f'{line_number}-{safe_id}')
+
+    if workers <= 1:
+        for job, job_dir in parsed_jobs():
+            emit(run_pair_job(job, job_dir))
+        return counts[True], counts[False]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for job, job_dir in parsed_jobs():
+            pending.add(pool.submit(run_pair_job, job, job_dir))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result())
+        for future in as_completed(pending):
+            emit(future.result())
+
+    return counts[True], counts[False]
+
+
+def parse_thresholds(value: str) -> List[int]:
+    """'20,30,40' 형식의 임계값 목록을 정수 목록으로 변환 (argparse type으로 사용)"""
+    try:
+        thresholds = [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"임계값 목록은 '20,30,40' 형식이어야 합니다: {value}")
+    if not thresholds:
+        raise argparse.ArgumentTypeError("임계값을 하나 이상 지정하세요.")
+    return thresholds
+
+
+def parse_percentages(value: str) -> List[float]:
+    """'1,5' 형식의 비율 목록을 실수 목록으로 변환 (argparse type으로 사용)"""
+    try:
+        return [float(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"비율 목록은 '1,5' 형식이어야 합니다: {value}")
+
+
+# --outputs로 고를 수 있는 항목 ('stats'는 파일 없이 통계만 출력)
+CLI_OUTPUTS = ('stats',) + ImageComparator.REPORT_OUTPUTS + ('side_by_side',)
+# quick 모드가 만들 수 있는 항목 (차이 이미지 하나만 저장)
+QUICK_OUTPUTS = ('stats', 'highlight')
+
+
+def parse_outputs(value: str) -> List[str]:
+    """'highlight,regions' 형식의 출력 목록을 검사하여 반환 (argparse type으로 사용)"""
+    outputs = [part.strip() for part in value.split(',') if part.strip()]
+    unknown = [name for name in outputs if name not in CLI_OUTPUTS]
+    if unknown or not outputs:
+        raise argparse.ArgumentTypeError(
+            f"출력은 {', '.join(CLI_OUTPUTS)} 중에서 쉼표로 골라야 합니다: {value}")
+    return outputs
+
+
+def format_threshold_sweep(sweep: List[dict]) -> str:
+    """get_threshold_sweep() 결과를 표 형식 문자열로 변환"""
+    has_processed = any('processed' in entry for entry in sweep)
+    header = f"{'임계값':>8}{'변경 픽셀':>14}{'변경 비율':>12}"
+    if has_processed:
+        header += f"{'처리 후 픽셀':>14}{'처리 후 비율':>12}"
+    lines = [header]
+    for entry in sweep:
+        line = (f"{entry['threshold']:>8}{entry['changed_pixels']:>14,}"
+                f"{entry['changed_percentage']:>11.2f}%")
+        if 'processed' in entry:
+            line += (f"{entry['processed']['changed_pixels']:>14,}"
+                     f"{entry['processed']['changed_percentage']:>11.2f}%")
+        lines.append(line)
+    return '\n'.join(lines)
 
 
 def main():
     parser = argparse.ArgumentParser(description='두 이미지의 차이를 비교합니다.')
-    parser.add_argument('image1', help='첫 번째 이미지 경로')
-    parser.add_argument('image2', help='두 번째 이미지 경로')
+    parser.add_argument('image1', nargs='?', default=None,
+                       help='첫 번째 이미지 경로 (tree 모드에서는 기준 디렉토리, batch 모드에서는 생략)')
+    parser.add_argument('image2', nargs='?', default=None,
+                       help='두 번째 이미지 경로 (tree 모드에서는 비교 디렉토리, '
+                            'sequence 모드에서는 생략하면 첫 이미지의 연속 프레임 비교)')
     parser.add_argument('--output-dir', default='comparison_results',
                        help='결과를 저장할 디렉토리 (기본값: comparison_results)')
-    parser.add_argument('--mode', choices=['quick', 'full'], default='full',
-                       help='비교 모드 (quick: 빠른 비교, full: 전체 리포트)')
+    parser.add_argument('--mode', choices=['quick', 'full', 'budget', 'estimate', 'sequence', 'tree',
+                                           'batch'],
+                       default='full',
+                       help='비교 모드 (quick: 빠른 비교, full: 전체 리포트, '
+                            'budget: 허용 비율 초과 여부만 확인, estimate: 표본 추출로 추정, '
+                            'sequence: 애니메이션/여러 페이지 이미지의 프레임별 비교, '
+                            'tree: 두 디렉토리의 이미지를 상대 경로로 짝지어 비교, '
+                            'batch: stdin의 JSON 줄 작업을 실행하고 결과를 stdout에 JSON 줄로 출력)')
+    parser.add_argument('--samples', type=int, default=4096,
+                       help='estimate 모드에서 읽을 픽셀 수 (기본값: 4096)')
+    parser.add_argument('--escalate-at', type=parse_percentages, default=None,
+                       help='estimate 모드에서 신뢰구간이 이 경계(%%)에 걸치면 정확히 계산 (예: 1,5)')
+    parser.add_argument('--budget', type=float, default=1.0,
+                       help='budget 모드의 허용 비율 %% (기본값: 1.0, 초과하면 종료 코드 3)')
+    parser.add_argument('--budget-metric', choices=['changed', 'diff'], default='changed',
+                       help='budget 모드 기준 (changed: 변경 픽셀 비율, diff: 전체 차이율)')
+    parser.add_argument('--threshold', type=int, default=20,
+                       help='budget/estimate/sequence/tree 모드에서 변경된 픽셀로 간주할 차이 임계값 (기본값: 20)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                       help='tree/batch 모드에서 동시에 비교할 쌍 수 (기본값: CPU 수)')
+    parser.add_argument('--profile', action='store_true',
+                       help='단계별 실행 시간/CPU 시간/최대 메모리 출력')
+    parser.add_argument('--thresholds', type=parse_thresholds, default=None,
+                       help='여러 임계값의 변경 픽셀 비율을 한 번에 계산 (예: 20,30,40)')
+    parser.add_argument('--threads', type=int, default=1,
+                       help='차이 계산/통계를 행 단위로 나눠 처리할 스레드 수 (기본값: 1, 큰 이미지용)')
+    parser.add_argument('--tile-size', type=int, default=0,
+                       help='이 크기의 타일 해시를 비교해 바뀐 타일만 계산 (기본값: 0, 비활성화)')
+    parser.add_argument('--encoding', choices=list(ENCODING_PROFILES), default='default',
+                       help='결과 이미지 인코딩 (default: 24비트 PNG, fast: 빠른 PNG, '
+                            'palette: 256색 이하는 8비트 팔레트 PNG, webp: 무손실 WebP)')
+    parser.add_argument('--outputs', type=parse_outputs, default=None,
+                       help='quick/full 모드에서 만들 파일 (예: stats, highlight,regions, '
+                            'quick 모드는 stats/highlight만, '
+                            f"선택: {', '.join(CLI_OUTPUTS)}; 기본값: 모드별 전체)")
 
     args = parser.parse_args()
+    if args.mode == 'batch':
+        # stdout은 결과 JSON 줄 전용, 안내 메시지는 stderr로
+        succeeded, failed = run_jsonl_batch(sys.stdin, sys.stdout, workers=args.workers,
+                                            output_dir=args.output_dir)
+        print(f"✅ 배치 완료: 성공 {succeeded}개, 실패 {failed}개", file=sys.stderr)
+        return 1 if failed else 0
+    if args.image1 is None:
+        parser.error('첫 번째 이미지 경로가 필요합니다 (batch 모드에서만 생략 가능).')
+    if args.image2 is None and args.mode != 'sequence':
+        parser.error('두 번째 이미지 경로가 필요합니다 (sequence 모드에서만 생략 가능).')
+    if args.mode == 'sequence' and args.encoding != 'default':
+        # sequence 모드는 프레임별 통계만 저장하고 결과 이미지를 만들지 않음
+        parser.error('--encoding은 sequence 모드에서 사용할 수 없습니다 (결과 이미지를 만들지 않음).')
+    if args.mode == 'quick' and args.outputs is not None:
+        unsupported = [name for name in args.outputs if name not in QUICK_OUTPUTS]
+        if unsupported:
+            parser.error(f"quick 모드의 --outputs는 {', '.join(QUICK_OUTPUTS)}만 지원합니다: "
+                         f"{', '.join(unsupported)} (다른 출력은 full 모드 사용)")
 
     try:
+        profiler = StageProfiler() if args.profile else None
+
+        if args.mode == 'tree':
+            # 디렉토리 비교 모드 (완료되는 대로 한 줄씩 출력)
+            if not os.path.isdir(args.image1) or not os.path.isdir(args.image2):
+                raise NotADirectoryError('tree 모드에는 디렉토리 두 개가 필요합니다.')
+
+            icons = {'added': '➕', 'removed': '➖', 'changed': '✏️ ', 'identical': '✅', 'error': '❌'}
+            print(f"\n🗂️  디렉토리 비교: {args.image1} → {args.image2} (동시 처리: {args.workers}개)")
+            print(f"{'='*50}")
+            entries = []
+            for entry in compare_trees(args.image1, args.image2, threshold=args.threshold,
+                                       workers=args.workers):
+                entries.append(entry)
+                if entry['status'] == 'changed':
+                    detail = (f" (차이율 {entry['stats']['diff_percentage']:.2f}%, "
+                              f"변경 픽셀 {entry['stats']['changed_percentage']:.2f}%)")
+                elif entry['status'] == 'error':
+                    detail = f" ({entry['error']})"
+                else:
+                    detail = ''
+                if entry['status'] != 'identical':
+                    print(f"{icons[entry['status']]} {entry['path']}{detail}")
+
+            entries.sort(key=lambda entry: entry['path'])
+            counts = {status: sum(1 for entry in entries if entry['status'] == status)
+                      for status in icons}
+            skipped = sum(1 for entry in entries
+                          if entry['status'] == 'identical' and not entry['decoded'])
+            print(f"\n📊 추가 {counts['added']}개, 삭제 {counts['removed']}개, "
+                  f"변경 {counts['changed']}개, 동일 {counts['identical']}개 "
+                  f"(해시 일치로 디코드 생략 {skipped}개)"
+                  + (f", 오류 {counts['error']}개" if counts['error'] else ''))
+
+            os.makedirs(args.output_dir, exist_ok=True)
+            summary_path = os.path.join(args.output_dir, 'tree_summary.json')
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                json.dump({'left': args.image1, 'right': args.image2, 'threshold': args.threshold,
+                           'counts': counts, 'files': entries}, f, indent=2, ensure_ascii=False)
+            print(f"\n✅ 디렉토리 비교 결과가 '{summary_path}'에 저장되었습니다.")
+            return 1 if counts['error'] else 0
+
+        if args.mode == 'sequence':
+            # 프레임별 비교 모드 (프레임을 하나씩 디코드하며 결과를 바로 출력)
+            sequence = FrameSequenceComparator(args.image1, args.image2, profiler=profiler,
+                                               threads=args.threads, tile_size=args.tile_size)
+            print(f"\n🎞️  프레임별 비교 (임계값 {args.threshold})")
+            print(f"{'='*50}")
+            print(f"{'프레임':<12}{'차이율':>10}{'변경 픽셀':>12}")
+            frames = []
+            for frame in sequence.iter_statistics(args.threshold):
+                frames.append(frame)
+                label = f"{frame['left_frame']} → {frame['right_frame']}"
+                if frame['identical']:
+                    print(f"{label:<12}{'동일 (건너뜀)':>22}")
+                else:
+                    stats = frame['stats']
+                    print(f"{label:<12}{stats['diff_percentage']:>9.2f}%{stats['changed_percentage']:>11.2f}%")
+
+            summary = FrameSequenceComparator.aggregate(frames)
+            print(f"\n📊 전체: {summary['pairs']}쌍 (동일 {summary['identical_pairs']}쌍 건너뜀)")
+            print(f"평균 차이율: {summary['mean_diff_percentage']:.2f}% "
+                  f"(최대 {summary['max_diff_percentage']:.2f}%)")
+            print(f"평균 변경 픽셀: {summary['mean_changed_percentage']:.2f}%"
+                  + (f" (가장 많이 바뀐 프레임: {summary['max_changed_frame']})"
+                     if summary['max_changed_frame'] is not None else ''))
+
+            os.makedirs(args.output_dir, exist_ok=True)
+            stats_path = os.path.join(args.output_dir, 'sequence_stats.json')
+            with open(stats_path, 'w', encoding='utf-8') as f:
+                json.dump({'threshold': args.threshold, 'summary': summary, 'frames': frames},
+                          f, indent=2, ensure_ascii=False)
+            print(f"\n✅ 프레임별 통계가 '{stats_path}'에 저장되었습니다.")
+
+            if profiler is not None:
+                print(f"\n⏱️  단계별 측정 결과")
+                print(f"{'='*50}")
+                print(StageProfiler.format_summary(profiler.summary()))
+            return 0
+
         # 이미지 비교 객체 생성
-        comparator = ImageComparator(args.image1, args.image2)
+        comparator = ImageComparator(args.image1, args.image2, profiler=profiler,
+                                     threads=args.threads, tile_size=args.tile_size,
+                                     encoding=args.encoding)
+
+        if args.mode == 'budget':
+            # 결과가 확정되는 즉시 중단하는 예산 확인 모드
+            result = comparator.exceeds_budget(args.budget, threshold=args.threshold,
+                                               metric=args.budget_metric)
+            label = '변경 픽셀' if args.budget_metric == 'changed' else '차이율'
+            print(f"\n🚦 예산 확인 ({label} {args.budget}%)")
+            print(f"{'='*50}")
+            print(f"판정: {'❌ 초과' if result['exceeds'] else '✅ 이내'}")
+            print(f"{label}: {result['lower_bound']:.2f}% ~ {result['upper_bound']:.2f}%")
+            print(f"처리한 행: {result['rows_processed']}/{result['total_rows']}")
+            if result['exceeds']:
+                return 3
+
+        elif args.mode == 'estimate':
+            # 표본 추출 추정 모드 (신뢰구간이 경계에 걸치면 정확히 계산)
+            result = comparator.estimate_statistics(samples=args.samples, threshold=args.threshold,
+                                                    escalate_boundaries=args.escalate_at)
+            kind = '정확한 값' if result['exact'] else f"{result['confidence'] * 100:.0f}% 신뢰구간"
+            print(f"\n🎯 표본 추정 결과 (표본 {result['samples']}개, {kind})")
+            print(f"{'='*50}")
+            for name, label in (('diff_percentage', '차이율'), ('changed_percentage', '변경된 픽셀')):
+                value = result[name]
+                print(f"{label}: {value['estimate']:.2f}% ({value['low']:.2f}% ~ {value['high']:.2f}%)")
 
-        if args.mode == 'quick':
+        elif args.mode == 'quick':
             # 빠른 비교 모드
             comparator.load_images()
             stats = comparator.get_statistics()
@@ -434,22 +2064,47 @@ def main():
             print(f"차이율: {stats['diff_percentage']:.2f}%")
             print(f"변경된 픽셀: {stats['changed_percentage']:.2f}%")
 
-            # 차이 이미지만 저장
-            diff_img = comparator.create_diff_image('highlight')
-            diff_img.save('quick_diff.png')
-            print(f"\n✅ 차이 이미지가 'quick_diff.png'에 저장되었습니다.")
+            # 차이 이미지만 저장 (--outputs에 highlight가 없으면 생략)
+            if args.outputs is None or 'highlight' in args.outputs:
+                diff_img = comparator.create_diff_image('highlight')
+                diff_path = comparator.save_image(diff_img, 'quick_diff.png')
+                print(f"\n✅ 차이 이미지가 '{diff_path}'에 저장되었습니다.")
 
         else:
             # 전체 리포트 모드
             print(f"\n🔍 이미지 비교 시작...")
             print(f"{'='*50}")
 
-            # 종합 리포트 생성
-            stats, regions = comparator.save_comparison_report(args.output_dir)
+            # 종합 리포트 생성 (--outputs로 고른 파일만)
+            report_outputs = None
+            if args.outputs is not None:
+                report_outputs = [name for name in args.outputs
+                                  if name in ImageComparator.REPORT_OUTPUTS]
+
+            # 파일 출력이 하나라도 있으면 (side_by_side만 골라도) 저장 전에 디렉토리 생성
+            if args.outputs is None or any(name != 'stats' for name in args.outputs):
+                os.makedirs(args.output_dir, exist_ok=True)
+            stats, regions = comparator.save_comparison_report(args.output_dir, report_outputs)
 
             # 나란히 비교 이미지 생성
-            side_by_side_path = os.path.join(args.output_dir, 'side_by_side.png')
-            comparator.create_side_by_side_comparison(side_by_side_path)
+            if args.outputs is None or 'side_by_side' in args.outputs:
+                side_by_side_path = os.path.join(args.output_dir, 'side_by_side.png')
+                comparator.create_side_by_side_comparison(side_by_side_path)
+
+        if comparator.tile_summary:
+            summary = comparator.tile_summary
+            print(f"\n🧩 타일 {summary['tile_size']}px: 전체 {summary['tiles']}개 중 "
+                  f"{summary['dirty_tiles']}개 변경, {summary['regions']}개 영역만 계산")
+
+        if args.thresholds:
+            print(f"\n🎚️  임계값별 변경 픽셀")
+            print(f"{'='*50}")
+            print(format_threshold_sweep(comparator.get_threshold_sweep(args.thresholds)))
+
+        if profiler is not None:
+            print(f"\n⏱️  단계별 측정 결과")
+            print(f"{'='*50}")
+            print(StageProfiler.format_summary(profiler.summary()))
 
     except Exception as e:
         print(f"❌ 오류 발생: {e}")
@@ -0,0 +1,243 @@
+"""
+결과 이미지 인코딩 도우미
+차이 강조/영역 표시 등 결과 이미지의 저장 형식(인코딩 프로필)과 병렬 인코딩을 담당합니다.
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# 프로필 이름: 저장 형식, 확장자, Pillow 저장 옵션, 팔레트 변환 여부
+ENCODING_PROFILES: Dict[str, Dict] = {
+    # 기존과 같은 24비트 PNG (zlib 기본 수준 6)
+    'default': {'format': 'PNG', 'extension': '.png', 'options': {}, 'palette': False},
+    # zlib 수준 1: 파일은 조금 커지지만 인코딩이 몇 배 빠름
+    'fast': {'format': 'PNG', 'extension': '.png', 'options': {'compress_level': 1},
+             'palette': False},
+    # 256색 이하 이미지(회색조 + 빨강 강조, 히트맵 등)는 8비트 팔레트 PNG, 나머지는 fast와 같음
+    'palette': {'format': 'PNG', 'extension': '.png', 'options': {'compress_level': 1},
+                'palette': True},
+    # 무손실 WebP (가장 빠른 설정: method 0, quality 0은 무손실에서 압축 노력 최소)
+    'webp': {'format': 'WEBP', 'extension': '.webp',
+             'options': {'lossless': True, 'method': 0, 'quality': 0},
+             'palette': False},
+}
+
+# 결과 이미지가 가질 수 있는 확장자 (업로드 시 파일 찾기용)
+ARTIFACT_EXTENSIONS = ('.png', '.webp')
+CONTENT_TYPES = {'.png': 'image/png', '.webp': 'image/webp'}
+
+# 시트 행 디렉토리의 결과 이미지 이름 (imgdiff_googlesheet_url.py가 만들고 업로드 스크립트가 읽음)
+ROW_ARTIFACTS = {
+    'highlight': 'diff_highlight',
+    'overlay': 'diff_overlay',
+    'side_by_side': 'side_by_side',
+}
+# 셀 표시용 축소본(렌디션) 파일명 접미사 (예: diff_highlight_thumb.png)
+RENDITION_SUFFIX = '_thumb'
+
+
+def get_profile(name: str) -> Dict:
+    """이름에 해당하는 인코딩 프로필 (없으면 ValueError)"""
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"지원하지 않는 인코딩 프로필: {name} "
+                         f"(선택: {', '.join(ENCODING_PROFILES)})")
+    return ENCODING_PROFILES[name]
+
+
+def artifact_path(path: str, profile: str = 'default') -> str:
+    """프로필의 확장자로 바꾼 저장 경로"""
+    return os.path.splitext(path)[0] + get_profile(profile)['extension']
+
+
+def find_artifact(directory: str, stem: str) -> Optional[str]:
+    """directory에서 stem 이름의 결과 이미지(.png/.webp)를 찾아 경로 반환 (없으면 None)"""
+    for extension in ARTIFACT_EXTENSIONS:
+        path = os.path.join(directory, stem + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def find_row_artifact(directory: str, name: str, rendition: bool = True) -> Optional[str]:
+    """시트 행 디렉토리에서 ROW_ARTIFACTS 이름의 이미지를 찾음 (rendition이면 축소본을 먼저 찾음)"""
+    stem = ROW_ARTIFACTS[name]
+    if rendition:
+        path = find_artifact(directory, stem + RENDITION_SUFFIX)
+        if path is not None:
+            return path
+    return find_artifact(directory, stem)
+
+
+def content_type(path: str) -> str:
+    """결과 이미지 경로의 MIME 형식"""
+    return CONTENT_TYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+
+
+def _gray_red_palette(array: np.ndarray) -> Optional[Image.Image]:
+    """회색조 + 순수 빨강으로만 이루어진 이미지를 팔레트 이미지로 변환 (아니면 None)
+
+    회색 256단계와 빨강을 합치면 257색이므로 회색을 255단계로 줄입니다 (오차 최대 1).
+    """
+    r, g, b = array[..., 0], array[..., 1], array[..., 2]
+    red = (r == 255) & (g == 0) & (b == 0)
+    gray = (r == g) & (g == b)
+    if not (red | gray).all():
+        return None
+
+    index = ((g.astype(np.uint16) * 254 + 127) // 255).astype(np.uint8)
+    index[red] = 255
+    levels = (np.arange(255, dtype=np.uint16) * 255 + 127) // 254
+    palette = np.zeros((256, 3), dtype=np.uint8)
+    palette[:255] = levels[:, np.newaxis]
+    palette[255] = (255, 0, 0)
+
+    image = Image.fromarray(index, 'P')
+    image.putpalette(palette.tobytes())
+    return image
+
+
+def to_palette(image: Image.Image) -> Optional[Image.Image]:
+    """256색 이하 RGB 이미지를 8비트 팔레트 이미지로 변환 (변환할 수 없으면 None)
+
+    색이 256개 이하면 무손실로 변환하고, 회색조 + 빨강 강조 이미지는 회색 255단계로 변환합니다.
+    """
+    if image.mode == 'P':
+        return image
+    if image.mode != 'RGB':
+        return None
+
+    colors = image.getcolors(256)
+    array = np.asarray(image)
+    if colors is None:
+        return _gray_red_palette(array)
+
+    keys = np.array(sorted((c[0] << 16) | (c[1] << 8) | c[2] for _, c in colors), dtype=np.uint32)
+    packed = array[..., 0].astype(np.uint32) << 16
+    packed |= array[..., 1].astype(np.uint32) << 8
+    packed |= array[..., 2]
+    index = np.searchsorted(keys, packed).astype(np.uint8)
+
+    palette = np.stack([(keys >> 16) & 255, (keys >> 8) & 255, keys & 255], axis=1).astype(np.uint8)
+    converted = Image.fromarray(index, 'P')
+    converted.putpalette(palette.tobytes())
+    return converted
+
+
+def rendition_size(size: Tuple[int, int], max_width: int,
+                   max_height: Optional[int] = None) -> Tuple[int, int]:
+    """가로세로 비율을 유지하며 max_width × max_height(기본값: max_width) 안에 들어가는 크기 (확대하지 않음)"""
+    width, height = size
+    if max_height is None:
+        max_height = max_width
+    scale = min(1.0, max_width / width, max_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def max_pool_mask(mask: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """마스크를 size(가로, 세로)로 축소하며 각 출력 픽셀이 덮는 원본 영역에 변경 픽셀이 하나라도 있으면 True
+
+    배율이 정수가 아니어도 출력 픽셀마다 원본 영역을 나누어 np.maximum.reduceat으로 계산합니다.
+    """
+    width, height = size
+    mask = mask.astype(bool).view(np.uint8)
+    row_starts = np.arange(height) * mask.shape[0] // height
+    col_starts = np.arange(width) * mask.shape[1] // width
+    pooled = np.maximum.reduceat(mask, row_starts, axis=0)
+    pooled = np.maximum.reduceat(pooled, col_starts, axis=1)
+    return pooled.astype(bool)
+
+
+def create_rendition(image: Image.Image, max_width: int, max_height: Optional[int] = None,
+                     mask: Optional[np.ndarray] = None,
+                     color: Tuple[int, int, int] = (255, 0, 0)) -> Image.Image:
+    """셀 표시용 축소본 생성 (이미 작으면 원본 그대로 반환)
+
+    배경은 BOX 필터(면적 평균)로 줄이고, 변경 픽셀은 max pooling으로 줄여 color로 다시 칠하므로
+    몇 픽셀짜리 변경도 축소본에서 사라지지 않습니다. mask가 없으면 color와 정확히 같은 픽셀을
+    변경 픽셀로 봅니다. 2색 투명 팔레트 이미지(오버레이)는 색 인덱스를 max pooling합니다.
+    """
+    size = rendition_size(image.size, max_width, max_height)
+    if size == image.size:
+        return image
+
+    if image.mode == 'P' and 'transparency' in image.info:
+        indices = np.asarray(image)
+        rendition = Image.fromarray(max_pool_mask(indices, size).view(np.uint8), 'P')
+        rendition.putpalette(image.getpalette()[:6])
+        rendition.info.update(image.info)
+        return rendition
+
+    image = image.convert('RGB')
+    if mask is None:
+        array = np.asarray(image)
+        mask = (array == np.array(color, dtype=np.uint8)).all(axis=2)
+    rendition = np.array(image.resize(size, Image.Resampling.BOX, reducing_gap=2.0))
+    rendition[max_pool_mask(mask, size)] = color
+    return Image.fromarray(rendition)
+
+
+def encode_image(image: Image.Image, path: str, profile: str = 'default') -> str:
+    """이미지를 프로필 형식으로 저장하고 실제 저장 경로(확장자 포함)를 반환"""
+    settings = get_profile(profile)
+    path = artifact_path(path, profile)
+    if settings['palette']:
+        image = to_palette(image) or image
+    image.save(path, format=settings['format'], **settings['options'])
+    return path
+
+
+class ArtifactEncoder:
+    """결과 이미지를 스레드 풀에서 인코딩 (Pillow는 압축 중 GIL을 놓으므로 병렬로 진행)
+
+    비교/렌더링을 하는 동안 앞서 만든 이미지를 인코딩하여 저장 시간을 숨깁니다.
+    workers가 0이면 submit에서 바로 저장합니다. 인코딩이 밀려 이미지가 메모리에 쌓이지 않도록
+    진행 중인 저장이 max_pending개(기본값: workers × 2)를 넘으면 submit이 가장 오래된 저장을 기다립니다.
+    """
+
+    def __init__(self, profile: str = 'default', workers: int = 2, max_pending: Optional[int] = None):
+        get_profile(profile)
+        self.profile = profile
+        self.workers = workers
+        self.max_pending = max_pending if max_pending is not None else max(1, workers * 2)
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._pending: List[Future] = []
+
+    def submit(self, image: Image.Image, path: str) -> Future:
+        """이미지 저장을 예약하고 실제 저장 경로를 돌려줄 Future 반환"""
+        if self._pool is None:
+            future = Future()
+            try:
+                future.set_result(encode_image(image, path, self.profile))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            in_flight = [pending for pending in self._pending if not pending.done()]
+            if len(in_flight) >= self.max_pending:
+                in_flight[0].exception()
+            future = self._pool.submit(encode_image, image, path, self.profile)
+        self._pending.append(future)
+        return future
+
+    def wait(self) -> List[str]:
+        """예약된 저장이 모두 끝날 때까지 대기하고 저장 경로 목록 반환 (실패가 있으면 첫 예외 발생)"""
+        pending, self._pending = self._pending, []
+        return [future.result() for future in pending]
+
+    def close(self):
+        """남은 저장을 기다린 뒤 풀 종료"""
+        try:
+            self.wait()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
@@ -6,13 +6,17 @@ IMAGE 함수의 URL을 추출하여 이미지를 다운로드하고 비교합니
 
 import os
 import sys
+import contextlib
 import csv
+import json
 import pickle
 import re
 import requests
 import tempfile
+import threading
+import queue
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import argparse
 from datetime import datetime
 from urllib.parse import urlparse, parse_qs
@@ -29,18 +33,32 @@ except ImportError:
     print("pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib")
     sys.exit(1)
 
-from imgdiff import ImageComparator
+from imgdiff import ImageComparator, StageProfiler, parse_thresholds
+from imgdiff_artifacts import (ARTIFACT_EXTENSIONS, ENCODING_PROFILES, RENDITION_SUFFIX, ROW_ARTIFACTS,
+                               ArtifactEncoder, create_rendition, get_profile)
+from imgdiff_rle import encode_mask
+from imgdiff_sheets import (SheetWriteBuffer, add_quota_arguments, batch_update_rows,
+                            parse_a1_range, sheets_limiter)
 
 
 class GoogleSheetURLImageComparator:
     """구글 시트의 IMAGE 함수 URL을 사용한 이미지 비교 클래스"""
 
     SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+    RESULT_HEADER = ['상태', '차이율', '변경픽셀', '비고', '처리시간']
+    # 행마다 만들 수 있는 이미지
+    RENDER_OUTPUTS = ('highlight', 'overlay', 'side_by_side')
+    DEFAULT_RENDERS = ('highlight', 'side_by_side')
 
     def __init__(self, spreadsheet_id: str, range_name: str = 'B3:C',
                  output_dir: str = 'googlesheet_url_results',
                  threshold: int = 20, morphology_kernel_size: int = 3,
-                 blur_kernel_size: int = 0, sheet_name: Optional[str] = None):
+                 blur_kernel_size: int = 0, sheet_name: Optional[str] = None,
+                 profile: bool = False, thresholds: Optional[List[int]] = None,
+                 tile_size: int = 0, renders: Optional[List[str]] = None,
+                 render_min_diff: float = 0.0, encoding: str = 'default',
+                 encode_workers: int = 2, rendition_size: int = 0, full_size: bool = True,
+                 mask_rle: bool = True):
         self.spreadsheet_id = spreadsheet_id
         self.range_name = range_name
         self.sheet_name = sheet_name
@@ -48,7 +66,29 @@ class GoogleSheetURLImageComparator:
         self.threshold = threshold
         self.morphology_kernel_size = morphology_kernel_size
         self.blur_kernel_size = blur_kernel_size
+        # True이면 행마다 단계별 시간/메모리를 stats.json의 'timings'에 기록
+        self.profile = profile
+        # 지정하면 행마다 임계값별 변경 픽셀 표를 stats.json의 'threshold_sweep'에 기록
+        self.thresholds = thresholds
+        # 0보다 크면 타일 해시를 비교해 바뀐 타일만 계산 (대부분 동일한 스크린샷용)
+        self.tile_size = tile_size
+        # 행마다 만들 이미지 (RENDER_OUTPUTS 중 일부, None이면 DEFAULT_RENDERS, 빈 목록이면 통계만 저장)
+        self.renders = list(self.DEFAULT_RENDERS) if renders is None else renders
+        # 처리 후 차이율(%)이 이 값보다 낮은 행은 이미지를 만들지 않음 (stats.json의 'render_skipped')
+        self.render_min_diff = render_min_diff
+        # 결과 이미지 인코딩 프로필, 차이 강조 이미지는 다음 행을 비교하는 동안 백그라운드에서 인코딩
+        self.encoding = encoding
+        self.encoder = ArtifactEncoder(encoding, workers=encode_workers)
+        # 0보다 크면 셀 표시용 축소본(<이름>_thumb.png, 긴 변 최대 rendition_size px)도 저장
+        self.rendition_size = rendition_size
+        # False이면 원본 크기 이미지는 만들지 않고 축소본만 저장
+        self.full_size = full_size
+        # True이면 처리된 변경 마스크를 RLE로 stats.json의 'mask'에 기록
+        self.mask_rle = mask_rle
+        # 백그라운드 인코딩 중인 (결과, 파일 이름, Future) 목록 (wait_for_renders에서 확인)
+        self._pending_renders: List[Tuple[Dict, str, object]] = []
         self.service = None
+        self.creds = None
         self.results = []
         self.temp_dir = None
 
@@ -75,6 +115,7 @@ class GoogleSheetURLImageComparator:
             with open('token.pickle', 'wb') as token:
                 pickle.dump(creds, token)
 
+        self.creds = creds
         self.service = build('sheets', 'v4', credentials=creds)
         print("✅ 구글 시트 API 인증 성공")
 
@@ -136,7 +177,7 @@ class GoogleSheetURLImageComparator:
             return None
 
     def read_sheet_urls(self) -> List[Dict]:
-        """구글 시트에서 IMAGE 함수의 URL 읽기"""
+        """구글 시트에서 IMAGE 함수의 URL 읽기 (전체 범위를 한 번에)"""
         if not self.service:
             raise Exception("먼저 authenticate() 메서드를 실행하세요.")
 
@@ -147,11 +188,11 @@ class GoogleSheetURLImageComparator:
                 range_to_read = f"'{self.sheet_name}'!{self.range_name}"
 
             # 수식 가져오기 (IMAGE 함수 포함)
-            result = self.service.spreadsheets().values().get(
+            result = sheets_limiter.execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=range_to_read,
                 valueRenderOption='FORMULA'  # 수식 그대로 가져오기
-            ).execute()
+            ), 'read')
 
             values = result.get('values', [])
 
@@ -161,25 +202,7 @@ class GoogleSheetURLImageComparator:
 
             print(f"✅ {len(values)}개의 행을 읽었습니다.")
 
-            url_pairs = []
-            for idx, row in enumerate(values, 3):  # B3부터 시작
-                if len(row) >= 2:
-                    url1 = self.extract_url_from_image(row[0])
-                    url2 = self.extract_url_from_image(row[1])
-
-                    if url1 and url2:
-                        # URL에서 파일명 추출
-                        name1 = self.extract_filename_from_url(url1)
-                        name2 = self.extract_filename_from_url(url2)
-
-                        url_pairs.append({
-                            'row': idx,
-                            'url1': url1,
-                            'url2': url2,
-                            'name1': name1,
-                            'name2': name2,
-                            'name': f"{name1}_vs_{name2}"
-                        })
+            url_pairs = self.parse_url_rows(values, self.get_first_data_row())
 
             print(f"🔗 {len(url_pairs)}개의 URL 쌍을 발견했습니다.")
             return url_pairs
@@ -188,6 +211,147 @@ class GoogleSheetURLImageComparator:
             print(f"❌ 오류 발생: {err}")
             return []
 
+    def iter_sheet_url_batches(self, page_size: int = 1000,
+                               prefetch: int = 2) -> Iterator[List[Dict]]:
+        """구글 시트를 page_size 행씩 나누어 읽고 URL 쌍 배치를 차례로 반환
+
+        다음 페이지는 백그라운드 스레드에서 미리 읽어 두므로, 첫 배치를
+        비교하는 동안 이후 배치를 계속 가져옵니다.
+
+        Args:
+            page_size: 한 번의 요청으로 읽을 행 수 (기본값: 1000)
+            prefetch: 미리 읽어 둘 최대 페이지 수 (기본값: 2)
+        """
+        if not self.service:
+            raise Exception("먼저 authenticate() 메서드를 실행하세요.")
+
+        pages = queue.Queue(maxsize=max(prefetch, 1))
+        stop = threading.Event()
+        done = object()
+
+        def fetch_pages():
+            try:
+                for page in self._fetch_url_pages(page_size):
+                    if stop.is_set():
+                        return
+                    pages.put(page)
+            except Exception as e:
+                pages.put(e)
+            finally:
+                pages.put(done)
+
+        fetcher = threading.Thread(target=fetch_pages, name='sheet-reader', daemon=True)
+        fetcher.start()
+
+        total_rows = 0
+        total_pairs = 0
+        try:
+            while True:
+                item = pages.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                row_count, url_pairs = item
+                total_rows += row_count
+                total_pairs += len(url_pairs)
+                print(f"✅ {total_rows}개의 행을 읽었습니다. (URL 쌍 누적 {total_pairs}개)")
+                if url_pairs:
+                    yield url_pairs
+        finally:
+            # 소비자가 중간에 멈추면 백그라운드 읽기도 중단
+            stop.set()
+            while fetcher.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+        print(f"🔗 {total_pairs}개의 URL 쌍을 발견했습니다.")
+
+    def _fetch_url_pages(self, page_size: int) -> Iterator[Tuple[int, List[Dict]]]:
+        """범위를 페이지 단위로 요청하여 (읽은 행 수, URL 쌍 목록)을 차례로 반환"""
+        range_sheet, start_column, start_row, end_column, end_row = parse_a1_range(self.range_name)
+        sheet_name = range_sheet or self.sheet_name
+        first_row = start_row or self.get_first_data_row()
+
+        # 백그라운드 스레드에서 쓰므로 서비스 객체를 따로 생성 (httplib2는 스레드 안전하지 않음)
+        service = build('sheets', 'v4', credentials=self.creds) if self.creds else self.service
+
+        # 끝 행이 없으면 시트의 전체 행 수까지 읽음
+        last_row = end_row or self._get_sheet_row_count(service, sheet_name)
+
+        row = first_row
+        while last_row is None or row <= last_row:
+            page_end = row + page_size - 1
+            if last_row is not None:
+                page_end = min(page_end, last_row)
+
+            page_range = f"{start_column}{row}:{end_column}{page_end}"
+            if sheet_name:
+                page_range = f"'{sheet_name}'!{page_range}"
+
+            result = sheets_limiter.execute(service.spreadsheets().values().get(
+                spreadsheetId=self.spreadsheet_id,
+                range=page_range,
+                valueRenderOption='FORMULA'  # 수식 그대로 가져오기
+            ), 'read')
+            values = result.get('values', [])
+
+            # 행 수를 알 수 없을 때는 빈 페이지에서 종료
+            if last_row is None and not values:
+                break
+
+            yield len(values), self.parse_url_rows(values, row)
+            row = page_end + 1
+
+    def _get_sheet_row_count(self, service, sheet_name: Optional[str]) -> Optional[int]:
+        """시트 메타데이터에서 전체 행 수 조회 (실패하면 None)"""
+        try:
+            result = sheets_limiter.execute(service.spreadsheets().get(
+                spreadsheetId=self.spreadsheet_id,
+                fields='sheets.properties(title,gridProperties.rowCount)'
+            ), 'read')
+        except HttpError as err:
+            print(f"⚠️  시트 행 수 조회 실패, 빈 페이지가 나올 때까지 읽습니다: {err}")
+            return None
+
+        sheets = result.get('sheets', [])
+        for sheet in sheets:
+            properties = sheet.get('properties', {})
+            if sheet_name is None or properties.get('title') == sheet_name:
+                return properties.get('gridProperties', {}).get('rowCount')
+        return None
+
+    def get_first_data_row(self) -> int:
+        """범위의 시작 행 번호 (범위에 행 번호가 없으면 3행)"""
+        start_row = parse_a1_range(self.range_name)[2]
+        return start_row or 3
+
+    def parse_url_rows(self, values: List[List], first_row: int) -> List[Dict]:
+        """시트 값 목록에서 두 URL이 모두 있는 행만 URL 쌍으로 변환"""
+        url_pairs = []
+        for idx, row in enumerate(values, first_row):
+            if len(row) >= 2:
+                url1 = self.extract_url_from_image(row[0])
+                url2 = self.extract_url_from_image(row[1])
+
+                if url1 and url2:
+                    # URL에서 파일명 추출
+                    name1 = self.extract_filename_from_url(url1)
+                    name2 = self.extract_filename_from_url(url2)
+
+                    url_pairs.append({
+                        'row': idx,
+                        'url1': url1,
+                        'url2': url2,
+                        'name1': name1,
+                        'name2': name2,
+                        'name': f"{name1}_vs_{name2}"
+                    })
+        return url_pairs
+
     def extract_filename_from_url(self, url: str) -> str:
         """URL에서 파일명 추출"""
         parsed = urlparse(url)
@@ -209,8 +373,14 @@ class GoogleSheetURLImageComparator:
 
         return filename
 
-    def compare_url_images(self, url_pairs: List[Dict]) -> List[Dict]:
-        """URL 이미지 쌍을 다운로드하고 비교"""
+    def compare_url_images(self, url_pairs: List[Dict],
+                           writer: Optional[SheetWriteBuffer] = None) -> List[Dict]:
+        """URL 이미지 쌍을 다운로드하고 비교
+
+        Args:
+            url_pairs: read_sheet_urls()가 반환한 URL 쌍 목록
+            writer: 지정하면 완료된 행을 실행 중에 시트에 나누어 기록
+        """
         results = []
         total = len(url_pairs)
 
@@ -221,58 +391,152 @@ class GoogleSheetURLImageComparator:
             print(f"  URL1: {pair['url1'][:80]}...")
             print(f"  URL2: {pair['url2'][:80]}...")
 
-            result = {
-                'row': pair['row'],
-                'name': pair['name'],
-                'url1': pair['url1'],
-                'url2': pair['url2'],
-                'status': 'pending'
-            }
+            result = self.compare_pair(pair)
 
-            try:
-                # 이미지 다운로드
-                img1_path = self.download_image(pair['url1'], f"row{pair['row']}_img1_{pair['name1']}")
-                img2_path = self.download_image(pair['url2'], f"row{pair['row']}_img2_{pair['name2']}")
+            results.append(result)
 
-                if not img1_path or not img2_path:
-                    raise Exception("이미지 다운로드 실패")
+            if writer is not None:
+                writer.add(result['row'], self.format_result_row(result))
 
-                # 이미지 비교
-                comparator = ImageComparator(img1_path, img2_path)
+        # 배치가 끝나기 전에 백그라운드 인코딩 완료 확인 (실패한 행은 시트에 다시 기록)
+        self.wait_for_renders(writer)
+        self.results = results
+        return results
 
-                # 원본 통계 (필터링 없음)
-                stats_original = comparator.get_statistics(threshold=self.threshold)
+    def submit_render(self, result: Dict, image, path: str):
+        """결과 이미지를 백그라운드에서 인코딩하도록 예약 (실패는 wait_for_renders에서 result에 기록)"""
+        future = self.encoder.submit(image, path)
+        self._pending_renders.append((result, os.path.splitext(os.path.basename(path))[0], future))
+
+    def wait_for_renders(self, writer: Optional[SheetWriteBuffer] = None):
+        """백그라운드에서 인코딩 중인 이미지를 모두 기다림
+
+        실패한 이미지는 result['render_errors']와 행의 stats.json 'render_errors'에 기록하고,
+        writer가 있으면 비고가 바뀐 행을 시트에 다시 기록합니다.
+        """
+        pending, self._pending_renders = self._pending_renders, []
+        failed = {}
+        for result, name, future in pending:
+            error = future.exception()
+            if error is not None:
+                print(f"  ⚠️ 행 {result['row']} {name} 저장 실패: {error}")
+                result.setdefault('render_errors', {})[name] = str(error)
+                failed[result['row']] = result
+
+        for row, result in failed.items():
+            stats_path = os.path.join(self.output_dir, f"row_{row}", 'stats.json')
+            try:
+                with open(stats_path, 'r', encoding='utf-8') as f:
+                    combined_stats = json.load(f)
+                combined_stats['render_errors'] = result['render_errors']
+                with open(stats_path, 'w', encoding='utf-8') as f:
+                    json.dump(combined_stats, f, indent=2, ensure_ascii=False)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ 행 {row} stats.json에 저장 실패를 기록하지 못했습니다: {e}")
+            if writer is not None:
+                writer.add(row, self.format_result_row(result))
+        # 결과를 모두 확인했으므로 인코더의 대기 목록만 비움
+        with contextlib.suppress(Exception):
+            self.encoder.wait()
+
+    def compare_url_batches(self, batches: Iterable[List[Dict]],
+                            writer: Optional[SheetWriteBuffer] = None) -> List[Dict]:
+        """iter_sheet_url_batches()가 반환하는 배치를 도착하는 대로 비교"""
+        results = []
+        for batch in batches:
+            results.extend(self.compare_url_images(batch, writer=writer))
+            # compare_url_images는 배치 결과만 남기므로 누적 결과로 갱신
+            self.results = results
+        self.results = results
+        return results
 
-                # 처리된 통계 (OpenCV 필터링 적용 - 실제 표시되는 것과 일치)
-                stats_processed = comparator.get_processed_statistics(
-                    threshold=self.threshold,
-                    morphology_kernel_size=self.morphology_kernel_size,
-                    blur_kernel_size=self.blur_kernel_size
-                )
+    def compare_pair(self, pair: Dict) -> Dict:
+        """URL 이미지 한 쌍을 다운로드하고 비교하여 결과 저장"""
+        result = {
+            'row': pair['row'],
+            'name': pair['name'],
+            'url1': pair['url1'],
+            'url2': pair['url2'],
+            'status': 'pending'
+        }
 
-                # result에는 처리된 통계 사용 (실제 이미지와 일치)
-                result.update({
-                    'status': 'success',
-                    'diff_percentage': stats_processed['diff_percentage'],
-                    'changed_pixels': stats_processed['changed_pixels'],
-                    'changed_percentage': stats_processed['changed_percentage'],
-                    'image_size': comparator.img1.size
-                })
+        profiler = StageProfiler() if self.profile else None
 
-                # 결과 저장
-                row_dir = os.path.join(self.output_dir, f"row_{pair['row']}")
-                os.makedirs(row_dir, exist_ok=True)
+        try:
+            # 이미지 다운로드
+            with (profiler.stage('download') if profiler else contextlib.nullcontext()):
+                img1_path = self.download_image(pair['url1'], f"row{pair['row']}_img1_{pair['name1']}")
+                img2_path = self.download_image(pair['url2'], f"row{pair['row']}_img2_{pair['name2']}")
 
-                # 차이 이미지 저장 (형태학적 연산 적용)
+            if not img1_path or not img2_path:
+                raise Exception("이미지 다운로드 실패")
+
+            # 이미지 비교
+            comparator = ImageComparator(img1_path, img2_path, profiler=profiler,
+                                         tile_size=self.tile_size, encoding=self.encoding)
+
+            # 원본 통계 (필터링 없음)
+            stats_original = comparator.get_statistics(threshold=self.threshold)
+
+            # 처리된 통계 (OpenCV 필터링 적용 - 실제 표시되는 것과 일치)
+            stats_processed = comparator.get_processed_statistics(
+                threshold=self.threshold,
+                morphology_kernel_size=self.morphology_kernel_size,
+                blur_kernel_size=self.blur_kernel_size
+            )
+
+            # result에는 처리된 통계 사용 (실제 이미지와 일치)
+            result.update({
+                'status': 'success',
+                'diff_percentage': stats_processed['diff_percentage'],
+                'changed_pixels': stats_processed['changed_pixels'],
+                'changed_percentage': stats_processed['changed_percentage'],
+                'image_size': comparator.img1.size
+            })
+
+            # 결과 저장
+            row_dir = os.path.join(self.output_dir, f"row_{pair['row']}")
+            os.makedirs(row_dir, exist_ok=True)
+
+            # 차이가 기준보다 작은 행은 아무도 보지 않을 이미지를 만들지 않음
+            render_skipped = stats_processed['diff_percentage'] < self.render_min_diff
+            renders = [] if render_skipped else self.renders
+            result['render_skipped'] = render_skipped
+
+            # 이전 실행에서 남은 이미지(다른 형식, 축소본 포함)가 업로드되지 않도록 이번에 만들지 않는 파일은 삭제
+            extension = get_profile(self.encoding)['extension']
+            for name, stem in ROW_ARTIFACTS.items():
+                for suffix, wanted in (('', self.full_size), (RENDITION_SUFFIX, self.rendition_size > 0)):
+                    for stale_extension in ARTIFACT_EXTENSIONS:
+                        stale_path = os.path.join(row_dir, stem + suffix + stale_extension)
+                        if (name not in renders or not wanted or stale_extension != extension) \
+                                and os.path.exists(stale_path):
+                            os.remove(stale_path)
+
+            # 차이 이미지 저장 (형태학적 연산 적용, 인코딩은 백그라운드)
+            for name in ('highlight', 'overlay'):
+                if name not in renders:
+                    continue
+                # overlay: 투명 1비트 마스크 (원본 URL 위에 겹쳐 표시하는 용도)
                 diff_img = comparator.create_diff_image(
-                    'highlight',
+                    name,
                     threshold=self.threshold,
                     morphology_kernel_size=self.morphology_kernel_size,
                     blur_kernel_size=self.blur_kernel_size
                 )
-                diff_img.save(os.path.join(row_dir, 'diff_highlight.png'))
-
-                # 나란히 비교 이미지 저장 (새로운 파라미터 적용)
+                stem = ROW_ARTIFACTS[name]
+                if self.full_size:
+                    self.submit_render(result, diff_img, os.path.join(row_dir, f'{stem}.png'))
+                if self.rendition_size > 0:
+                    # 셀 표시용 축소본 (작은 변경 영역도 보이도록 마스크는 max pooling)
+                    mask = comparator.create_mask(self.threshold, self.morphology_kernel_size,
+                                                  self.blur_kernel_size)
+                    rendition = create_rendition(diff_img, self.rendition_size, mask=mask)
+                    self.submit_render(result, rendition,
+                                       os.path.join(row_dir, f'{stem}{RENDITION_SUFFIX}.png'))
+
+            # 나란히 비교 이미지 저장 (새로운 파라미터 적용)
+            if 'side_by_side' in renders and self.full_size:
                 side_by_side_path = os.path.join(row_dir, 'side_by_side.png')
                 comparator.create_side_by_side_comparison(
                     side_by_side_path,
@@ -280,107 +544,155 @@ class GoogleSheetURLImageComparator:
                     morphology_kernel_size=self.morphology_kernel_size,
                     blur_kernel_size=self.blur_kernel_size
                 )
+            if 'side_by_side' in renders and self.rendition_size > 0:
+                # 축소본은 matplotlib 없이 패널 축소본을 이어 붙여 만듦
+                rendition = comparator.create_side_by_side_rendition(
+                    self.rendition_size * 4,
+                    threshold=self.threshold,
+                    morphology_kernel_size=self.morphology_kernel_size,
+                    blur_kernel_size=self.blur_kernel_size,
+                    max_height=self.rendition_size
+                )
+                self.submit_render(result, rendition,
+                                   os.path.join(row_dir, f'side_by_side{RENDITION_SUFFIX}.png'))
+
+            # 통계 정보 JSON으로 저장
+            import numpy as np
+
+            # NumPy 타입을 Python 기본 타입으로 변환
+            def convert_numpy(obj):
+                if isinstance(obj, np.integer):
+                    return int(obj)
+                elif isinstance(obj, np.floating):
+                    return float(obj)
+                elif isinstance(obj, np.ndarray):
+                    return obj.tolist()
+                elif isinstance(obj, dict):
+                    return {k: convert_numpy(v) for k, v in obj.items()}
+                elif isinstance(obj, (list, tuple)):
+                    return [convert_numpy(item) for item in obj]
+                return obj
+
+            # 두 가지 통계를 모두 저장
+            combined_stats = {
+                'original': convert_numpy(stats_original),
+                'processed': convert_numpy(stats_processed),
+                'note': 'The "processed" statistics match the red highlighted areas in diff_highlight.png. "original" statistics are based on raw pixel differences without filtering.'
+            }
+            combined_stats['renders'] = list(renders)
+            combined_stats['full_size'] = self.full_size
+            combined_stats['rendition_size'] = self.rendition_size
+            combined_stats['render_skipped'] = render_skipped
+            if 'overlay' in renders:
+                # 뷰어가 오버레이를 겹쳐 그릴 원본 이미지 (이미지 1)
+                combined_stats['overlay_base_url'] = pair['url1']
+            if self.mask_rle:
+                # 처리된 변경 마스크 (다시 비교하지 않고 highlight/overlay를 만들 때 imgdiff_rle.decode_mask로 복원)
+                combined_stats['mask'] = encode_mask(comparator.create_mask(
+                    self.threshold, self.morphology_kernel_size, self.blur_kernel_size))
+            if comparator.tile_summary:
+                combined_stats['tiles'] = comparator.tile_summary
+            if self.thresholds:
+                # 같은 차이 배열로 임계값별 통계 계산 (재다운로드/재디코드 없음)
+                result['threshold_sweep'] = convert_numpy(comparator.get_threshold_sweep(
+                    self.thresholds,
+                    morphology_kernel_size=self.morphology_kernel_size,
+                    blur_kernel_size=self.blur_kernel_size
+                ))
+                combined_stats['threshold_sweep'] = result['threshold_sweep']
+            if profiler is not None:
+                result['timings'] = profiler.summary()
+                combined_stats['timings'] = result['timings']
+
+            stats_path = os.path.join(row_dir, 'stats.json')
+            with open(stats_path, 'w', encoding='utf-8') as f:
+                json.dump(combined_stats, f, indent=2, ensure_ascii=False)
+
+            print(f"  ✅ 성공: 차이율 {stats_processed['diff_percentage']:.2f}% (처리 후: {stats_processed['changed_percentage']:.2f}%)"
+                  + (" - 이미지 생략" if render_skipped else ""))
+
+        except Exception as e:
+            result.update({
+                'status': 'error',
+                'error_message': str(e)
+            })
+            if profiler is not None:
+                result['timings'] = profiler.summary()
+            print(f"  ❌ 실패: {e}")
+
+        return result
+
+    def format_result_row(self, result: Dict) -> List:
+        """비교 결과를 시트에 기록할 한 행의 값으로 변환"""
+        if result['status'] == 'success':
+            note = f"{result.get('image_size', '')}"
+            if result.get('render_errors'):
+                # 통계는 정상이지만 일부 이미지를 저장하지 못한 행
+                note += f" (이미지 저장 실패: {', '.join(sorted(result['render_errors']))})"
+            return [
+                '성공',
+                f"{result['diff_percentage']:.2f}%",
+                f"{result['changed_percentage']:.2f}%",
+                note,
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            ]
+        return [
+            '실패',
+            '',
+            '',
+            result.get('error_message', ''),
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        ]
 
-                # 통계 정보 JSON으로 저장
-                import json
-                import numpy as np
-
-                # NumPy 타입을 Python 기본 타입으로 변환
-                def convert_numpy(obj):
-                    if isinstance(obj, np.integer):
-                        return int(obj)
-                    elif isinstance(obj, np.floating):
-                        return float(obj)
-                    elif isinstance(obj, np.ndarray):
-                        return obj.tolist()
-                    elif isinstance(obj, dict):
-                        return {k: convert_numpy(v) for k, v in obj.items()}
-                    elif isinstance(obj, (list, tuple)):
-                        return [convert_numpy(item) for item in obj]
-                    return obj
-
-                # 두 가지 통계를 모두 저장
-                combined_stats = {
-                    'original': convert_numpy(stats_original),
-                    'processed': convert_numpy(stats_processed),
-                    'note': 'The "processed" statistics match the red highlighted areas in diff_highlight.png. "original" statistics are based on raw pixel differences without filtering.'
-                }
-
-                stats_path = os.path.join(row_dir, 'stats.json')
-                with open(stats_path, 'w', encoding='utf-8') as f:
-                    json.dump(combined_stats, f, indent=2, ensure_ascii=False)
-
-                print(f"  ✅ 성공: 차이율 {stats_processed['diff_percentage']:.2f}% (처리 후: {stats_processed['changed_percentage']:.2f}%)")
-
-            except Exception as e:
-                result.update({
-                    'status': 'error',
-                    'error_message': str(e)
-                })
-                print(f"  ❌ 실패: {e}")
-
-            results.append(result)
+    def create_sheet_writer(self, start_column: str = 'D', flush_rows: int = 50,
+                            flush_interval: float = 10.0) -> SheetWriteBuffer:
+        """실행 중 결과를 나누어 기록할 쓰기 버퍼 생성"""
+        if not self.service:
+            raise Exception("먼저 authenticate() 메서드를 실행하세요.")
 
-        self.results = results
-        return results
+        return SheetWriteBuffer(
+            self.service,
+            self.spreadsheet_id,
+            start_column=start_column,
+            sheet_name=self.get_result_sheet_name(),
+            flush_rows=flush_rows,
+            flush_interval=flush_interval,
+            header_values=self.RESULT_HEADER,
+            header_row=self.get_first_data_row() - 1
+        )
+
+    def get_result_sheet_name(self) -> Optional[str]:
+        """결과를 기록할 시트명 (범위에 시트명이 포함되어 있으면 그 시트)"""
+        if '!' in self.range_name:
+            return self.range_name.split('!', 1)[0].strip("'\"")
+        return self.sheet_name
 
     def update_sheet_results(self, start_column: str = 'D', start_row: int = 3):
-        """비교 결과를 구글 시트에 업데이트"""
+        """비교 결과를 구글 시트에 업데이트
+
+        각 결과는 자신의 행 번호에 기록되므로 read_sheet_urls()가 건너뛴 행이
+        있어도 어긋나지 않습니다. 연속된 행은 하나의 범위로 묶어 한 번의
+        values.batchUpdate 요청으로 전송합니다.
+        """
         if not self.service or not self.results:
             return
 
-        update_values = []
-        for result in self.results:
-            if result['status'] == 'success':
-                row_data = [
-                    '성공',
-                    f"{result['diff_percentage']:.2f}%",
-                    f"{result['changed_percentage']:.2f}%",
-                    f"{result.get('image_size', '')}",
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ]
-            else:
-                row_data = [
-                    '실패',
-                    '',
-                    '',
-                    result.get('error_message', ''),
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                ]
-            update_values.append(row_data)
-
-        # 첫 번째 결과의 행 번호 기준으로 업데이트
-        if self.results:
-            first_row = self.results[0]['row']
-            last_row = first_row + len(self.results) - 1
-            update_range = f"{start_column}{first_row}:{chr(ord(start_column)+4)}{last_row}"
+        rows = {result['row']: self.format_result_row(result) for result in self.results}
 
-            try:
-                body = {'values': update_values}
-                result = self.service.spreadsheets().values().update(
-                    spreadsheetId=self.spreadsheet_id,
-                    range=update_range,
-                    valueInputOption='USER_ENTERED',
-                    body=body
-                ).execute()
-
-                print(f"✅ 구글 시트 업데이트 완료: {result.get('updatedCells')}개 셀")
-
-                # 헤더 추가
-                if first_row > 1:
-                    header_range = f"{start_column}{first_row-1}:{chr(ord(start_column)+4)}{first_row-1}"
-                    header_body = {
-                        'values': [['상태', '차이율', '변경픽셀', '비고', '처리시간']]
-                    }
-                    self.service.spreadsheets().values().update(
-                        spreadsheetId=self.spreadsheet_id,
-                        range=header_range,
-                        valueInputOption='USER_ENTERED',
-                        body=header_body
-                    ).execute()
-
-            except HttpError as err:
-                print(f"❌ 시트 업데이트 실패: {err}")
+        try:
+            result = batch_update_rows(
+                self.service,
+                self.spreadsheet_id,
+                rows,
+                start_column=start_column,
+                sheet_name=self.get_result_sheet_name(),
+                header_values=self.RESULT_HEADER,
+                header_row=self.get_first_data_row() - 1
+            )
+            print(f"✅ 구글 시트 업데이트 완료: {result.get('totalUpdatedCells')}개 셀")
+
+        except HttpError as err:
+            print(f"❌ 시트 업데이트 실패: {err}")
 
     def cleanup_temp_files(self):
         """임시 파일 정리"""
@@ -409,10 +721,18 @@ class GoogleSheetURLImageComparator:
             avg_diff = sum(r['diff_percentage'] for r in self.results if r['status'] == 'success') / success
             print(f"평균 차이율: {avg_diff:.2f}%")
 
+        skipped = sum(1 for r in self.results if r.get('render_skipped'))
+        if skipped:
+            print(f"이미지 생략: {skipped}개 (처리 후 차이율 {self.render_min_diff}% 미만)")
+        render_failed = sum(1 for r in self.results if r.get('render_errors'))
+        if render_failed:
+            print(f"이미지 저장 실패: {render_failed}개 (url_results.csv의 render_errors 참고)")
+
         # CSV 저장
         csv_path = os.path.join(self.output_dir, 'url_results.csv')
         with open(csv_path, 'w', encoding='utf-8', newline='') as f:
-            fieldnames = ['row', 'status', 'diff_percentage', 'changed_percentage', 'url1', 'url2']
+            fieldnames = ['row', 'status', 'diff_percentage', 'changed_percentage', 'url1', 'url2',
+                          'render_errors']
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
 
@@ -423,11 +743,98 @@ class GoogleSheetURLImageComparator:
                     'diff_percentage': result.get('diff_percentage', ''),
                     'changed_percentage': result.get('changed_percentage', ''),
                     'url1': result.get('url1', ''),
-                    'url2': result.get('url2', '')
+                    'url2': result.get('url2', ''),
+                    'render_errors': '; '.join(f"{name}: {error}" for name, error
+                                               in sorted(result.get('render_errors', {}).items()))
                 })
 
+        self.report_threshold_sweep()
+        self.report_timings()
+
         print(f"\n📁 결과 저장 위치: {self.output_dir}")
 
+    def report_threshold_sweep(self):
+        """행별 임계값 표를 threshold_sweep.csv로 저장하고 임계값별 평균을 출력"""
+        rows = [r for r in self.results if r.get('threshold_sweep')]
+        if not rows:
+            return
+
+        thresholds = [entry['threshold'] for entry in rows[0]['threshold_sweep']]
+        has_processed = 'processed' in rows[0]['threshold_sweep'][0]
+
+        fieldnames = ['row']
+        for threshold in thresholds:
+            fieldnames.append(f'changed_percentage@{threshold}')
+            if has_processed:
+                fieldnames.append(f'processed_changed_percentage@{threshold}')
+
+        csv_path = os.path.join(self.output_dir, 'threshold_sweep.csv')
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for result in rows:
+                record = {'row': result['row']}
+                for entry in result['threshold_sweep']:
+                    record[f"changed_percentage@{entry['threshold']}"] = entry['changed_percentage']
+                    if 'processed' in entry:
+                        record[f"processed_changed_percentage@{entry['threshold']}"] = \
+                            entry['processed']['changed_percentage']
+                writer.writerow(record)
+
+        print(f"\n🎚️  임계값별 평균 변경 픽셀 비율 ({len(rows)}개 행)")
+        for index, threshold in enumerate(thresholds):
+            raw = sum(r['threshold_sweep'][index]['changed_percentage'] for r in rows) / len(rows)
+            line = f"  임계값 {threshold:>3}: {raw:.2f}%"
+            if has_processed:
+                processed = sum(r['threshold_sweep'][index]['processed']['changed_percentage']
+                                for r in rows) / len(rows)
+                line += f" (처리 후: {processed:.2f}%)"
+            print(line)
+        print(f"  📄 행별 표: {csv_path}")
+
+    def report_timings(self):
+        """행별 단계 측정값을 합산하여 출력하고 timings_summary.json으로 저장"""
+        rows = [r for r in self.results if r.get('timings')]
+        if not rows:
+            return
+
+        summary = {}
+        for result in rows:
+            for name, record in result['timings'].items():
+                total = summary.setdefault(name, {'rows': 0, 'count': 0, 'wall_s': 0.0,
+                                                  'cpu_s': 0.0, 'peak_bytes': 0,
+                                                  'max_wall_s': 0.0, 'slowest_row': None})
+                total['rows'] += 1
+                total['count'] += record['count']
+                total['wall_s'] += record['wall_s']
+                total['cpu_s'] += record['cpu_s']
+                total['peak_bytes'] = max(total['peak_bytes'], record['peak_bytes'])
+                if record['wall_s'] > total['max_wall_s']:
+                    total['max_wall_s'] = record['wall_s']
+                    total['slowest_row'] = result['row']
+
+        print(f"\n⏱️  단계별 측정 결과 ({len(rows)}개 행 합계)")
+        print(StageProfiler.format_summary(summary))
+        print(f"\n가장 느린 행 (단계별)")
+        for name, total in sorted(summary.items(), key=lambda item: -item[1]['max_wall_s']):
+            print(f"  {name:<28}행 {total['slowest_row']} ({total['max_wall_s'] * 1000:.1f} ms)")
+
+        summary_path = os.path.join(self.output_dir, 'timings_summary.json')
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({'rows': len(rows), 'stages': summary}, f, indent=2, ensure_ascii=False)
+
+
+def parse_renders(value: str) -> List[str]:
+    """'highlight,side_by_side' 또는 'none'을 이미지 목록으로 변환 (argparse type으로 사용)"""
+    if value.strip().lower() == 'none':
+        return []
+    renders = [part.strip() for part in value.split(',') if part.strip()]
+    allowed = GoogleSheetURLImageComparator.RENDER_OUTPUTS
+    if not renders or any(name not in allowed for name in renders):
+        raise argparse.ArgumentTypeError(
+            f"이미지는 {', '.join(allowed)} 중에서 쉼표로 고르거나 none이어야 합니다: {value}")
+    return renders
+
 
 def main():
     parser = argparse.ArgumentParser(description='구글 시트 URL 기반 이미지 비교')
@@ -439,15 +846,48 @@ def main():
     parser.add_argument('--output-dir', default='googlesheet_url_results',
                        help='결과 저장 디렉토리')
     parser.add_argument('--update-sheet', action='store_true',
-                       help='결과를 구글 시트에 업데이트')
+                       help='결과를 구글 시트에 업데이트 (실행 중 완료된 행부터 나누어 기록)')
+    parser.add_argument('--page-size', type=int, default=1000,
+                       help='시트를 나누어 읽을 때 한 번에 읽을 행 수 (기본값: 1000)')
+    parser.add_argument('--flush-rows', type=int, default=50,
+                       help='시트 업데이트 시 이 개수만큼 행이 모이면 기록 (기본값: 50)')
+    parser.add_argument('--flush-interval', type=float, default=10.0,
+                       help='시트 업데이트 시 이 시간(초)마다 기록 (기본값: 10)')
     parser.add_argument('--threshold', type=int, default=30,
                        help='차이 감지 임계값 (기본값: 30, 높을수록 민감도 낮음)')
     parser.add_argument('--morphology-kernel-size', type=int, default=3,
                        help='형태학적 연산 커널 크기 (기본값: 3, 0이면 비활성화)')
     parser.add_argument('--blur-kernel-size', type=int, default=0,
                        help='가우시안 블러 커널 크기 (기본값: 0, 0이면 비활성화)')
+    parser.add_argument('--thresholds', type=parse_thresholds, default=None,
+                       help='행마다 여러 임계값의 변경 픽셀 비율을 함께 계산 (예: 20,30,40)')
+    parser.add_argument('--profile', action='store_true',
+                       help='행마다 단계별 시간/CPU 시간/최대 메모리를 stats.json에 기록')
+    parser.add_argument('--tile-size', type=int, default=0,
+                       help='이 크기의 타일 해시를 비교해 바뀐 타일만 계산 (기본값: 0, 비활성화)')
+    parser.add_argument('--renders', type=parse_renders, default=None,
+                       help='행마다 만들 이미지 (highlight, overlay, side_by_side 중 쉼표로 선택, '
+                            'none이면 통계만 저장; 기본값: highlight,side_by_side)')
+    parser.add_argument('--encoding', choices=list(ENCODING_PROFILES), default='default',
+                       help='결과 이미지 인코딩 (default: 24비트 PNG, fast: 빠른 PNG, '
+                            'palette: 256색 이하는 8비트 팔레트 PNG, webp: 무손실 WebP)')
+    parser.add_argument('--encode-workers', type=int, default=2,
+                       help='차이 강조 이미지를 백그라운드에서 인코딩할 스레드 수 (기본값: 2, 0이면 바로 저장)')
+    parser.add_argument('--render-min-diff', type=float, default=0.0,
+                       help='처리 후 차이율(%%)이 이 값보다 낮은 행은 이미지를 만들지 않음 (기본값: 0, 항상 생성)')
+    parser.add_argument('--rendition-size', type=int, default=0,
+                       help='셀 표시용 축소본(<이름>_thumb.png)도 저장, 긴 변 최대 크기 px '
+                            '(나란히 비교는 세로 최대 크기, 가로는 4배까지; 기본값: 0, 만들지 않음)')
+    parser.add_argument('--no-full-size', action='store_true',
+                       help='원본 크기 이미지는 만들지 않고 축소본만 저장 (--rendition-size 필요)')
+    parser.add_argument('--no-mask-rle', action='store_true',
+                       help='처리된 변경 마스크(RLE)를 stats.json에 기록하지 않음')
+    add_quota_arguments(parser)
 
     args = parser.parse_args()
+    if args.no_full_size and args.rendition_size <= 0:
+        parser.error('--no-full-size에는 --rendition-size가 필요합니다.')
+    sheets_limiter.configure(args.sheets_read_quota, args.sheets_write_quota)
 
     comparator = GoogleSheetURLImageComparator(
         args.spreadsheet_id,
@@ -456,32 +896,54 @@ def main():
         threshold=args.threshold,
         morphology_kernel_size=args.morphology_kernel_size,
         blur_kernel_size=args.blur_kernel_size,
-        sheet_name=args.sheet_name
+        sheet_name=args.sheet_name,
+        profile=args.profile,
+        thresholds=args.thresholds,
+        tile_size=args.tile_size,
+        renders=args.renders,
+        render_min_diff=args.render_min_diff,
+        encoding=args.encoding,
+        encode_workers=args.encode_workers,
+        rendition_size=args.rendition_size,
+        full_size=not args.no_full_size,
+        mask_rle=not args.no_mask_rle
     )
 
+    writer = None
     try:
         # 인증
         comparator.authenticate()
 
-        # URL 읽기
-        url_pairs = comparator.read_sheet_urls()
+        # 구글 시트 업데이트: 완료된 행을 실행 중에 나누어 기록
+        if args.update_sheet:
+            writer = comparator.create_sheet_writer(
+                flush_rows=args.flush_rows,
+                flush_interval=args.flush_interval
+            )
+
+        # URL을 페이지 단위로 읽으면서 도착한 배치부터 다운로드 및 비교
+        url_batches = comparator.iter_sheet_url_batches(page_size=args.page_size)
+        comparator.compare_url_batches(url_batches, writer=writer)
 
-        if not url_pairs:
+        if not comparator.results:
             print("⚠️  처리할 URL 쌍이 없습니다.")
             return 1
 
-        # 이미지 다운로드 및 비교
-        comparator.compare_url_images(url_pairs)
-
         # 리포트 생성
         comparator.generate_report()
 
-        # 구글 시트 업데이트
-        if args.update_sheet:
-            comparator.update_sheet_results()
+    except HttpError as err:
+        print(f"❌ 오류 발생: {err}")
+        return 1
 
     finally:
-        # 임시 파일 정리
+        # 중단되더라도 완료된 행은 시트에 남김
+        if writer is not None:
+            writer.close()
+
+        # 백그라운드 인코딩 마무리 후 임시 파일 정리
+        comparator.wait_for_renders()
+        comparator.encoder.close()
         comparator.cleanup_temp_files()
 
     return 0
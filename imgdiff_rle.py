@@ -0,0 +1,101 @@
+"""
+변경 마스크 RLE 직렬화 도우미
+처리된 변경 마스크를 무손실 run-length encoding으로 저장하고 numpy 마스크로 복원합니다.
+원본 이미지를 다시 다운로드/비교하지 않고도 highlight/overlay 이미지를 다시 만들 수 있습니다.
+
+형식 (JSON으로 저장 가능한 dict):
+    {'size': [높이, 너비], 'order': 'C' 또는 'F', 'changed': 변경 픽셀 수,
+     'counts': base64(varint로 이어 붙인 run 길이)}
+
+run은 0(변경 없음)부터 시작해 0과 1이 번갈아 나오며, 첫 픽셀이 변경이면 첫 run 길이는 0입니다.
+order='F'(열 우선)로 만든 run 목록(mask_counts)은 COCO의 비압축 RLE counts와 같습니다.
+"""
+
+import base64
+from typing import Dict, List
+
+import numpy as np
+
+
+def mask_counts(mask: np.ndarray, order: str = 'C') -> np.ndarray:
+    """마스크를 0부터 시작하는 run 길이 배열(uint64)로 변환"""
+    flat = mask.astype(bool).ravel(order=order)
+    if flat.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    boundaries = np.concatenate(([0], changes, [flat.size]))
+    counts = np.diff(boundaries).astype(np.uint64)
+    if flat[0]:
+        counts = np.concatenate((np.zeros(1, dtype=np.uint64), counts))
+    return counts
+
+
+def pack_varints(values: np.ndarray) -> bytes:
+    """부호 없는 정수 배열을 LEB128 varint 바이트열로 변환 (반복문 없이 바이트 자리별로 처리)"""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b''
+    nbytes = np.ones(values.size, dtype=np.int64)
+    for shift in range(7, 64, 7):
+        nbytes += values >= (np.uint64(1) << np.uint64(shift))
+    offsets = np.cumsum(nbytes) - nbytes
+    packed = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for position in range(int(nbytes.max())):
+        selected = nbytes > position
+        chunk = (values[selected] >> np.uint64(7 * position)) & np.uint64(0x7F)
+        more = (nbytes[selected] > position + 1).astype(np.uint64) << np.uint64(7)
+        packed[offsets[selected] + position] = (chunk | more).astype(np.uint8)
+    return packed.tobytes()
+
+
+def unpack_varints(data: bytes) -> np.ndarray:
+    """pack_varints의 역변환 (uint64 배열)"""
+    packed = np.frombuffer(data, dtype=np.uint8)
+    if packed.size == 0:
+        return np.zeros(0, dtype=np.uint64)
+    ends = np.flatnonzero(packed < 0x80)
+    if ends.size == 0 or ends[-1] != packed.size - 1:
+        raise ValueError("varint 바이트열이 중간에 끊겼습니다.")
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts + 1
+    positions = np.arange(packed.size) - np.repeat(starts, lengths)
+    values = (packed & 0x7F).astype(np.uint64) << (positions.astype(np.uint64) * np.uint64(7))
+    return np.add.reduceat(values, starts)
+
+
+def encode_mask(mask: np.ndarray, order: str = 'C') -> Dict:
+    """2차원 마스크를 JSON으로 저장할 수 있는 RLE dict로 변환
+
+    Args:
+        mask: 0이 아닌 값을 변경 픽셀로 보는 H×W 배열
+        order: 'C'(행 우선, 기본값) 또는 'F'(열 우선, COCO와 같은 순서)
+    """
+    if mask.ndim != 2:
+        raise ValueError(f"2차원 마스크가 필요합니다: {mask.shape}")
+    if order not in ('C', 'F'):
+        raise ValueError(f"order는 'C' 또는 'F'여야 합니다: {order}")
+    counts = mask_counts(mask, order)
+    return {
+        'size': [int(mask.shape[0]), int(mask.shape[1])],
+        'order': order,
+        'changed': int(counts[1::2].sum()),
+        'counts': base64.b64encode(pack_varints(counts)).decode('ascii'),
+    }
+
+
+def decode_counts(counts: np.ndarray, size: List[int], order: str = 'C') -> np.ndarray:
+    """run 길이 배열을 bool 마스크(H×W)로 복원"""
+    height, width = size
+    counts = np.asarray(counts, dtype=np.int64)
+    if int(counts.sum()) != height * width:
+        raise ValueError(f"run 길이 합({int(counts.sum())})이 마스크 크기({height}×{width})와 다릅니다.")
+    # 짝수 번째 run은 0, 홀수 번째 run은 1
+    values = (np.arange(counts.size) & 1).astype(bool)
+    flat = np.repeat(values, counts)
+    return flat.reshape((height, width), order=order)
+
+
+def decode_mask(rle: Dict) -> np.ndarray:
+    """encode_mask가 만든 dict를 bool 마스크(H×W)로 복원"""
+    counts = unpack_varints(base64.b64decode(rle['counts']))
+    return decode_counts(counts, rle['size'], rle.get('order', 'C'))
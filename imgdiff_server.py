@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+이미지 비교 상주 서버
+numpy/cv2/scipy/matplotlib를 미리 불러온 워커 프로세스를 띄워 두고
+HTTP(또는 Unix 소켓) JSON API로 이미지 쌍 비교 요청을 받습니다.
+CI처럼 비교를 수천 번 호출할 때 매번 프로세스를 새로 띄우는 비용을 없앱니다.
+
+사용 예:
+    python imgdiff_server.py --port 8765 --workers 8
+
+    curl -s localhost:8765/compare -d '{"image1": "a.png", "image2": "b.png"}'
+    curl -s localhost:8765/compare -d '{"image1": "a.png", "image2": "b.png", "outputs": ["stats", "highlight"]}'
+    curl -s localhost:8765/renders/<job>/highlight.png -o highlight.png
+    curl -s -X DELETE localhost:8765/renders/<job>
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socketserver
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from PIL import Image
+
+from imgdiff import ImageComparator, PAIR_JOB_RENDERS, run_pair_job
+from imgdiff_artifacts import ARTIFACT_EXTENSIONS, content_type
+
+# 요청 본문 최대 크기 (base64 이미지 포함)
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+# 렌더링 결과 보관 시간 기본값 (초)
+DEFAULT_RENDER_TTL = 3600.0
+
+
+def warm_worker():
+    """워커 시작 시 작은 이미지로 통계/마스크/라벨링/렌더링 경로를 한 번씩 실행
+
+    지연 import(scipy.ndimage 등)와 첫 호출 비용을 요청 처리 전에 미리 치릅니다.
+    """
+    comparator = ImageComparator('warmup_1', 'warmup_2')
+    comparator.img1 = Image.new('RGB', (16, 16))
+    comparator.img2 = Image.new('RGB', (16, 16), 'white')
+    comparator.get_statistics()
+    comparator.get_processed_statistics(morphology_kernel_size=3)
+    comparator.find_changed_regions(min_area=1, morphology_kernel_size=3)
+    comparator.create_diff_image('highlight', morphology_kernel_size=3)
+
+
+def worker_ready() -> int:
+    """워커가 떠 있는지 확인용 (프로세스 ID 반환)"""
+    return os.getpid()
+
+
+class DiffServerState:
+    """워커 풀과 렌더링 결과 디렉토리를 가진 서버 상태"""
+
+    def __init__(self, workers: int, output_dir: str, render_ttl: float = DEFAULT_RENDER_TTL):
+        """
+        Args:
+            workers: 워커 프로세스 수
+            output_dir: 작업별 렌더링 디렉토리(<output_dir>/<token>)를 만들 위치
+            render_ttl: 렌더링 결과 보관 시간 (초, 0이면 DELETE 요청이나 서버 종료 때만 삭제)
+        """
+        self.workers = workers
+        self.output_dir = os.path.abspath(output_dir)
+        self.render_ttl = render_ttl
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+        self.completed = 0
+        # 워커가 비정상 종료되어 풀을 다시 만든 횟수, 다시 만들지 못하면 broken=True
+        self.restarts = 0
+        self.broken = False
+        self._lock = threading.Lock()
+        self._pool_lock = threading.Lock()
+        # 실행 중인 작업의 token (정리 대상에서 제외)
+        self._active_tokens = set()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def start(self):
+        """모든 워커를 미리 띄우고 준비될 때까지 대기"""
+        # 연달아 제출하면 쉬는 워커가 없으므로 워커 수만큼 프로세스가 생성됨
+        futures = [self.pool.submit(worker_ready) for _ in range(self.workers)]
+        pids = {future.result() for future in futures}
+        print(f"🔥 워커 {len(pids)}개 준비 완료")
+
+        if self.render_ttl > 0:
+            self._sweeper = threading.Thread(target=self._sweep_periodically, daemon=True)
+            self._sweeper.start()
+
+    def restart_pool(self, broken_pool: ProcessPoolExecutor):
+        """중단된 풀을 새 풀로 교체 (여러 요청이 동시에 발견해도 한 번만 교체)"""
+        with self._pool_lock:
+            if self.pool is not broken_pool:
+                return
+            broken_pool.shutdown(wait=False, cancel_futures=True)
+            try:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+            except Exception as e:
+                self.broken = True
+                print(f"❌ 워커 풀을 다시 만들지 못했습니다: {e}")
+                return
+            self.broken = False
+            self.restarts += 1
+            print(f"♻️  워커 프로세스가 중단되어 풀을 다시 시작했습니다 ({self.restarts}번째)")
+
+    def check_pool(self) -> bool:
+        """풀이 중단되었는지 확인하고, 중단되었으면 다시 만듦 (요청을 받을 수 있으면 True)"""
+        pool = self.pool
+        if not self.broken:
+            try:
+                # 중단된 풀은 submit에서 바로 BrokenProcessPool을 발생시킴 (결과는 기다리지 않음)
+                pool.submit(worker_ready)
+                return True
+            except BrokenProcessPool:
+                pass
+        self.restart_pool(pool)
+        return False
+
+    def compare(self, job: dict) -> dict:
+        """작업을 워커에서 실행하고 렌더링 결과는 /renders/ 핸들로 바꿔 반환
+
+        Raises:
+            BrokenProcessPool: 워커가 비정상 종료됨 (풀은 다시 만든 뒤 발생)
+        """
+        token = uuid.uuid4().hex
+        job = dict(job)
+        # 작업별 렌더링 디렉토리는 서버가 정함 (클라이언트 경로에 쓰지 않음)
+        job['output_dir'] = os.path.join(self.output_dir, token)
+        with self._lock:
+            self._active_tokens.add(token)
+        pool = self.pool
+        try:
+            result = pool.submit(run_pair_job, job).result()
+        except BrokenProcessPool:
+            self.restart_pool(pool)
+            self.delete_renders(token)
+            raise
+        except Exception:
+            self.delete_renders(token)
+            raise
+        finally:
+            with self._lock:
+                self._active_tokens.discard(token)
+
+        if 'renders' in result:
+            result['renders'] = {name: f"/renders/{token}/{os.path.basename(path)}"
+                                 for name, path in result['renders'].items()}
+        with self._lock:
+            self.completed += 1
+        return result
+
+    @staticmethod
+    def is_token(name: str) -> bool:
+        """compare()가 만드는 렌더링 token 형식(uuid4 hex)인지 확인"""
+        return len(name) == 32 and all(c in '0123456789abcdef' for c in name)
+
+    def render_token(self, url_path: str) -> Optional[str]:
+        """/renders/<token>에서 token 추출 (형식이 틀리면 None)"""
+        parts = url_path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'renders' or not self.is_token(parts[1]):
+            return None
+        return parts[1]
+
+    def render_path(self, url_path: str) -> Optional[str]:
+        """/renders/<token>/<name>.png를 파일 경로로 변환 (형식이 틀리면 None)"""
+        parts = url_path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'renders':
+            return None
+        token, filename = parts[1], parts[2]
+        if not self.is_token(token):
+            return None
+        if filename not in {name + extension for name in PAIR_JOB_RENDERS
+                            for extension in ARTIFACT_EXTENSIONS}:
+            return None
+        return os.path.join(self.output_dir, token, filename)
+
+    def delete_renders(self, token: str) -> bool:
+        """token의 렌더링 디렉토리 삭제 (없으면 False)"""
+        path = os.path.join(self.output_dir, token)
+        if not os.path.isdir(path):
+            return False
+        shutil.rmtree(path, ignore_errors=True)
+        return True
+
+    def render_tokens(self) -> List[str]:
+        """output_dir에 남아 있는 렌더링 token 목록 (이전 실행에서 남은 것 포함)"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        return [entry.name for entry in os.scandir(self.output_dir)
+                if entry.is_dir() and self.is_token(entry.name)]
+
+    def sweep_renders(self, max_age: float) -> int:
+        """마지막 수정 후 max_age초가 지난 렌더링 디렉토리 삭제 (삭제한 수 반환)"""
+        now = time.time()
+        with self._lock:
+            active = set(self._active_tokens)
+        removed = 0
+        for token in self.render_tokens():
+            if token in active:
+                continue
+            try:
+                age = now - os.path.getmtime(os.path.join(self.output_dir, token))
+            except OSError:
+                continue
+            if age >= max_age and self.delete_renders(token):
+                removed += 1
+        return removed
+
+    def _sweep_periodically(self):
+        """render_ttl이 지난 렌더링 디렉토리를 주기적으로 삭제 (start()에서 데몬 스레드로 실행)"""
+        interval = min(self.render_ttl / 2, 60.0)
+        while not self._stop.wait(interval):
+            self.sweep_renders(self.render_ttl)
+
+    def shutdown(self):
+        """정리 스레드와 워커 풀을 멈추고 남은 렌더링 디렉토리를 모두 삭제"""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        removed = self.sweep_renders(0)
+        if removed:
+            print(f"🧹 렌더링 디렉토리 {removed}개 삭제")
+
+
+class DiffRequestHandler(BaseHTTPRequestHandler):
+    """GET /health, POST /compare, GET /renders/<token>/<name>.png (또는 .webp), DELETE /renders/<token>"""
+
+    server_version = 'imgdiff/1.0'
+
+    @property
+    def state(self) -> DiffServerState:
+        return self.server.state
+
+    def address_string(self):
+        # Unix 소켓은 client_address가 비어 있음
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            ok = self.state.check_pool()
+            self.send_json(200 if ok else 503,
+                           {'ok': ok, 'workers': self.state.workers,
+                            'completed': self.state.completed, 'restarts': self.state.restarts})
+            return
+
+        path = self.state.render_path(self.path)
+        if path is None or not os.path.exists(path):
+            self.send_json(404, {'ok': False, 'error': f'없는 경로: {self.path}'})
+            return
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type(path))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_DELETE(self):
+        token = self.state.render_token(self.path)
+        if token is None or not self.state.delete_renders(token):
+            self.send_json(404, {'ok': False, 'error': f'없는 경로: {self.path}'})
+            return
+        self.send_json(200, {'ok': True, 'deleted': token})
+
+    def do_POST(self):
+        if self.path != '/compare':
+            self.send_json(404, {'ok': False, 'error': f'없는 경로: {self.path}'})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self.send_json(400, {'ok': False, 'error': '요청 본문 크기가 올바르지 않습니다.'})
+            return
+
+        try:
+            job = json.loads(self.rfile.read(length))
+            if not isinstance(job, dict):
+                raise ValueError('JSON 객체가 필요합니다.')
+        except ValueError as e:
+            self.send_json(400, {'ok': False, 'error': f'잘못된 JSON: {e}'})
+            return
+
+        try:
+            result = self.state.compare(job)
+        except BrokenProcessPool as e:
+            self.send_json(503, {'id': job.get('id'), 'ok': False,
+                                 'error': f'워커 프로세스가 중단되었습니다 (풀을 다시 시작함, 재시도 가능): {e}'})
+            return
+        except Exception as e:
+            self.send_json(500, {'id': job.get('id'), 'ok': False,
+                                 'error': f'서버 오류: {type(e).__name__}: {e}'})
+            return
+        self.send_json(200 if result['ok'] else 422, result)
+
+
+class UnixDiffServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix 소켓에서 HTTP 요청을 받는 서버"""
+    daemon_threads = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='이미지 비교 상주 서버 (워커를 미리 띄워 두는 JSON API)')
+    parser.add_argument('--host', default='127.0.0.1', help='바인딩 주소 (기본값: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='포트 (기본값: 8765)')
+    parser.add_argument('--unix-socket', default=None,
+                        help='지정하면 TCP 대신 이 경로의 Unix 소켓에서 대기')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help='워커 프로세스 수 (기본값: CPU 수)')
+    parser.add_argument('--output-dir', default='imgdiff_server_results',
+                        help='렌더링 이미지를 저장할 디렉토리 (기본값: imgdiff_server_results)')
+    parser.add_argument('--render-ttl', type=float, default=DEFAULT_RENDER_TTL,
+                        help='렌더링 이미지 보관 시간 (초, 기본값: 3600, 0이면 DELETE 요청이나 '
+                             '서버 종료 때만 삭제)')
+
+    args = parser.parse_args()
+
+    state = DiffServerState(max(1, args.workers), args.output_dir, render_ttl=args.render_ttl)
+    state.start()
+
+    if args.unix_socket:
+        if os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+        server = UnixDiffServer(args.unix_socket, DiffRequestHandler)
+        address = f"unix:{args.unix_socket}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), DiffRequestHandler)
+        address = f"http://{args.host}:{server.server_address[1]}"
+    server.state = state
+
+    print(f"🚀 이미지 비교 서버 시작: {address} (Ctrl+C로 종료)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n🛑 서버 종료 (처리한 요청: {state.completed}개)")
+    finally:
+        server.server_close()
+        state.shutdown()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
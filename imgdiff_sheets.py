@@ -0,0 +1,386 @@
+"""
+구글 시트 API 도우미
+요청 속도 제한, 열/범위 계산, 완료된 행의 분할 기록을 담당합니다.
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from googleapiclient.errors import HttpError
+
+
+class TokenBucket:
+    """분당 요청 수를 제한하는 토큰 버킷 (스레드 안전)"""
+
+    def __init__(self, per_minute: float, burst: Optional[int] = None):
+        """
+        Args:
+            per_minute: 분당 허용 요청 수
+            burst: 한 번에 연속으로 보낼 수 있는 최대 요청 수 (기본값: 분당 허용량의 1/6, 최소 1)
+        """
+        if not per_minute > 0:
+            raise ValueError(f"분당 허용 요청 수는 0보다 커야 합니다: {per_minute}")
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, int(per_minute // 6))
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """토큰을 하나 얻을 때까지 대기"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self):
+        """할당량 초과 응답을 받았을 때 남은 토큰을 비워 다른 스레드도 함께 대기"""
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0)
+
+
+class SheetsRateLimiter:
+    """읽기/쓰기 할당량별 토큰 버킷과 429 자동 재시도를 제공하는 시트 API 요청 실행기
+
+    Sheets API 기본 할당량은 사용자당 분당 읽기 60회, 쓰기 60회입니다.
+    같은 프로세스의 모든 시트 요청은 sheets_limiter 하나를 공유합니다.
+    """
+
+    RETRY_STATUSES = (429, 500, 503)
+
+    def __init__(self, read_per_minute: float = 60, write_per_minute: float = 60,
+                 max_retries: int = 6, max_backoff: float = 64.0):
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.configure(read_per_minute, write_per_minute)
+
+    def configure(self, read_per_minute: Optional[float] = None,
+                  write_per_minute: Optional[float] = None):
+        """분당 읽기/쓰기 할당량 변경 (None이면 기존 값 유지)"""
+        if read_per_minute is not None:
+            self.read_bucket = TokenBucket(read_per_minute)
+        if write_per_minute is not None:
+            self.write_bucket = TokenBucket(write_per_minute)
+
+    def execute(self, request, kind: str = 'read'):
+        """할당량에 맞춰 요청을 실행하고, 429/5xx 응답이면 지수 백오프로 재시도
+
+        Args:
+            request: googleapiclient 요청 객체 (.execute() 호출 전)
+            kind: 'read' 또는 'write'
+        """
+        if kind not in ('read', 'write'):
+            raise ValueError(f"지원하지 않는 요청 종류: {kind}")
+        bucket = self.read_bucket if kind == 'read' else self.write_bucket
+
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            try:
+                return request.execute()
+            except HttpError as err:
+                status = getattr(err.resp, 'status', None)
+                if status not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    raise
+
+                if status == 429:
+                    bucket.drain()
+
+                retry_after = err.resp.get('retry-after') if hasattr(err.resp, 'get') else None
+                if retry_after and str(retry_after).isdigit():
+                    delay = float(retry_after)
+                else:
+                    delay = min(self.max_backoff, 2 ** attempt) + random.uniform(0, 1)
+                print(f"  ⏳ 시트 API {status} 응답, {delay:.1f}초 후 재시도 "
+                      f"({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+
+# 모든 진입점이 공유하는 시트 API 요청 실행기
+sheets_limiter = SheetsRateLimiter()
+
+
+def positive_float(value: str) -> float:
+    """0보다 큰 실수 (argparse type으로 사용)"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"숫자가 아닙니다: {value}")
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"0보다 커야 합니다: {value}")
+    return number
+
+
+def add_quota_arguments(parser):
+    """시트 API 할당량 옵션을 argparse 파서에 추가"""
+    parser.add_argument('--sheets-read-quota', type=positive_float, default=60,
+                        help='시트 API 분당 읽기 요청 수 (기본값: 60)')
+    parser.add_argument('--sheets-write-quota', type=positive_float, default=60,
+                        help='시트 API 분당 쓰기 요청 수 (기본값: 60)')
+
+
+def column_to_index(column: str) -> int:
+    """열 문자를 1부터 시작하는 열 번호로 변환 (A → 1, Z → 26, AA → 27)"""
+    index = 0
+    for char in column.strip().upper():
+        if not 'A' <= char <= 'Z':
+            raise ValueError(f"올바른 열 문자가 아닙니다: {column}")
+        index = index * 26 + (ord(char) - ord('A') + 1)
+    if index == 0:
+        raise ValueError(f"올바른 열 문자가 아닙니다: {column}")
+    return index
+
+
+def index_to_column(index: int) -> str:
+    """1부터 시작하는 열 번호를 열 문자로 변환 (1 → A, 26 → Z, 27 → AA)"""
+    if index < 1:
+        raise ValueError(f"열 번호는 1 이상이어야 합니다: {index}")
+    column = ''
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        column = chr(ord('A') + remainder) + column
+    return column
+
+
+def offset_column(column: str, offset: int) -> str:
+    """열 문자에서 offset만큼 떨어진 열 문자 반환 (offset_column('Z', 1) → 'AA')"""
+    return index_to_column(column_to_index(column) + offset)
+
+
+def parse_a1_range(range_str: str) -> Tuple[Optional[str], str, Optional[int], str, Optional[int]]:
+    """A1 표기법 범위를 (시트명, 시작 열, 시작 행, 끝 열, 끝 행)으로 분리
+
+    예시:
+    - "B3:C" → (None, 'B', 3, 'C', None)
+    - "'시트1'!B3:C100" → ('시트1', 'B', 3, 'C', 100)
+    """
+    sheet_name = None
+    if '!' in range_str:
+        sheet_part, range_str = range_str.split('!', 1)
+        sheet_name = sheet_part.strip().strip("'\"")
+
+    match = re.fullmatch(r'\s*([A-Za-z]+)(\d*)\s*(?::\s*([A-Za-z]+)(\d*)\s*)?', range_str)
+    if not match:
+        raise ValueError(f"올바른 범위 형식이 아닙니다: {range_str}")
+
+    start_column, start_row, end_column, end_row = match.groups()
+    return (
+        sheet_name,
+        start_column.upper(),
+        int(start_row) if start_row else None,
+        (end_column or start_column).upper(),
+        int(end_row) if end_row else None
+    )
+
+
+def a1_range(start_column: str, first_row: int, last_row: int, width: int,
+             sheet_name: Optional[str] = None) -> str:
+    """시작 열과 열 개수로 A1 표기법 범위 문자열 생성 (시트명 포함)"""
+    end_column = offset_column(start_column, max(width, 1) - 1)
+    cells = f"{start_column}{first_row}:{end_column}{last_row}"
+    if sheet_name:
+        return f"'{sheet_name}'!{cells}"
+    return cells
+
+
+def build_row_ranges(rows: Dict[int, List], start_column: str = 'D',
+                     sheet_name: Optional[str] = None) -> List[Dict]:
+    """행 번호별 값을 연속된 행끼리 묶어 values.batchUpdate의 data 목록으로 변환
+
+    Args:
+        rows: {행 번호: 그 행에 기록할 값 목록}
+        start_column: 값을 기록할 첫 번째 열
+        sheet_name: 시트명 (None이면 기본 시트)
+    """
+    data = []
+    run_rows = []
+
+    def close_run():
+        width = max(len(rows[row]) for row in run_rows)
+        data.append({
+            'range': a1_range(start_column, run_rows[0], run_rows[-1], width, sheet_name),
+            'values': [rows[row] for row in run_rows]
+        })
+
+    for row in sorted(rows):
+        if run_rows and row != run_rows[-1] + 1:
+            close_run()
+            run_rows = []
+        run_rows.append(row)
+
+    if run_rows:
+        close_run()
+
+    return data
+
+
+def batch_update_rows(service, spreadsheet_id: str, rows: Dict[int, List],
+                      start_column: str = 'D', sheet_name: Optional[str] = None,
+                      header_values: Optional[List] = None,
+                      header_row: Optional[int] = None) -> Dict:
+    """행 번호별 값을 한 번의 values.batchUpdate 요청으로 기록
+
+    연속되지 않은 행도 각자의 행에 기록되며, 연속된 행은 하나의 범위로 묶입니다.
+    header_values와 header_row를 지정하면 header_row 행에 헤더를 함께 기록합니다.
+    """
+    if header_values and header_row is None:
+        raise ValueError("header_values를 기록하려면 header_row가 필요합니다.")
+    data = build_row_ranges(rows, start_column, sheet_name)
+    if header_values and rows:
+        if header_row >= 1:
+            data.insert(0, {
+                'range': a1_range(start_column, header_row, header_row,
+                                  len(header_values), sheet_name),
+                'values': [header_values]
+            })
+
+    return sheets_limiter.execute(service.spreadsheets().values().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={'valueInputOption': 'USER_ENTERED', 'data': data}
+    ), 'write')
+
+
+class SheetWriteBuffer:
+    """완료된 행을 N행 또는 T초마다 시트에 기록하는 쓰기 버퍼
+
+    행 번호로 주소를 지정하므로 결과가 연속되지 않아도 각자의 행에 기록되며,
+    연속된 행은 하나의 범위로 묶어 한 번의 batchUpdate 요청으로 전송합니다.
+    첫 add() 이후에는 백그라운드 타이머가 T초가 지난 행을 기록하므로, 사용이 끝나면 close()를 호출합니다.
+    """
+
+    def __init__(self, service, spreadsheet_id: str,
+                 start_column: str = 'D',
+                 sheet_name: Optional[str] = None,
+                 flush_rows: int = 50, flush_interval: float = 10.0,
+                 header_values: Optional[List] = None,
+                 header_row: Optional[int] = None):
+        """
+        Args:
+            service: 구글 시트 API 서비스 객체
+            spreadsheet_id: 구글 시트 ID
+            start_column: 결과를 기록할 첫 번째 열 (마지막 열은 값 개수로 결정)
+            sheet_name: 시트명 (None이면 기본 시트)
+            flush_rows: 이 개수만큼 행이 모이면 기록 (기본값: 50)
+            flush_interval: 마지막 기록 후 이 시간(초)이 지나면 기록 (기본값: 10)
+            header_values: 첫 기록 시 함께 기록할 헤더
+            header_row: 헤더를 기록할 행 번호 (header_values를 지정하면 필수)
+        """
+        if header_values and header_row is None:
+            raise ValueError("header_values를 기록하려면 header_row가 필요합니다.")
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.start_column = start_column
+        self.sheet_name = sheet_name
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.header_values = header_values
+        self.header_row = header_row
+
+        self.pending: Dict[int, List] = {}
+        self.written_rows = 0
+        self.request_count = 0
+        self._header_written = header_values is None
+        self._last_flush = time.monotonic()
+        # _lock은 버퍼 상태만 보호하고, _flush_lock은 기록 요청을 한 번에 하나씩 보내도록 함
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def add(self, row: int, values: List):
+        """완료된 행을 버퍼에 추가하고, 조건을 만족하면 기록"""
+        with self._lock:
+            self.pending[row] = values
+            due = (len(self.pending) >= self.flush_rows or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+            if self._timer is None and not self._stop.is_set():
+                # 다음 행이 늦게 끝나도 flush_interval마다 기록되도록 백그라운드 타이머 시작
+                self._timer = threading.Thread(target=self._flush_periodically, daemon=True)
+                self._timer.start()
+        if due:
+            # 이미 기록 중이면 기다리지 않음 (남은 행은 다음 add() 또는 타이머가 기록)
+            self.flush(wait=False)
+
+    def _flush_periodically(self):
+        """flush_interval이 지난 행이 남아 있으면 add() 호출이 없어도 기록"""
+        while True:
+            with self._lock:
+                remaining = self._last_flush + self.flush_interval - time.monotonic()
+            if self._stop.wait(max(0.05, remaining)):
+                return
+            with self._lock:
+                overdue = (bool(self.pending) and
+                           time.monotonic() - self._last_flush >= self.flush_interval)
+            if overdue:
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"❌ 시트 부분 업데이트 실패 (다음 기록 시 재시도): {e}")
+
+    def flush(self, wait: bool = True) -> int:
+        """버퍼에 모인 행을 모두 기록하고 기록한 행 수를 반환
+
+        기록 요청(재시도 대기 포함) 중에도 add()가 막히지 않도록 요청은 _lock 밖에서 보냅니다.
+        wait가 False이면 다른 스레드가 기록 중일 때 기다리지 않고 0을 반환합니다.
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return 0
+        try:
+            with self._lock:
+                if not self.pending:
+                    return 0
+                rows = self.pending
+                self.pending = {}
+            header_values = None if self._header_written else self.header_values
+
+            # 분당 쓰기 할당량은 batch_update_rows가 sheets_limiter로 지킴
+            try:
+                batch_update_rows(self.service, self.spreadsheet_id, rows,
+                                  start_column=self.start_column,
+                                  sheet_name=self.sheet_name,
+                                  header_values=header_values,
+                                  header_row=self.header_row)
+            except HttpError as err:
+                print(f"❌ 시트 부분 업데이트 실패 ({len(rows)}개 행, 다음 기록 시 재시도): {err}")
+                with self._lock:
+                    # 그 사이 새로 들어온 값이 있으면 새 값을 유지
+                    for row, values in rows.items():
+                        self.pending.setdefault(row, values)
+                    self._last_flush = time.monotonic()
+                    self.request_count += 1
+                return 0
+
+            self._header_written = True
+            with self._lock:
+                self._last_flush = time.monotonic()
+                self.request_count += 1
+                self.written_rows += len(rows)
+                written_rows = self.written_rows
+            print(f"📝 시트 부분 업데이트: {len(rows)}개 행 (누적 {written_rows}개 행)")
+            return len(rows)
+        finally:
+            self._flush_lock.release()
+
+    def close(self) -> int:
+        """백그라운드 타이머를 멈추고 남은 행을 기록"""
+        self._stop.set()
+        timer = self._timer
+        if timer is not None and timer is not threading.current_thread():
+            timer.join()
+        return self.flush()
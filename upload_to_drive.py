@@ -26,6 +26,9 @@ except ImportError:
     print("pip install google-api-python-client google-auth-httplib2 google-auth-oauthlib")
     sys.exit(1)
 
+from imgdiff_artifacts import content_type, find_row_artifact
+from imgdiff_sheets import add_quota_arguments, index_to_column, sheets_limiter
+
 
 class DriveImageUploader:
     """이미지를 구글 드라이브에 업로드하고 시트 업데이트"""
@@ -36,8 +39,18 @@ class DriveImageUploader:
         'https://www.googleapis.com/auth/drive.file'
     ]
 
-    def __init__(self, spreadsheet_id: str):
+    # D~H열 헤더, --upload-overlay면 I~J열 헤더 추가
+    RESULT_HEADER = ['차이 강조', '나란히 비교', '판정', '차이율 (%)', '변경 픽셀 (%)']
+    OVERLAY_HEADER = ['오버레이 URL', '오버레이 기준 이미지']
+
+    def __init__(self, spreadsheet_id: str, upload_overlay: bool = False,
+                 full_size: bool = False):
         self.spreadsheet_id = spreadsheet_id
+        # True이면 투명 오버레이도 올리고 URL과 기준 이미지(overlay_base_url)를 I~J열에 기록
+        # (투명 오버레이는 혼자 보면 빈 이미지이므로 D열은 항상 highlight)
+        self.upload_overlay = upload_overlay
+        # True이면 축소본이 있어도 원본 크기 이미지를 올림
+        self.full_size = full_size
         self.sheet_service = None
         self.drive_service = None
         self.folder_id = None
@@ -56,7 +69,8 @@ class DriveImageUploader:
                     processed = stats.get('processed', {})
                     return {
                         'diff_percentage': processed.get('diff_percentage', 0),
-                        'changed_percentage': processed.get('changed_percentage', 0)
+                        'changed_percentage': processed.get('changed_percentage', 0),
+                        'overlay_base_url': stats.get('overlay_base_url', '')
                     }
             else:
                 print(f"  ⚠️ stats.json 파일이 없습니다: {stats_path}")
@@ -65,6 +79,14 @@ class DriveImageUploader:
             print(f"  ⚠️ 통계 로드 실패: {e}")
             return {'diff_percentage': 0, 'changed_percentage': 0}
 
+    def result_header(self) -> List[str]:
+        """D열부터 기록할 헤더"""
+        return self.RESULT_HEADER + (self.OVERLAY_HEADER if self.upload_overlay else [])
+
+    def error_row(self, message: str) -> List:
+        """처리하지 못한 행 (이전 실행의 값이 남지 않도록 헤더 너비만큼 빈 칸으로 채움)"""
+        return [message] + [''] * (len(self.result_header()) - 1)
+
     def authenticate(self):
         """구글 API 인증"""
         creds = None
@@ -129,7 +151,7 @@ class DriveImageUploader:
                 'parents': [self.folder_id] if self.folder_id else []
             }
 
-            media = MediaFileUpload(file_path, mimetype='image/png')
+            media = MediaFileUpload(file_path, mimetype=content_type(file_path))
 
             file = self.drive_service.files().create(
                 body=file_metadata,
@@ -170,11 +192,21 @@ class DriveImageUploader:
         for row_num in range(start_row, end_row + 1):
             print(f"\n[행 {row_num}] 처리 중...")
 
-            # 로컬 이미지 파일 경로
-            diff_path = f"googlesheet_url_results/row_{row_num}/diff_highlight.png"
-            side_path = f"googlesheet_url_results/row_{row_num}/side_by_side.png"
-
-            if os.path.exists(diff_path) and os.path.exists(side_path):
+            # 로컬 이미지 파일 경로 (--encoding에 따라 .png 또는 .webp)
+            row_dir = f"googlesheet_url_results/row_{row_num}"
+            # 셀 표시용 축소본(*_thumb)이 있으면 축소본을 올림 (--full-size면 원본 크기)
+            diff_path = find_row_artifact(row_dir, 'highlight', rendition=not self.full_size)
+            side_path = find_row_artifact(row_dir, 'side_by_side', rendition=not self.full_size)
+            overlay_path = (find_row_artifact(row_dir, 'overlay', rendition=not self.full_size)
+                            if self.upload_overlay else None)
+            stats_path = f"{row_dir}/stats.json"
+
+            # 이미지 생략(--renders, --render-min-diff)으로 없는 이미지는 빈 칸으로 기록
+            has_diff = diff_path is not None
+            has_side = side_path is not None
+            has_overlay = overlay_path is not None
+
+            if has_diff or has_side or has_overlay or os.path.exists(stats_path):
                 # 통계 계산
                 print(f"  📊 통계 계산 중...")
                 stats = self.calculate_image_stats(row_num)
@@ -182,11 +214,20 @@ class DriveImageUploader:
                 changed_pct = stats.get('changed_percentage', 0)
 
                 # 드라이브에 업로드
-                print(f"  ☁️ 이미지 업로드 중...")
-                diff_url = self.upload_and_get_url(diff_path, f"row{row_num}_diff.png")
-                side_url = self.upload_and_get_url(side_path, f"row{row_num}_comparison.png")
-
-                if diff_url and side_url:
+                diff_url = side_url = overlay_url = None
+                if has_diff or has_side or has_overlay:
+                    print(f"  ☁️ 이미지 업로드 중...")
+                if has_diff:
+                    diff_url = self.upload_and_get_url(diff_path,
+                                                       f"row{row_num}_diff{os.path.splitext(diff_path)[1]}")
+                if has_side:
+                    side_url = self.upload_and_get_url(side_path,
+                                                       f"row{row_num}_comparison{os.path.splitext(side_path)[1]}")
+                if has_overlay:
+                    overlay_url = self.upload_and_get_url(overlay_path,
+                                                          f"row{row_num}_overlay{os.path.splitext(overlay_path)[1]}")
+
+                if (diff_url or not has_diff) and (side_url or not has_side) and (overlay_url or not has_overlay):
 
                     # 판정 결과
                     if diff_pct < 1:
@@ -197,31 +238,39 @@ class DriveImageUploader:
                         status = "❌ 큰 차이"
 
                     # IMAGE 함수 + 수치 데이터
-                    update_data.append([
-                        f'=IMAGE("{diff_url}", 1)',  # D열: 차이 강조 이미지
-                        f'=IMAGE("{side_url}", 1)',  # E열: 나란히 비교 이미지
+                    row_data = [
+                        f'=IMAGE("{diff_url}", 1)' if diff_url else '',  # D열: 차이 강조 이미지
+                        f'=IMAGE("{side_url}", 1)' if side_url else '',  # E열: 나란히 비교 이미지
                         status,                       # F열: 판정 결과
                         diff_pct,                     # G열: 차이율 (%)
                         changed_pct,                  # H열: 변경된 픽셀 비율 (%)
-                    ])
+                    ]
+                    if self.upload_overlay:
+                        # 오버레이는 기준 이미지 위에 겹쳐 보는 용도이므로 IMAGE가 아닌 URL로 기록
+                        row_data += [
+                            overlay_url or '',                        # I열: 투명 오버레이 URL
+                            stats.get('overlay_base_url', '') if overlay_url else '',  # J열: 겹쳐 볼 기준 이미지 URL
+                        ]
+                    update_data.append(row_data)
                     print(f"  ✅ 업로드 완료 (차이율: {diff_pct:.2f}%)")
                 else:
-                    update_data.append(['업로드 실패', '', '', '', ''])
+                    update_data.append(self.error_row('업로드 실패'))
             else:
-                update_data.append(['파일 없음', '', '', '', ''])
+                update_data.append(self.error_row('파일 없음'))
 
-        # 구글 시트 업데이트
-        print(f"\n📝 구글 시트 D{start_row}:H{end_row} 업데이트 중...")
-        update_range = f'D{start_row}:H{end_row}'
+        # 구글 시트 업데이트 (D열부터 헤더 너비만큼)
+        end_column = index_to_column(3 + len(self.result_header()))
+        print(f"\n📝 구글 시트 D{start_row}:{end_column}{end_row} 업데이트 중...")
+        update_range = f'D{start_row}:{end_column}{end_row}'
 
         try:
             body = {'values': update_data}
-            result = self.sheet_service.spreadsheets().values().update(
+            result = sheets_limiter.execute(self.sheet_service.spreadsheets().values().update(
                 spreadsheetId=self.spreadsheet_id,
                 range=update_range,
                 valueInputOption='USER_ENTERED',  # 수식으로 처리
                 body=body
-            ).execute()
+            ), 'write')
 
             print(f"✅ 시트 업데이트 완료: {result.get('updatedCells')}개 셀")
 
@@ -245,24 +294,24 @@ class DriveImageUploader:
                 ]
             }
 
-            self.sheet_service.spreadsheets().batchUpdate(
+            sheets_limiter.execute(self.sheet_service.spreadsheets().batchUpdate(
                 spreadsheetId=self.spreadsheet_id,
                 body=requests_body
-            ).execute()
+            ), 'write')
 
             print("✅ 행 높이 조정 완료")
 
-            # 헤더 추가 (D2:H2)
+            # 헤더 추가 (D2:H2, --upload-overlay면 D2:J2)
             if start_row == 3:
                 header_body = {
-                    'values': [['차이 강조', '나란히 비교', '판정', '차이율 (%)', '변경 픽셀 (%)']]
+                    'values': [self.result_header()]
                 }
-                self.sheet_service.spreadsheets().values().update(
+                sheets_limiter.execute(self.sheet_service.spreadsheets().values().update(
                     spreadsheetId=self.spreadsheet_id,
-                    range='D2:H2',
+                    range=f'D2:{end_column}2',
                     valueInputOption='USER_ENTERED',
                     body=header_body
-                ).execute()
+                ), 'write')
                 print("✅ 헤더 추가 완료")
 
         except HttpError as err:
@@ -274,10 +323,18 @@ def main():
     parser.add_argument('spreadsheet_id', help='구글 시트 ID')
     parser.add_argument('--start', type=int, default=3, help='시작 행')
     parser.add_argument('--end', type=int, default=7, help='종료 행')
+    parser.add_argument('--upload-overlay', action='store_true',
+                        help='투명 오버레이(--renders overlay)도 업로드하고 URL과 겹쳐 볼 기준 이미지 URL을 '
+                             'I, J열에 기록 (D열은 항상 차이 강조 이미지)')
+    parser.add_argument('--full-size', action='store_true',
+                        help='셀 표시용 축소본(*_thumb)이 있어도 원본 크기 이미지를 업로드')
+    add_quota_arguments(parser)
 
     args = parser.parse_args()
+    sheets_limiter.configure(args.sheets_read_quota, args.sheets_write_quota)
 
-    uploader = DriveImageUploader(args.spreadsheet_id)
+    uploader = DriveImageUploader(args.spreadsheet_id, upload_overlay=args.upload_overlay,
+                                  full_size=args.full_size)
 
     print("🔐 구글 API 인증 중...")
     print("⚠️  처음 실행 시 구글 드라이브 권한을 요청합니다.")
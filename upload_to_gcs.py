@@ -19,13 +19,15 @@ try:
     from google.oauth2.credentials import Credentials
     from google_auth_oauthlib.flow import InstalledAppFlow
     from googleapiclient.discovery import build
-    from googleapiclient.errors import HttpError
     from google.cloud import storage
 except ImportError:
     print("구글 API 라이브러리를 설치해주세요:")
     print("pip install google-cloud-storage google-api-python-client google-auth-httplib2 google-auth-oauthlib")
     sys.exit(1)
 
+from imgdiff_artifacts import content_type, find_row_artifact
+from imgdiff_sheets import SheetWriteBuffer, add_quota_arguments, sheets_limiter
+
 
 class GCSImageUploader:
     """이미지를 Google Cloud Storage에 업로드하고 시트 업데이트"""
@@ -36,10 +38,20 @@ class GCSImageUploader:
         'https://www.googleapis.com/auth/devstorage.full_control'
     ]
 
-    def __init__(self, spreadsheet_id: str, bucket_name: str, sheet_name: Optional[str] = None):
+    # D~H열 헤더, --upload-overlay면 I~J열 헤더 추가
+    RESULT_HEADER = ['차이 강조', '나란히 비교', '판정', '차이율 (%)', '변경 픽셀 (%)']
+    OVERLAY_HEADER = ['오버레이 URL', '오버레이 기준 이미지']
+
+    def __init__(self, spreadsheet_id: str, bucket_name: str, sheet_name: Optional[str] = None,
+                 upload_overlay: bool = False, full_size: bool = False):
         self.spreadsheet_id = spreadsheet_id
         self.bucket_name = bucket_name
         self.sheet_name = sheet_name
+        # True이면 투명 오버레이도 올리고 URL과 기준 이미지(overlay_base_url)를 I~J열에 기록
+        # (투명 오버레이는 혼자 보면 빈 이미지이므로 D열은 항상 highlight)
+        self.upload_overlay = upload_overlay
+        # True이면 축소본이 있어도 원본 크기 이미지를 올림
+        self.full_size = full_size
         self.sheet_id = None  # 나중에 메타데이터에서 가져옴
         # timestamp를 사용하여 각 실행마다 고유한 폴더 생성
         self.folder_prefix = f"imgdiff_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
@@ -60,7 +72,8 @@ class GCSImageUploader:
                     processed = stats.get('processed', {})
                     return {
                         'diff_percentage': processed.get('diff_percentage', 0),
-                        'changed_percentage': processed.get('changed_percentage', 0)
+                        'changed_percentage': processed.get('changed_percentage', 0),
+                        'overlay_base_url': stats.get('overlay_base_url', '')
                     }
             else:
                 print(f"  ⚠️ stats.json 파일이 없습니다: {stats_path}")
@@ -72,10 +85,10 @@ class GCSImageUploader:
     def get_sheet_id_by_name(self, sheet_name: str) -> Optional[int]:
         """시트명으로 sheetId 조회"""
         try:
-            result = self.sheet_service.spreadsheets().get(
+            result = sheets_limiter.execute(self.sheet_service.spreadsheets().get(
                 spreadsheetId=self.spreadsheet_id,
                 fields='sheets.properties'
-            ).execute()
+            ), 'read')
 
             sheets = result.get('sheets', [])
             for sheet in sheets:
@@ -183,7 +196,7 @@ class GCSImageUploader:
         """GCS에 파일 업로드 후 공개 URL 반환"""
         try:
             blob = self.bucket.blob(blob_name)
-            blob.upload_from_filename(file_path, content_type='image/png')
+            blob.upload_from_filename(file_path, content_type=content_type(file_path))
 
             # 공개 URL 생성
             public_url = f"https://storage.googleapis.com/{self.bucket_name}/{blob_name}"
@@ -193,16 +206,33 @@ class GCSImageUploader:
             print(f"  ❌ 업로드 실패 ({blob_name}): {e}")
             return None
 
+    def result_header(self) -> List[str]:
+        """D열부터 기록할 헤더"""
+        return self.RESULT_HEADER + (self.OVERLAY_HEADER if self.upload_overlay else [])
+
+    def error_row(self, message: str) -> List:
+        """처리하지 못한 행 (이전 실행의 값이 남지 않도록 헤더 너비만큼 빈 칸으로 채움)"""
+        return [message] + [''] * (len(self.result_header()) - 1)
+
     def process_single_row(self, row_num: int) -> Tuple[int, List]:
         """단일 행 처리 (병렬 처리용)"""
         print(f"\n[행 {row_num}] 처리 중...")
 
-        # 로컬 이미지 파일 경로
-        diff_path = f"googlesheet_url_results/row_{row_num}/diff_highlight.png"
-        side_path = f"googlesheet_url_results/row_{row_num}/side_by_side.png"
-
-        if not os.path.exists(diff_path) or not os.path.exists(side_path):
-            return (row_num, ['파일 없음', '', '', '', ''])
+        # 로컬 이미지 파일 경로 (--encoding에 따라 .png 또는 .webp)
+        row_dir = f"googlesheet_url_results/row_{row_num}"
+        # 셀 표시용 축소본(*_thumb)이 있으면 축소본을 올림 (--full-size면 원본 크기)
+        diff_path = find_row_artifact(row_dir, 'highlight', rendition=not self.full_size)
+        side_path = find_row_artifact(row_dir, 'side_by_side', rendition=not self.full_size)
+        overlay_path = (find_row_artifact(row_dir, 'overlay', rendition=not self.full_size)
+                        if self.upload_overlay else None)
+        stats_path = f"{row_dir}/stats.json"
+
+        # 이미지 생략(--renders, --render-min-diff)으로 없는 이미지는 빈 칸으로 기록
+        has_diff = diff_path is not None
+        has_side = side_path is not None
+        has_overlay = overlay_path is not None
+        if not has_diff and not has_side and not has_overlay and not os.path.exists(stats_path):
+            return (row_num, self.error_row('파일 없음'))
 
         try:
             # 통계 계산
@@ -211,12 +241,21 @@ class GCSImageUploader:
             changed_pct = stats.get('changed_percentage', 0)
 
             # GCS에 업로드 (훨씬 빠름!)
-            print(f"  ☁️ GCS 업로드 중...")
-            diff_url = self.upload_to_gcs(diff_path, f"{self.folder_prefix}/row{row_num}_diff.png")
-            side_url = self.upload_to_gcs(side_path, f"{self.folder_prefix}/row{row_num}_comparison.png")
-
-            if not diff_url or not side_url:
-                return (row_num, ['업로드 실패', '', '', '', ''])
+            diff_url = side_url = overlay_url = None
+            if has_diff or has_side or has_overlay:
+                print(f"  ☁️ GCS 업로드 중...")
+            if has_diff:
+                diff_url = self.upload_to_gcs(diff_path,
+                                            f"{self.folder_prefix}/row{row_num}_diff{os.path.splitext(diff_path)[1]}")
+            if has_side:
+                side_url = self.upload_to_gcs(side_path,
+                                            f"{self.folder_prefix}/row{row_num}_comparison{os.path.splitext(side_path)[1]}")
+            if has_overlay:
+                overlay_url = self.upload_to_gcs(overlay_path,
+                                               f"{self.folder_prefix}/row{row_num}_overlay{os.path.splitext(overlay_path)[1]}")
+
+            if (has_diff and not diff_url) or (has_side and not side_url) or (has_overlay and not overlay_url):
+                return (row_num, self.error_row('업로드 실패'))
 
             # 판정 결과
             if diff_pct < 1:
@@ -228,76 +267,64 @@ class GCSImageUploader:
 
             # IMAGE 함수 + 수치 데이터
             row_data = [
-                f'=IMAGE("{diff_url}", 1)',  # D열: 차이 강조 이미지
-                f'=IMAGE("{side_url}", 1)',  # E열: 나란히 비교 이미지
+                f'=IMAGE("{diff_url}", 1)' if diff_url else '',  # D열: 차이 강조 이미지
+                f'=IMAGE("{side_url}", 1)' if side_url else '',  # E열: 나란히 비교 이미지
                 status,                       # F열: 판정 결과
                 diff_pct,                     # G열: 차이율 (%)
                 changed_pct,                  # H열: 변경된 픽셀 비율 (%)
             ]
-            print(f"  ✅ 업로드 완료 (차이율: {diff_pct:.2f}%)")
+            if self.upload_overlay:
+                # 오버레이는 기준 이미지 위에 겹쳐 보는 용도이므로 IMAGE가 아닌 URL로 기록
+                row_data += [
+                    overlay_url or '',                        # I열: 투명 오버레이 URL
+                    stats.get('overlay_base_url', '') if overlay_url else '',  # J열: 겹쳐 볼 기준 이미지 URL
+                ]
+            print(f"  ✅ 업로드 완료 (차이율: {diff_pct:.2f}%)" if diff_url or side_url or overlay_url
+                  else f"  ✅ 이미지 없이 기록 (차이율: {diff_pct:.2f}%)")
             return (row_num, row_data)
 
         except Exception as e:
             print(f"  ❌ 처리 실패: {e}")
-            return (row_num, ['처리 실패', '', '', '', ''])
+            return (row_num, self.error_row('처리 실패'))
 
-    def update_sheet_with_images(self, start_row: int = 3, end_row: int = 7, max_workers: int = 10):
-        """이미지 URL을 구글 시트에 추가 (병렬 처리)"""
+    def update_sheet_with_images(self, start_row: int = 3, end_row: int = 7, max_workers: int = 10,
+                                 flush_rows: int = 50, flush_interval: float = 10.0):
+        """이미지 URL을 구글 시트에 추가 (병렬 처리, 완료된 행부터 나누어 기록)"""
 
         print(f"\n🚀 병렬 업로드 시작 (동시 처리: {max_workers}개)")
 
-        # 병렬로 이미지 업로드
-        results = {}
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 모든 행에 대해 작업 제출
-            future_to_row = {
-                executor.submit(self.process_single_row, row_num): row_num
-                for row_num in range(start_row, end_row + 1)
-            }
-
-            # 완료된 작업부터 처리
-            for future in as_completed(future_to_row):
-                row_num, row_data = future.result()
-                results[row_num] = row_data
-
-        # 행 번호 순서대로 정렬
-        update_data = [results[row_num] for row_num in range(start_row, end_row + 1)]
-
-        # 구글 시트 업데이트
-        print(f"\n📝 구글 시트 D{start_row}:H{end_row} 업데이트 중...")
-        # 시트명이 있으면 포함, 없으면 기본 시트
-        if self.sheet_name:
-            update_range = f"'{self.sheet_name}'!D{start_row}:H{end_row}"
-        else:
-            update_range = f'D{start_row}:H{end_row}'
+        # 완료된 행을 모아 N행 또는 T초마다 시트에 기록 (헤더는 --start 3일 때만 2행에 추가)
+        writer = SheetWriteBuffer(
+            self.sheet_service,
+            self.spreadsheet_id,
+            start_column='D',
+            sheet_name=self.sheet_name,
+            flush_rows=flush_rows,
+            flush_interval=flush_interval,
+            header_values=self.result_header() if start_row == 3 else None,
+            # 행은 완료 순서로 기록되므로 헤더 위치는 첫 배치가 아닌 시작 행 기준
+            header_row=start_row - 1
+        )
 
         try:
-            body = {'values': update_data}
-            result = self.sheet_service.spreadsheets().values().update(
-                spreadsheetId=self.spreadsheet_id,
-                range=update_range,
-                valueInputOption='USER_ENTERED',
-                body=body
-            ).execute()
-
-            print(f"✅ 시트 업데이트 완료: {result.get('updatedCells')}개 셀")
-
-            # 헤더 추가 (D2:H2)
-            if start_row == 3:
-                header_range = f"'{self.sheet_name}'!D2:H2" if self.sheet_name else 'D2:H2'
-                header_body = {
-                    'values': [['차이 강조', '나란히 비교', '판정', '차이율 (%)', '변경 픽셀 (%)']]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # 모든 행에 대해 작업 제출
+                future_to_row = {
+                    executor.submit(self.process_single_row, row_num): row_num
+                    for row_num in range(start_row, end_row + 1)
                 }
-                self.sheet_service.spreadsheets().values().update(
-                    spreadsheetId=self.spreadsheet_id,
-                    range=header_range,
-                    valueInputOption='USER_ENTERED',
-                    body=header_body
-                ).execute()
-                print("✅ 헤더 추가 완료")
 
-        except HttpError as err:
-            print(f"❌ 시트 업데이트 실패: {err}")
+                # 완료된 작업부터 버퍼에 추가
+                for future in as_completed(future_to_row):
+                    row_num, row_data = future.result()
+                    writer.add(row_num, row_data)
+        finally:
+            # 중단되더라도 완료된 행은 시트에 남김
+            writer.close()
+
+        print(f"✅ 시트 업데이트 완료: {writer.written_rows}개 행 ({writer.request_count}회 요청)")
+        if writer.pending:
+            print(f"❌ 시트 업데이트 실패: {len(writer.pending)}개 행이 기록되지 않았습니다.")
 
 
 def parse_range(range_str: str) -> Tuple[int, int, Optional[str]]:
@@ -343,8 +370,17 @@ def main():
     parser.add_argument('--sheet-name', default=None, help='시트명 (기본값: None, sheet_id 0 사용)')
 
     parser.add_argument('--workers', type=int, default=10, help='동시 업로드 수 (기본값: 10)')
+    parser.add_argument('--upload-overlay', action='store_true',
+                        help='투명 오버레이(--renders overlay)도 업로드하고 URL과 겹쳐 볼 기준 이미지 URL을 '
+                             'I, J열에 기록 (D열은 항상 차이 강조 이미지)')
+    parser.add_argument('--full-size', action='store_true',
+                        help='셀 표시용 축소본(*_thumb)이 있어도 원본 크기 이미지를 업로드')
+    parser.add_argument('--flush-rows', type=int, default=50, help='이 개수만큼 행이 모이면 시트에 기록 (기본값: 50)')
+    parser.add_argument('--flush-interval', type=float, default=10.0, help='이 시간(초)마다 시트에 기록 (기본값: 10)')
+    add_quota_arguments(parser)
 
     args = parser.parse_args()
+    sheets_limiter.configure(args.sheets_read_quota, args.sheets_write_quota)
 
     # 범위 파싱
     sheet_name = args.sheet_name  # --sheet-name 옵션 우선
@@ -365,13 +401,16 @@ def main():
         end_row = args.end
         print(f"📍 범위: 행 {start_row}~{end_row} (--start/--end 옵션 사용)")
 
-    uploader = GCSImageUploader(args.spreadsheet_id, args.bucket, sheet_name=sheet_name)
+    uploader = GCSImageUploader(args.spreadsheet_id, args.bucket, sheet_name=sheet_name,
+                                upload_overlay=args.upload_overlay, full_size=args.full_size)
 
     print("🔐 인증 중...")
     uploader.authenticate()
     uploader.create_public_bucket()
 
-    uploader.update_sheet_with_images(start_row, end_row, args.workers)
+    uploader.update_sheet_with_images(start_row, end_row, args.workers,
+                                      flush_rows=args.flush_rows,
+                                      flush_interval=args.flush_interval)
 
     print(f"\n✨ 완료!")
     print(f"📊 구글 시트 확인: https://docs.google.com/spreadsheets/d/{args.spreadsheet_id}/edit")